@@ -1,20 +1,16 @@
 import os
-import requests
-from dotenv import load_dotenv
-load_dotenv()
+import sys
 
-API_KEY = os.getenv("DEEPSEEK_API_KEY")
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+try:
+    from llm_client import chat_completion
+except ModuleNotFoundError as e:
+    print("❌ Import failed:", e)
+    raise
 
 def suggest_model_or_pipeline(task_desc):
     prompt = f"Suggest the best ML model and preprocessing for: {task_desc}"
-    response = requests.post(
-        "https://api.deepseek.com/v1/chat/completions",
-        headers={"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"},
-        json={
-            "model": "deepseek-coder",
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0.5
-        },
-        timeout=60
-    )
-    return response.json()["choices"][0]["message"]["content"]
+    return chat_completion(prompt, temperature=0.5)
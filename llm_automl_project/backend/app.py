@@ -1,7 +1,9 @@
 import os
 import sys
-import shutil
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+import asyncio
+import pandas as pd
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
@@ -10,21 +12,40 @@ PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from model_pipeline import train_and_save_model
-from predict import predict, save_prediction_feedback
-from utils import load_dataset
-from eda_generator import generate_eda_report, export_eda_to_pdf
+from predict import predict, predict_batch, save_prediction_feedback, MODEL_CACHE, PREDICT_BATCH_CHUNK_SIZE
 from retrain import retrain_from_feedback
-from background_tasks import schedule_daily_monitoring
+from background_tasks import monitoring_loop
+from feedback_writer import FEEDBACK_WRITER
+from llm_client import LLM_CLIENT
+from feedback_archive import archive_feedback, FEEDBACK_HOT_DAYS
+from database import init_db, pool_stats, dispose_engines
+from model_registry import list_models, list_versions, promote_model, rollback_model
+from utils import iter_dataset
+from dataset_cache import ensure_parquet_cache
+from upload_ingest import (
+    ingest_upload, start_resumable_upload, upload_status, append_upload_chunk, complete_upload
+)
+from approx_stats import approximate_profile
+from training_jobs import (
+    submit_training_job, get_job_async, cancel_job, recover_interrupted_jobs, shutdown_training_jobs
+)
 
 DATA_DIR = os.path.abspath("data")
 os.makedirs(DATA_DIR, exist_ok=True)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    tasks = BackgroundTasks()
-    schedule_daily_monitoring(tasks)
+    init_db()
+    recover_interrupted_jobs()
+    FEEDBACK_WRITER.start()
+    # Retraining and feedback archival, for as long as the server runs
+    monitor = asyncio.create_task(monitoring_loop())
     yield
+    monitor.cancel()
+    # Drain buffered feedback before the process exits
+    FEEDBACK_WRITER.stop()
+    shutdown_training_jobs()
+    await dispose_engines()
 
 app = FastAPI(title="LLM AutoML Backend API", lifespan=lifespan)
 
@@ -38,45 +59,139 @@ app.add_middleware(
 
 @app.post("/upload-data/")
 async def upload_data(file: UploadFile = File(...)):
-    file_path = os.path.join(DATA_DIR, file.filename)
     try:
-        with open(file_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-        return {"status": "File uploaded", "filename": file.filename}
+        stored = await ingest_upload(file, DATA_DIR)
+        # Parse once on ingest; later readers get a typed, memory-mapped columnar copy
+        try:
+            await run_in_threadpool(ensure_parquet_cache, stored["path"])
+        except Exception as e:
+            print(f"⚠️ Could not build columnar cache for {stored['filename']}: {e}")
+        return {"status": "File uploaded", **{k: v for k, v in stored.items() if k != "path"}}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+@app.post("/uploads/")
+async def start_upload(filename: str, total_size: int = None):
+    """Open a resumable upload; send chunks with PUT /uploads/{id}?offset=N, then POST /uploads/{id}/complete."""
+    return await run_in_threadpool(start_resumable_upload, DATA_DIR, filename, total_size)
+
+@app.get("/uploads/{upload_id}")
+async def get_upload(upload_id: str):
+    return await run_in_threadpool(upload_status, DATA_DIR, upload_id)
+
+@app.put("/uploads/{upload_id}")
+async def put_upload_chunk(upload_id: str, offset: int, request: Request):
+    return await append_upload_chunk(DATA_DIR, upload_id, offset, request.stream())
+
+@app.post("/uploads/{upload_id}/complete")
+async def finish_upload(upload_id: str):
+    stored = await complete_upload(DATA_DIR, upload_id)
+    try:
+        await run_in_threadpool(ensure_parquet_cache, stored["path"])
+    except Exception as e:
+        print(f"⚠️ Could not build columnar cache for {stored['filename']}: {e}")
+    return {"status": "File uploaded", **{k: v for k, v in stored.items() if k != "path"}}
+
 @app.post("/train-model/")
-def train_model(file_name: str):
+def train_model(file_name: str, search: bool = None, time_budget: float = None, target: str = None):
+    """
+    Queue EDA + training for an uploaded dataset and return the job id immediately.
+
+    `search=true` runs the multi-model successive-halving search within `time_budget` seconds.
+    `target` names the column to predict (default: the last column); classification vs
+    regression is detected from it.
+    """
     dataset_path = os.path.join(DATA_DIR, file_name)
     if not os.path.exists(dataset_path):
         raise HTTPException(status_code=404, detail="Dataset not found")
     try:
-        df = load_dataset(dataset_path)
-        generate_eda_report(df)
-        export_eda_to_pdf()
-        model_path = train_and_save_model(dataset_path)
-        return {
-            "message": "Model trained and EDA generated successfully",
-            "model_path": model_path
-        }
+        job_id = submit_training_job(dataset_path, search=search, time_budget=time_budget, target=target)
+        return {"message": "Training job queued", "job_id": job_id, "status": "queued"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Training failed: {str(e)}")
 
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = await get_job_async(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job.pop("result")
+    return job
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    job = await get_job_async(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Training failed: {job['error']}")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return job["result"]
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_training_job(job_id: str):
+    try:
+        return {"job_id": job_id, "status": cancel_job(job_id)}
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+@app.get("/profile-data/")
+def profile_data(file_name: str):
+    """One-pass approximate column statistics, streamed chunk by chunk so large files never load whole."""
+    dataset_path = os.path.join(DATA_DIR, file_name)
+    if not os.path.exists(dataset_path):
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    try:
+        profile = approximate_profile(iter_dataset(dataset_path))
+        profile.pop("sample")
+        return profile
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Profiling failed: {str(e)}")
+
 @app.post("/predict/")
 def make_prediction(model_name: str, input_data: dict):
     try:
         result = predict(model_name, input_data)
-        save_prediction_feedback(input_data, prediction=result)
+        save_prediction_feedback(input_data, prediction=result, model_name=model_name)
         return {"prediction": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
+@app.post("/predict/batch/")
+async def make_batch_prediction(request: Request, model_name: str, chunk_size: int = PREDICT_BATCH_CHUNK_SIZE,
+                                return_proba: bool = False):
+    """Score a JSON list of records, or a CSV/Parquet file uploaded as multipart field `file`."""
+    try:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None:
+                raise HTTPException(status_code=400, detail="Missing 'file' field in upload.")
+            ext = os.path.splitext(upload.filename)[1].lower()
+            if ext == ".csv":
+                records = await run_in_threadpool(pd.read_csv, upload.file)
+            elif ext == ".parquet":
+                records = await run_in_threadpool(pd.read_parquet, upload.file)
+            else:
+                raise HTTPException(status_code=400, detail=f"Unsupported batch file format: {ext}")
+        else:
+            records = await request.json()
+            if not isinstance(records, list):
+                raise HTTPException(status_code=400, detail="Expected a JSON list of records.")
+        return await run_in_threadpool(predict_batch, model_name, records, chunk_size, return_proba)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
+
 @app.post("/predict/feedback/")
 def submit_feedback(model_name: str, input_data: dict, correct_label: str):
     try:
         result = predict(model_name, input_data)
-        save_prediction_feedback(input_data, prediction=result, correction=correct_label)
+        save_prediction_feedback(input_data, prediction=result, correction=correct_label, model_name=model_name)
         return {
             "status": "Feedback saved",
             "original_prediction": result,
@@ -86,9 +201,51 @@ def submit_feedback(model_name: str, input_data: dict, correct_label: str):
         raise HTTPException(status_code=500, detail=f"Feedback submission failed: {str(e)}")
 
 @app.post("/retrain/")
-def retrain_model():
+def retrain_model(model_name: str = None):
+    """Fold new corrected feedback into the named model (default: every model with new feedback)."""
     try:
-        result = retrain_from_feedback()
+        result = retrain_from_feedback(model_name)
         return {"retrain_status": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Retraining failed: {str(e)}")
+
+@app.get("/models/")
+def registered_models():
+    return list_models()
+
+@app.get("/models/{name}")
+def model_versions(name: str):
+    return list_versions(name)
+
+@app.post("/models/{name}/promote")
+def promote(name: str, version: int, alias: str = "production"):
+    """Point `alias` (staging or production) at `version`; predictions pick it up on their next request."""
+    return promote_model(name, version, alias)
+
+@app.post("/models/{name}/rollback")
+def rollback(name: str, alias: str = "production"):
+    return rollback_model(name, alias)
+
+@app.get("/models/cache/stats")
+def model_cache_stats():
+    return MODEL_CACHE.stats()
+
+@app.post("/feedback/archive")
+def archive_old_feedback(older_than_days: int = FEEDBACK_HOT_DAYS):
+    """Move feedback older than `older_than_days` into monthly Parquet partitions."""
+    try:
+        return archive_feedback(older_than_days)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Feedback archival failed: {str(e)}")
+
+@app.get("/feedback/queue/stats")
+def feedback_queue_stats():
+    return FEEDBACK_WRITER.stats()
+
+@app.get("/db/pool/stats")
+def db_pool_stats():
+    return pool_stats()
+
+@app.get("/llm/stats")
+def llm_stats():
+    return LLM_CLIENT.stats()
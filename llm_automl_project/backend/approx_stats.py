@@ -0,0 +1,255 @@
+import os
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EDA_ROW_BUDGET = int(os.getenv("EDA_ROW_BUDGET", 200000))
+
+
+# ✅ Sampling
+def sample_rows(df: pd.DataFrame, row_budget: int = EDA_ROW_BUDGET, stratify: str = None, seed: int = 42) -> pd.DataFrame:
+    """Uniform (or stratified by `stratify`) sample of at most `row_budget` rows, in original row order."""
+    if row_budget is None or len(df) <= row_budget:
+        return df
+    if stratify is not None and stratify in df.columns and df[stratify].nunique() <= row_budget:
+        frac = row_budget / len(df)
+        sample = df.groupby(stratify, group_keys=False, dropna=False).sample(frac=frac, random_state=seed)
+    else:
+        sample = df.sample(n=row_budget, random_state=seed)
+    return sample.sort_index()
+
+
+def reservoir_sample(chunks, row_budget: int = EDA_ROW_BUDGET, seed: int = 42) -> tuple:
+    """
+    Uniform sample of `row_budget` rows from an iterable of DataFrame chunks (Algorithm R).
+
+    Returns:
+        tuple: (sample DataFrame, total rows seen).
+    """
+    rng = np.random.default_rng(seed)
+    reservoir = None
+    seen = 0
+    for chunk in chunks:
+        chunk = chunk.reset_index(drop=True)
+        if reservoir is None:
+            reservoir = chunk.iloc[:0]
+        fill = max(0, min(row_budget - len(reservoir), len(chunk)))
+        if fill:
+            reservoir = pd.concat([reservoir, chunk.iloc[:fill]], ignore_index=True)
+        rest = chunk.iloc[fill:]
+        if len(rest):
+            positions = np.arange(seen + fill, seen + len(chunk)) + 1
+            slots = rng.integers(0, positions)
+            keep = slots < row_budget
+            # Later rows win when two land in the same slot, as in the sequential algorithm
+            picks = pd.Series(np.flatnonzero(keep), index=slots[keep])
+            picks = picks[~picks.index.duplicated(keep="last")]
+            replaced = rest.iloc[picks.to_numpy()]
+            replaced.index = picks.index
+            reservoir = pd.concat([reservoir.drop(index=picks.index), replaced]).sort_index()
+        seen += len(chunk)
+    return (reservoir if reservoir is not None else pd.DataFrame()), seen
+
+
+# ✅ One-pass moments
+class RunningMoments:
+    """Streaming count/mean/std/skew/kurtosis/min/max, merged chunk by chunk (Pébay's update formulas)."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        x = np.asarray(values, dtype=float)
+        x = x[~np.isnan(x)]
+        if not len(x):
+            return
+        nb = len(x)
+        mean_b = x.mean()
+        d = x - mean_b
+        m2b, m3b, m4b = (d ** 2).sum(), (d ** 3).sum(), (d ** 4).sum()
+
+        na = self.n
+        n = na + nb
+        delta = mean_b - self.mean
+        self.m4 = (self.m4 + m4b + delta ** 4 * na * nb * (na ** 2 - na * nb + nb ** 2) / n ** 3
+                   + 6 * delta ** 2 * (na ** 2 * m2b + nb ** 2 * self.m2) / n ** 2
+                   + 4 * delta * (na * m3b - nb * self.m3) / n)
+        self.m3 = (self.m3 + m3b + delta ** 3 * na * nb * (na - nb) / n ** 2
+                   + 3 * delta * (na * m2b - nb * self.m2) / n)
+        self.m2 = self.m2 + m2b + delta ** 2 * na * nb / n
+        self.mean = self.mean + delta * nb / n
+        self.n = n
+        self.min = min(self.min, x.min())
+        self.max = max(self.max, x.max())
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else float("nan")
+
+    @property
+    def skewness(self) -> float:
+        # Biased estimator, matching scipy.stats.skew defaults
+        return float(np.sqrt(self.n) * self.m3 / self.m2 ** 1.5) if self.m2 > 0 else 0.0
+
+    @property
+    def kurtosis(self) -> float:
+        # Excess kurtosis, matching scipy.stats.kurtosis defaults
+        return float(self.n * self.m4 / self.m2 ** 2 - 3) if self.m2 > 0 else 0.0
+
+
+# ✅ Quantile sketch
+class KLLSketch:
+    """
+    KLL quantile sketch over floats.
+
+    Keeps a hierarchy of compactors whose capacities shrink geometrically towards the
+    bottom; a full compactor sorts itself and promotes every other item one level up,
+    doubling its weight. Memory is O(k log(n/k)).
+    """
+
+    def __init__(self, k: int = 200, seed: int = 42):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values):
+        x = np.asarray(values, dtype=float)
+        x = x[~np.isnan(x)]
+        if not len(x):
+            return
+        self.n += len(x)
+        self.levels[0] = np.concatenate([self.levels[0], x])
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(self.levels[level])
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                items = items[:len(items) - len(keep)]
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = keep
+            level += 1
+
+    def quantile(self, q: float) -> float:
+        if not self.n:
+            return float("nan")
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lvl), 2 ** h) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(items)
+        cumulative = np.cumsum(weights[order])
+        idx = min(np.searchsorted(cumulative, q * cumulative[-1]), len(items) - 1)
+        return float(items[order][idx])
+
+    @property
+    def rank_error(self) -> float:
+        """Normalized rank error bound (≈99% confidence, empirical KLL constant)."""
+        return 0.0 if self.n <= self.k else 2.296 / self.k ** 0.9723
+
+
+# ✅ Distinct-count sketch
+class HyperLogLog:
+    """HyperLogLog distinct counter over pandas hashes; vectorized register updates."""
+
+    def __init__(self, p: int = 14):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update(self, values):
+        if isinstance(values, pd.DataFrame):
+            hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(np.uint64)
+        else:
+            values = pd.Series(values).dropna()
+            hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(np.uint64)
+        if not len(hashes):
+            return
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        # Sentinel bit bounds the rank when the remaining bits are all zero
+        w = (hashes << np.uint64(self.p)) | np.uint64(1 << (self.p - 1))
+        leading = np.zeros(len(w), dtype=np.uint8)
+        for shift in (32, 16, 8, 4, 2, 1):
+            mask = w < np.uint64(1 << (64 - shift))
+            leading[mask] += shift
+            w[mask] <<= np.uint64(shift)
+        np.maximum.at(self.registers, idx, leading + 1)
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m ** 2 / np.sum(2.0 ** -self.registers.astype(float))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * np.log(self.m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / np.sqrt(self.m)
+
+
+# ✅ Approximate profile
+def approximate_profile(data, row_budget: int = EDA_ROW_BUDGET, seed: int = 42) -> dict:
+    """
+    One-pass approximate profile of a DataFrame or an iterable of DataFrame chunks.
+
+    Moments and min/max are computed exactly in a single streaming pass; quantiles come
+    from a KLL sketch and distinct counts from HyperLogLog. A reservoir sample of at
+    most `row_budget` rows is kept for plots and model-based views (PCA, clustering).
+
+    Returns:
+        dict: rows, per-column stats, error bounds and the row sample.
+    """
+    chunks = [data] if isinstance(data, pd.DataFrame) else data
+    moments, quantiles, distinct, missing = {}, {}, {}, {}
+
+    def _observe(chunks):
+        for chunk in chunks:
+            for col in chunk.columns:
+                series = chunk[col]
+                missing[col] = missing.get(col, 0) + int(series.isna().sum())
+                distinct.setdefault(col, HyperLogLog()).update(series)
+                if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                    moments.setdefault(col, RunningMoments()).update(series.to_numpy(dtype=float, na_value=np.nan))
+                    quantiles.setdefault(col, KLLSketch(seed=seed)).update(series.to_numpy(dtype=float, na_value=np.nan))
+            yield chunk
+
+    sample, rows = reservoir_sample(_observe(chunks), row_budget=row_budget, seed=seed)
+
+    columns = {}
+    for col in missing:
+        stats = {"missing": missing[col], "distinct": distinct[col].count()}
+        if col in moments:
+            m, sketch = moments[col], quantiles[col]
+            stats.update({
+                "mean": float(m.mean), "std": m.std, "min": float(m.min), "max": float(m.max),
+                "skewness": m.skewness, "kurtosis": m.kurtosis,
+                "p25": sketch.quantile(0.25), "median": sketch.quantile(0.5), "p75": sketch.quantile(0.75),
+            })
+        columns[col] = stats
+
+    any_sketch = next(iter(quantiles.values()), None)
+    return {
+        "approximate": True,
+        "rows": rows,
+        "sample_rows": len(sample),
+        "columns": columns,
+        "error_bounds": {
+            "distinct_relative_error": round(float(HyperLogLog().relative_error), 4),
+            "quantile_rank_error": round(any_sketch.rank_error, 4) if any_sketch else 0.0,
+        },
+        "sample": sample,
+    }
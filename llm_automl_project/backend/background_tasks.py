@@ -1,21 +1,28 @@
 import os
 import sys
-from fastapi import BackgroundTasks
+import asyncio
+from fastapi.concurrency import run_in_threadpool
+from dotenv import load_dotenv
 
 # ✅ Fix module path for direct execution
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
-PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
-if PROJECT_ROOT not in sys.path:
-    sys.path.insert(0, PROJECT_ROOT)
+if CURRENT_DIR not in sys.path:
+    sys.path.insert(0, CURRENT_DIR)
 
-# ✅ Safe imports after fixing path
+# ✅ Safe imports after fixing path; the same top-level modules app.py uses, so there is
+# one database engine and one copy of each module's state
 try:
-    from backend.database import get_feedback_stats
-    from backend.retrain import retrain_from_feedback
+    from database import get_feedback_stats
+    from retrain import retrain_from_feedback
+    from feedback_archive import archive_feedback
 except ImportError as e:
     print(f"❌ Import error in background_tasks.py: {e}")
     raise
 
+load_dotenv()
+
+MONITOR_INTERVAL_HOURS = float(os.getenv("MONITOR_INTERVAL_HOURS", 24))
+
 # 🔁 Auto-retraining logic
 def auto_retrain_task():
     try:
@@ -28,6 +35,21 @@ def auto_retrain_task():
     except Exception as e:
         print(f"❌ Error in auto_retrain_task: {e}")
 
+# 📦 Move old feedback out of the hot table
+def archive_feedback_task():
+    try:
+        archive_feedback()
+    except Exception as e:
+        print(f"❌ Error in archive_feedback_task: {e}")
+
 # 🕓 Background scheduling
-def schedule_daily_monitoring(tasks: BackgroundTasks):
-    tasks.add_task(auto_retrain_task)
+def run_daily_monitoring():
+    # Retrain first: archival keeps corrections that haven't been retrained on yet
+    auto_retrain_task()
+    archive_feedback_task()
+
+async def monitoring_loop(interval_hours: float = MONITOR_INTERVAL_HOURS):
+    """Run the monitoring pass at startup and then every `interval_hours`, on a worker thread."""
+    while True:
+        await run_in_threadpool(run_daily_monitoring)
+        await asyncio.sleep(interval_hours * 3600)
@@ -1,17 +1,215 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, Text, DateTime
+from sqlalchemy import (
+    create_engine, event, inspect, text, func, Column, Integer, String, Float, Text, DateTime, JSON, Index, Boolean,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from contextlib import contextmanager, asynccontextmanager
 from datetime import datetime
 from dotenv import load_dotenv
+import ast
+import json
+import math
 import os
+import threading
+import time
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./automl.db")
+DATABASE_ASYNC_URL = os.getenv("DATABASE_ASYNC_URL")  # defaults to DATABASE_URL with its async driver
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # seconds before a pooled connection is replaced
+DB_SQLITE_WAL = os.getenv("DB_SQLITE_WAL", "1") == "1"
+DB_SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("DB_SQLITE_BUSY_TIMEOUT_MS", 5000))
+RETRAIN_MIN_FEEDBACK = int(os.getenv("RETRAIN_MIN_FEEDBACK", 50))  # new corrections that trigger an auto-retrain
+
+def _finite(obj):
+    # NaN/infinity aren't valid JSON (SQLite's json_valid and Postgres JSONB reject them): store null
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+def _json_dumps(obj) -> str:
+    return json.dumps(_finite(obj), default=str)
+
+# ------------------------------------------
+# 🔌 Pooled engines (sync + async) and pool metrics
+# ------------------------------------------
+class PoolMetrics:
+    """Checkout wait times and connections in use for one engine's connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.in_use = 0
+        self.peak_in_use = 0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def checked_out(self, *_):
+        with self._lock:
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def checked_in(self, *_):
+        with self._lock:
+            self.in_use -= 1
+
+    def stats(self, pool) -> dict:
+        with self._lock:
+            return {
+                "pool_size": pool.size() if hasattr(pool, "size") else None,
+                "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+                "idle": pool.checkedin() if hasattr(pool, "checkedin") else None,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+
+def _timed_pool(base, metrics: PoolMetrics):
+    # Subclassed rather than wrapped so engine.dispose() (which recreates the pool) keeps the timing
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = base._do_get(self)
+        except PoolTimeoutError:
+            metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        metrics.record_wait(time.perf_counter() - start)
+        return connection
+    return type(f"Timed{base.__name__}", (base,), {"_do_get": _do_get})
+
+def _sqlite_pragmas(dbapi_connection, _record):
+    # WAL lets readers run alongside the writer; busy_timeout waits for a lock instead of failing at once
+    cursor = dbapi_connection.cursor()
+    if DB_SQLITE_WAL:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={DB_SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+def _engine_options(url: str, pool_class, metrics: PoolMetrics) -> dict:
+    options = {"json_serializer": _json_dumps, "pool_pre_ping": True}
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False, "timeout": DB_SQLITE_BUSY_TIMEOUT_MS / 1000}
+        if ":memory:" in url or url.rstrip("/").endswith(":"):
+            return options  # in-memory databases live in a single connection; keep SQLAlchemy's default pool
+    options.update(
+        poolclass=_timed_pool(pool_class, metrics),
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return options
+
+def _instrument(sync_engine, metrics: PoolMetrics):
+    event.listen(sync_engine, "checkout", metrics.checked_out)
+    event.listen(sync_engine, "checkin", metrics.checked_in)
+    if sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", _sqlite_pragmas)
+
+POOL_METRICS = PoolMetrics()
+ASYNC_POOL_METRICS = PoolMetrics()
 
 Base = declarative_base()
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
-SessionLocal = sessionmaker(bind=engine)
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL, QueuePool, POOL_METRICS))
+_instrument(engine, POOL_METRICS)
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+
+_async_engine = None
+_async_session_factory = None
+_async_lock = threading.Lock()
+
+def _async_url(url: str) -> str:
+    for prefix, driver in (("sqlite:", "sqlite+aiosqlite:"), ("postgresql+psycopg2:", "postgresql+asyncpg:"),
+                           ("postgresql:", "postgresql+asyncpg:"), ("postgres:", "postgresql+asyncpg:")):
+        if url.startswith(prefix):
+            return driver + url[len(prefix):]
+    return url
+
+def get_async_engine():
+    """
+    The shared async engine (aiosqlite/asyncpg), created on first use.
+
+    Returns None when the async driver isn't installed; callers then fall back to the sync
+    engine in a worker thread.
+    """
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        return _async_engine
+    with _async_lock:
+        if _async_engine is None and _async_session_factory is None:
+            url = DATABASE_ASYNC_URL or _async_url(DATABASE_URL)
+            try:
+                from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+                _async_engine = create_async_engine(url, **_engine_options(url, AsyncAdaptedQueuePool, ASYNC_POOL_METRICS))
+            except (ImportError, ValueError) as e:
+                print(f"⚠️ Async database driver unavailable ({e}); async endpoints use worker threads.")
+                _async_session_factory = False
+                return None
+            _instrument(_async_engine.sync_engine, ASYNC_POOL_METRICS)
+            _async_session_factory = async_sessionmaker(_async_engine, expire_on_commit=False)
+    return _async_engine
+
+@contextmanager
+def session_scope():
+    """A session from the shared pool: commits on success, rolls back on error, always closes."""
+    session = SessionLocal()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+@asynccontextmanager
+async def async_session_scope():
+    """session_scope for async endpoints; requires get_async_engine() to be available."""
+    if get_async_engine() is None:
+        raise RuntimeError("Async database driver not installed")
+    async with _async_session_factory() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+def pool_stats() -> dict:
+    stats = {"sync": POOL_METRICS.stats(engine.pool)}
+    if _async_engine is not None:
+        stats["async"] = ASYNC_POOL_METRICS.stats(_async_engine.sync_engine.pool)
+    return stats
+
+async def dispose_engines():
+    engine.dispose()
+    if _async_engine is not None:
+        await _async_engine.dispose()
 
 class ModelMetadata(Base):
     __tablename__ = "models"
@@ -20,14 +218,211 @@ class ModelMetadata(Base):
     accuracy = Column(Float)
     created_at = Column(DateTime, default=datetime.utcnow)
     filepath = Column(Text)
+    # AutoML search bookkeeping: one row per evaluated candidate, plus the saved winner
+    search_id = Column(String, index=True, nullable=True)
+    model_family = Column(String, nullable=True)
+    params = Column(Text, nullable=True)
+    rung = Column(Integer, nullable=True)
+    train_rows = Column(Integer, nullable=True)
+    fit_seconds = Column(Float, nullable=True)
+    # Task-aware evaluation: accuracy stays classification-only, score holds the task's primary metric
+    task_type = Column(String, nullable=True)
+    metric = Column(String, nullable=True)
+    score = Column(Float, nullable=True)
+    metrics = Column(Text, nullable=True)
+    # Artifact footprint: bytes on disk, measured load time and joblib compression
+    artifact_bytes = Column(Integer, nullable=True)
+    load_seconds = Column(Float, nullable=True)
+    compression = Column(String, nullable=True)
+    # Registry: registered models are immutable versions of a named model (the dataset name)
+    version = Column(Integer, nullable=True)
+    status = Column(String, nullable=True)
+    dataset_sha256 = Column(String, nullable=True)
+    dataset_path = Column(Text, nullable=True)
+    target = Column(String, nullable=True)
+    # Seed of the train/test split, so a retrain can rebuild the test rows its lineage never trained on
+    split_seed = Column(Integer, nullable=True)
+
+class ModelAlias(Base):
+    __tablename__ = "model_aliases"
+    name = Column(String, primary_key=True)
+    alias = Column(String, primary_key=True)
+    model_id = Column(Integer)
+    previous_model_id = Column(Integer, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
 class Feedback(Base):
     __tablename__ = "feedback"
     id = Column(Integer, primary_key=True, index=True)
-    input_data = Column(Text)
+    input_data = Column(JSON().with_variant(JSONB(), "postgresql"))
     prediction = Column(String)
     user_correction = Column(String, nullable=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    model_name = Column(String, index=True, nullable=True)
+    model_version = Column(Integer, nullable=True)
+    __table_args__ = (
+        # "Corrections for model Y since id/time X": partial indexes that only hold corrected rows
+        Index("ix_feedback_model_corrected_id", "model_name", "id",
+              sqlite_where=text("user_correction IS NOT NULL"), postgresql_where=text("user_correction IS NOT NULL")),
+        Index("ix_feedback_model_corrected_time", "model_name", "timestamp",
+              sqlite_where=text("user_correction IS NOT NULL"), postgresql_where=text("user_correction IS NOT NULL")),
+    )
+
+class RetrainRun(Base):
+    __tablename__ = "retrain_runs"
+    id = Column(Integer, primary_key=True, index=True)
+    model_name = Column(String, index=True)
+    base_version = Column(Integer, nullable=True)
+    version = Column(Integer, nullable=True)
+    mode = Column(String, nullable=True)
+    # Feedback ids in (feedback_from_id, feedback_to_id]; the highest completed feedback_to_id is the high-water mark.
+    # Failed runs and rejected ones (a retrained version that scored worse and wasn't promoted) don't advance it
+    feedback_from_id = Column(Integer, default=0)
+    feedback_to_id = Column(Integer, default=0)
+    feedback_rows = Column(Integer, default=0)
+    dataset_rows = Column(Integer, default=0)
+    rows_consumed = Column(Integer, default=0)
+    # Base and retrained versions scored on the same unseen rows; only a version that holds up is promoted
+    holdout_rows = Column(Integer, nullable=True)
+    base_score = Column(Float, nullable=True)
+    score = Column(Float, nullable=True)
+    promoted = Column(Boolean, nullable=True)
+    status = Column(String, default="completed")
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class TrainingJob(Base):
+    __tablename__ = "training_jobs"
+    id = Column(String, primary_key=True, index=True)
+    dataset = Column(String, index=True)
+    status = Column(String, index=True, default="queued")
+    stage = Column(String, nullable=True)
+    progress = Column(Float, default=0.0)
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+def _add_missing_columns():
+    # create_all never alters existing tables; add new nullable columns to databases created earlier
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    col_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {col_type}'))
+                    print(f"🛠️ Added column {table.name}.{column.name}")
+
+def _add_missing_indexes():
+    # Same for indexes declared after a table was created
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine)
+                print(f"🛠️ Added index {index.name}")
+
+class _NonFiniteNames(ast.NodeTransformer):
+    # repr() writes NaN/infinity as bare names, which literal_eval rejects
+    def visit_Name(self, node):
+        if node.id in ("nan", "inf"):
+            return ast.copy_location(ast.Constant(float(node.id)), node)
+        return node
+
+def _is_json(raw: str) -> bool:
+    try:
+        json.loads(raw)
+        return True
+    except ValueError:
+        return False
+
+def _migrate_feedback_json(batch_size: int = 1000):
+    """Rewrite feedback.input_data rows that aren't JSON (Python dict reprs) as JSON, then make the column JSONB on Postgres."""
+    inspector = inspect(engine)
+    if not inspector.has_table("feedback"):
+        return
+    column = next(col for col in inspector.get_columns("feedback") if col["name"] == "input_data")
+    if engine.dialect.name == "postgresql" and not isinstance(column["type"], Text):
+        return  # already JSONB
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            rows = conn.execute(text("SELECT id, input_data FROM feedback "
+                                     "WHERE input_data IS NOT NULL AND json_valid(input_data) = 0")).fetchall()
+        else:
+            # One-time scan: once the column is JSONB the database validates every write
+            rows = [row for row in conn.execute(text("SELECT id, input_data FROM feedback WHERE input_data IS NOT NULL"))
+                    if not _is_json(row[1])]
+        updates, failed = [], 0
+        for row_id, raw in rows:
+            try:
+                data = _json_dumps(ast.literal_eval(_NonFiniteNames().visit(ast.parse(raw, mode="eval"))))
+            except (ValueError, SyntaxError):
+                data, failed = "null", failed + 1
+            updates.append({"id": row_id, "data": data})
+            if len(updates) >= batch_size:
+                conn.execute(text("UPDATE feedback SET input_data = :data WHERE id = :id"), updates)
+                updates = []
+        if updates:
+            conn.execute(text("UPDATE feedback SET input_data = :data WHERE id = :id"), updates)
+        if rows:
+            print(f"🛠️ Converted {len(rows)} feedback rows to JSON ({failed} unparseable, stored as null)")
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("ALTER TABLE feedback ALTER COLUMN input_data TYPE JSONB USING input_data::jsonb"))
+            print("🛠️ Converted feedback.input_data to JSONB")
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    _add_missing_indexes()
+    _migrate_feedback_json()
+
+def save_model_metadata(name, accuracy, path, **fields):
+    with session_scope() as session:
+        metadata = ModelMetadata(name=name, accuracy=accuracy, filepath=path, **fields)
+        session.add(metadata)
+        session.flush()
+        return metadata.id
+
+def record_model_load(path: str, seconds: float):
+    """Store the measured load time of the artifact at `path` on its ModelMetadata row."""
+    with session_scope() as session:
+        session.query(ModelMetadata).filter(ModelMetadata.filepath == path).update(
+            {ModelMetadata.load_seconds: seconds}, synchronize_session=False)
+
+def log_model_candidates(rows: list):
+    """Bulk-insert ModelMetadata rows (dicts of column values) for evaluated search candidates."""
+    if not rows:
+        return
+    with session_scope() as session:
+        session.bulk_insert_mappings(ModelMetadata, rows)
+
+def feedback_high_water_marks(session) -> dict:
+    """Last feedback id consumed by a completed (promoted) retrain, per model name."""
+    rows = session.query(RetrainRun.model_name, func.max(RetrainRun.feedback_to_id)) \
+        .filter(RetrainRun.status == "completed").group_by(RetrainRun.model_name).all()
+    return {name: hwm or 0 for name, hwm in rows}
+
+def get_feedback_stats(min_feedback: int = RETRAIN_MIN_FEEDBACK) -> dict:
+    """Corrected feedback rows not yet consumed by a retrain, per model, and whether any model is due."""
+    with session_scope() as session:
+        hwm = session.query(RetrainRun.model_name, func.max(RetrainRun.feedback_to_id).label("hwm")) \
+            .filter(RetrainRun.status == "completed").group_by(RetrainRun.model_name).subquery()
+        rows = session.query(Feedback.model_name, func.count(Feedback.id)) \
+            .outerjoin(hwm, hwm.c.model_name == Feedback.model_name) \
+            .filter(Feedback.user_correction.isnot(None), Feedback.model_name.isnot(None),
+                    Feedback.id > func.coalesce(hwm.c.hwm, 0)) \
+            .group_by(Feedback.model_name).all()
+    pending = {name: count for name, count in rows}
+    return {
+        "feedback_count": sum(pending.values()),
+        "pending_by_model": pending,
+        "should_retrain": any(count >= min_feedback for count in pending.values()),
+    }
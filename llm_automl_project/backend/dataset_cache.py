@@ -0,0 +1,156 @@
+import os
+import sys
+import json
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+if CURRENT_DIR not in sys.path:
+    sys.path.insert(0, CURRENT_DIR)
+
+from utils import file_sha256, iter_dataset, read_dataset_file, STREAMABLE_FORMATS
+
+load_dotenv()
+
+DATASET_CACHE_ENABLED = os.getenv("DATASET_CACHE_ENABLED", "1") == "1"
+CACHE_DIRNAME = ".parquet_cache"
+
+
+def _cache_paths(file_path: str) -> tuple:
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(file_path)), CACHE_DIRNAME)
+    name = os.path.basename(file_path)
+    return os.path.join(cache_dir, name + ".parquet"), os.path.join(cache_dir, name + ".json")
+
+
+def _read_manifest(manifest_path: str) -> dict:
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, data: dict):
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def dataset_sha256(file_path: str) -> str:
+    """Content hash of a dataset, reusing the cache manifest when the file's mtime and size are unchanged."""
+    manifest = _read_manifest(_cache_paths(file_path)[1])
+    stat = os.stat(file_path)
+    if manifest and manifest["mtime_ns"] == stat.st_mtime_ns and manifest["size"] == stat.st_size:
+        return manifest["sha256"]
+    return file_sha256(file_path)
+
+
+def cached_parquet_path(file_path: str) -> str:
+    """Return the Parquet cache for `file_path` if it matches the file's current content, else None."""
+    parquet_path, manifest_path = _cache_paths(file_path)
+    manifest = _read_manifest(manifest_path)
+    if manifest is None or not os.path.exists(parquet_path):
+        return None
+    stat = os.stat(file_path)
+    if manifest["mtime_ns"] == stat.st_mtime_ns and manifest["size"] == stat.st_size:
+        return parquet_path
+    # Touched but possibly identical: only a content hash decides
+    if manifest["size"] == stat.st_size and file_sha256(file_path) == manifest["sha256"]:
+        _write_json(manifest_path, {**manifest, "mtime_ns": stat.st_mtime_ns})
+        return parquet_path
+    return None
+
+
+def _to_arrow(df: pd.DataFrame) -> pa.Table:
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # Mixed-type object columns have no Arrow type; store them as strings
+        df = df.copy()
+        for col in df.select_dtypes(include="object").columns:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _write_streaming(file_path: str, parquet_path: str) -> int:
+    writer, rows = None, 0
+    try:
+        for chunk in iter_dataset(file_path, use_cache=False):
+            table = _to_arrow(chunk)
+            if writer is None:
+                writer = pq.ParquetWriter(parquet_path, table.schema)
+            elif table.schema != writer.schema:
+                # Chunk-level inference can disagree (e.g. int vs float); cast to the first chunk's schema
+                table = table.cast(writer.schema)
+            writer.write_table(table)
+            rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def build_parquet_cache(file_path: str) -> str:
+    """Convert a dataset into a typed Parquet file next to it and record its content hash."""
+    parquet_path, manifest_path = _cache_paths(file_path)
+    os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+    stat = os.stat(file_path)
+    sha256 = file_sha256(file_path)
+    tmp = f"{parquet_path}.{uuid.uuid4().hex}.tmp"
+    ext = os.path.splitext(file_path)[1].lower()
+    print(f"🗜️ Building columnar cache for {os.path.basename(file_path)}")
+    try:
+        try:
+            if ext not in STREAMABLE_FORMATS:
+                raise ValueError("not streamable")
+            rows = _write_streaming(file_path, tmp)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, ValueError):
+            # Chunks whose types can't be reconciled (or formats that can't stream) are converted in one go
+            table = _to_arrow(read_dataset_file(file_path))
+            pq.write_table(table, tmp)
+            rows = table.num_rows
+        os.replace(tmp, parquet_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    schema = pq.read_schema(parquet_path)
+    _write_json(manifest_path, {
+        "source": os.path.basename(file_path),
+        "sha256": sha256,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "rows": rows,
+        "columns": {field.name: str(field.type) for field in schema if field.name != "__index_level_0__"},
+    })
+    return parquet_path
+
+
+def link_cached_dataset(src_path: str, dst_path: str):
+    """Give `dst_path` (a hard link of `src_path`) the source's columnar cache without rebuilding it."""
+    src_parquet = cached_parquet_path(src_path)
+    if src_parquet is None:
+        return
+    dst_parquet, dst_manifest = _cache_paths(dst_path)
+    tmp = f"{dst_parquet}.{uuid.uuid4().hex}.tmp"
+    os.link(src_parquet, tmp)
+    os.replace(tmp, dst_parquet)
+    stat = os.stat(dst_path)
+    manifest = _read_manifest(_cache_paths(src_path)[1])
+    _write_json(dst_manifest, {**manifest, "source": os.path.basename(dst_path),
+                               "mtime_ns": stat.st_mtime_ns, "size": stat.st_size})
+
+
+def ensure_parquet_cache(file_path: str) -> str:
+    if os.path.splitext(file_path)[1].lower() == ".parquet":
+        return file_path
+    return cached_parquet_path(file_path) or build_parquet_cache(file_path)
+
+
+def load_cached_dataset(file_path: str, columns: list = None) -> pd.DataFrame:
+    """Memory-mapped columnar read of a dataset, loading only `columns` when given."""
+    return pd.read_parquet(ensure_parquet_cache(file_path), columns=columns, memory_map=True)
@@ -1,40 +1,164 @@
 import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import sys
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import seaborn as sns
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from fpdf import FPDF
 
-def generate_eda_report(df: pd.DataFrame, output_dir: str = "data/eda_report"):
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+if CURRENT_DIR not in sys.path:
+    sys.path.insert(0, CURRENT_DIR)
+
+from dataset_cache import dataset_sha256
+from approx_stats import sample_rows, EDA_ROW_BUDGET
+
+EDA_WORKERS = int(os.getenv("EDA_WORKERS", os.cpu_count() or 1))
+EDA_PARALLEL_MIN_COLUMNS = int(os.getenv("EDA_PARALLEL_MIN_COLUMNS", 16))
+EDA_MAX_CATEGORIES = int(os.getenv("EDA_MAX_CATEGORIES", 50))
+
+
+def _chart_filename(col) -> str:
+    # The slug keeps names readable; the hash of the original name keeps "a b" and "a_b" apart
+    digest = hashlib.sha1(str(col).encode()).hexdigest()[:8]
+    return re.sub(r"[^\w.-]+", "_", str(col)) + f"_{digest}_hist.png"
+
+
+def _plot_spec(series: pd.Series):
+    """
+    Decide how to chart a column, or why it is skipped.
+
+    Returns (kind, payload): ("hist", values), ("bar", value_counts) or ("skip", reason).
+    """
+    values = series.dropna()
+    if values.empty:
+        return "skip", "all values missing"
+    n_unique = values.nunique()
+    if n_unique <= 1:
+        return "skip", "constant column"
+    if pd.api.types.is_bool_dtype(values):
+        return "bar", values.value_counts()
+    if pd.api.types.is_numeric_dtype(values):
+        # A unique integer column that is sorted or named like a key is a row id, not a distribution
+        if pd.api.types.is_integer_dtype(values) and n_unique == len(values) and (
+            values.is_monotonic_increasing or re.search(r"(^|_)id$|ID$|Id$", str(series.name))
+        ):
+            return "skip", "identifier column"
+        return "hist", values.to_numpy()
+    if n_unique > EDA_MAX_CATEGORIES:
+        return "skip", f"high cardinality ({n_unique} distinct values)"
+    return "bar", values.astype(str).value_counts()
+
+
+def _render_chart(col, kind: str, payload, output_dir: str, title_suffix: str = ""):
+    """Render one chart with the object-oriented Agg API (no pyplot state), safe in parallel workers."""
+    start = time.perf_counter()
+    try:
+        fig = Figure(figsize=(6, 4))
+        ax = fig.subplots()
+        if kind == "hist":
+            ax.hist(payload, bins=20, edgecolor="black")
+        else:
+            ax.bar(payload.index.astype(str), payload.values, edgecolor="black")
+            ax.tick_params(axis="x", labelrotation=45)
+        ax.set_title(f"Distribution of {col}{title_suffix}")
+        ax.set_xlabel(str(col))
+        ax.set_ylabel("Frequency")
+        fig.tight_layout()
+        filepath = os.path.join(output_dir, _chart_filename(col))
+        fig.savefig(filepath)
+        return col, filepath, time.perf_counter() - start, None
+    except Exception as e:
+        return col, None, time.perf_counter() - start, str(e)
+
+
+def _render_heatmap(numeric_df: pd.DataFrame, output_dir: str, title_suffix: str = ""):
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots()
+    corr = numeric_df.corr()
+    # Annotations are unreadable past a couple dozen columns
+    sns.heatmap(corr, annot=corr.shape[1] <= 20, cmap="coolwarm", fmt=".2f", ax=ax)
+    ax.set_title(f"Correlation Heatmap{title_suffix}")
+    fig.tight_layout()
+    fig.savefig(os.path.join(output_dir, "correlation_heatmap.png"))
+
+
+def generate_eda_report(df: pd.DataFrame, output_dir: str = "data/eda_report", workers: int = EDA_WORKERS,
+                        row_budget: int = EDA_ROW_BUDGET) -> dict:
+    """
+    Render per-column distribution charts and a correlation heatmap into `output_dir`.
+
+    Charts are rendered across a process pool when there are enough columns to amortize
+    worker start-up. Columns where a distribution plot is meaningless (constant, all
+    missing, identifiers, high-cardinality strings) are skipped. Frames longer than
+    `row_budget` are charted from a uniform row sample and the charts are labeled
+    as approximate; pass `row_budget=None` for exact charts.
+
+    Returns:
+        dict: Output directory, chart paths, skipped columns with reasons, per-chart timings
+        and whether the charts are approximate.
+    """
     os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
 
+    # Frames from utils.load_dataset_sample are already samples of a larger file
+    total_rows = df.attrs.get("total_rows", len(df))
+    df = sample_rows(df, row_budget)
+    approximate = len(df) < total_rows
+    title_suffix = f" (approx., {len(df):,} of {total_rows:,} rows)" if approximate else ""
+
+    tasks, skipped = [], {}
     for col in df.columns:
-        try:
-            plt.figure(figsize=(6, 4))
-            df[col].dropna().hist(bins=20, edgecolor='black')
-            plt.title(f"Distribution of {col}")
-            plt.xlabel(col)
-            plt.ylabel("Frequency")
-            filepath = os.path.join(output_dir, f"{col}_hist.png")
-            plt.savefig(filepath)
-            plt.close()
-        except Exception as e:
-            print(f"⚠️ Could not plot histogram for {col}: {e}")
+        kind, payload = _plot_spec(df[col])
+        if kind == "skip":
+            skipped[str(col)] = payload
+        else:
+            tasks.append((col, kind, payload, output_dir, title_suffix))
+
+    if workers > 1 and len(tasks) >= EDA_PARALLEL_MIN_COLUMNS:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(_render_chart, *zip(*tasks), chunksize=max(1, len(tasks) // (workers * 4))))
+    else:
+        results = [_render_chart(*task) for task in tasks]
+
+    charts, timings = [], {}
+    for col, filepath, seconds, error in results:
+        timings[str(col)] = round(seconds, 4)
+        if error:
+            print(f"⚠️ Could not plot histogram for {col}: {error}")
+        else:
+            charts.append(filepath)
 
     # Correlation heatmap
     try:
         numeric_df = df.select_dtypes(include=["number"])
         if numeric_df.shape[1] >= 2:
-            plt.figure(figsize=(10, 8))
-            corr = numeric_df.corr()
-            sns.heatmap(corr, annot=True, cmap='coolwarm', fmt=".2f")
-            plt.title("Correlation Heatmap")
-            plt.tight_layout()
-            plt.savefig(os.path.join(output_dir, "correlation_heatmap.png"))
-            plt.close()
+            heatmap_start = time.perf_counter()
+            _render_heatmap(numeric_df, output_dir, title_suffix)
+            timings["correlation_heatmap"] = round(time.perf_counter() - heatmap_start, 4)
+            charts.append(os.path.join(output_dir, "correlation_heatmap.png"))
     except Exception as e:
         print(f"⚠️ Could not generate heatmap: {e}")
 
-    return f"EDA report images saved to: {output_dir}"
+    total = time.perf_counter() - started
+    print(f"📊 Rendered {len(charts)} EDA charts in {total:.2f}s ({len(skipped)} columns skipped)")
+    return {
+        "output_dir": output_dir,
+        "charts": charts,
+        "skipped": skipped,
+        "timings": timings,
+        "total_seconds": round(total, 4),
+        "approximate": approximate,
+        "rows": total_rows,
+        "sample_rows": len(df),
+    }
 
 
 def export_eda_to_pdf(output_dir: str = "data/eda_report", output_pdf: str = "data/eda_report.pdf"):
@@ -55,3 +179,93 @@ def export_eda_to_pdf(output_dir: str = "data/eda_report", output_pdf: str = "da
 
     pdf.output(output_pdf)
     return output_pdf
+
+
+EDA_CACHE_DIR = os.getenv("EDA_CACHE_DIR", "data/eda_cache")
+EDA_CACHE_MAX_ENTRIES = int(os.getenv("EDA_CACHE_MAX_ENTRIES", 50))
+EDA_CACHE_MAX_MB = float(os.getenv("EDA_CACHE_MAX_MB", 2048))
+# Bump when chart rendering changes so stale artifacts are not served
+EDA_CACHE_VERSION = "2"
+
+
+def eda_fingerprint(dataset_path: str) -> str:
+    """Fingerprint of the dataset content plus every setting that changes the rendered artifacts."""
+    settings = json.dumps(
+        {"version": EDA_CACHE_VERSION, "max_categories": EDA_MAX_CATEGORIES, "row_budget": EDA_ROW_BUDGET},
+        sort_keys=True,
+    )
+    return hashlib.sha256(f"{dataset_sha256(dataset_path)}:{settings}".encode()).hexdigest()
+
+
+def _dir_size(path: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def _evict_eda_cache(cache_dir: str, keep: str):
+    """Drop least-recently-used entries until the cache fits its entry and byte budgets."""
+    entries = []
+    for entry in os.scandir(cache_dir):
+        manifest = os.path.join(entry.path, "manifest.json")
+        if entry.is_dir() and os.path.exists(manifest):
+            entries.append((os.path.getmtime(manifest), entry.path, _dir_size(entry.path)))
+    entries.sort()
+    total = sum(size for _, _, size in entries)
+    max_bytes = EDA_CACHE_MAX_MB * 1024 * 1024
+    while entries and (len(entries) > EDA_CACHE_MAX_ENTRIES or total > max_bytes):
+        _, path, size = entries.pop(0)
+        if os.path.basename(path) == keep:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        print(f"♻️ Evicted EDA cache entry: {path}")
+
+
+def generate_cached_eda_report(dataset_path: str, load_fn, cache_dir: str = EDA_CACHE_DIR) -> dict:
+    """
+    Return EDA charts and PDF for a dataset, rendering them only when its fingerprint is new.
+
+    Each fingerprint gets its own directory, built in a temporary directory and renamed
+    into place, so concurrent requests never overwrite each other's charts. `load_fn`
+    is only called on a cache miss.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    key = eda_fingerprint(dataset_path)
+    entry_dir = os.path.join(cache_dir, key)
+    manifest_path = os.path.join(entry_dir, "manifest.json")
+
+    if os.path.exists(manifest_path):
+        os.utime(manifest_path)  # mark as recently used
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        print(f"⚡ Using cached EDA report for {os.path.basename(dataset_path)}")
+        return {**manifest, "cached": True}
+
+    tmp_dir = tempfile.mkdtemp(prefix=f".{key[:12]}-", dir=cache_dir)
+    try:
+        report = generate_eda_report(load_fn(dataset_path), output_dir=tmp_dir)
+        export_eda_to_pdf(output_dir=tmp_dir, output_pdf=os.path.join(tmp_dir, "eda_report.pdf"))
+        manifest = {
+            "fingerprint": key,
+            "dataset": os.path.basename(dataset_path),
+            "eda_dir": entry_dir,
+            "eda_pdf": os.path.join(entry_dir, "eda_report.pdf"),
+            "charts": [os.path.join(entry_dir, os.path.basename(p)) for p in report["charts"]],
+            "skipped": report["skipped"],
+            "timings": report["timings"],
+            "approximate": report["approximate"],
+            "rows": report["rows"],
+            "sample_rows": report["sample_rows"],
+        }
+        with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Another request finished the same fingerprint first; its artifacts are identical
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    _evict_eda_cache(cache_dir, keep=key)
+    return {**manifest, "cached": False}
@@ -4,6 +4,8 @@ from scipy.stats import skew
 from dotenv import load_dotenv
 import os
 
+from backend.approx_stats import approximate_profile, sample_rows, EDA_ROW_BUDGET
+
 # Optional: LLM fallback
 try:
     from backend.llm_generator import deepseek_fallback
@@ -13,7 +15,42 @@ except ImportError:
 load_dotenv()
 
 
-def explain_numeric_summary(df: pd.DataFrame) -> str:
+def _skew_note(skewness: float) -> str:
+    if abs(skewness) > 1:
+        return " → ⚠️ Highly skewed"
+    if abs(skewness) > 0.5:
+        return " → ⚠️ Moderately skewed"
+    return ""
+
+
+def explain_numeric_summary_approx(df: pd.DataFrame, row_budget: int = EDA_ROW_BUDGET) -> str:
+    """One-pass version of explain_numeric_summary: streaming moments, sketched medians and distinct counts."""
+    numeric_df = df.select_dtypes(include=np.number)
+    if numeric_df.empty:
+        return "No numeric features found in the dataset."
+
+    profile = approximate_profile(numeric_df, row_budget=row_budget)
+    bounds = profile["error_bounds"]
+    report = [
+        f"ℹ️ *Approximate summary over {profile['rows']:,} rows: mean/std/skewness are one-pass exact, "
+        f"medians are within ±{bounds['quantile_rank_error']:.1%} rank and distinct counts within "
+        f"±{bounds['distinct_relative_error']:.1%}.*"
+    ]
+    for col, stats in profile["columns"].items():
+        line = (
+            f"📊 **{col}**: mean={stats['mean']:.2f}, std={stats['std']:.2f}, "
+            f"min={stats['min']:.2f}, max={stats['max']:.2f}, median≈{stats['median']:.2f}, "
+            f"distinct≈{stats['distinct']:,}, skewness={stats['skewness']:.2f}"
+        )
+        report.append(line + _skew_note(stats["skewness"]))
+
+    return "\n".join(report)
+
+
+def explain_numeric_summary(df: pd.DataFrame, approximate: bool = False) -> str:
+    if approximate:
+        return explain_numeric_summary_approx(df)
+
     report = []
     numeric_df = df.select_dtypes(include=np.number)
 
@@ -27,11 +64,7 @@ def explain_numeric_summary(df: pd.DataFrame) -> str:
             f"📊 **{col}**: mean={stats['mean']:.2f}, std={stats['std']:.2f}, "
             f"min={stats['min']:.2f}, max={stats['max']:.2f}, skewness={skewness:.2f}"
         )
-        if abs(skewness) > 1:
-            line += " → ⚠️ Highly skewed"
-        elif abs(skewness) > 0.5:
-            line += " → ⚠️ Moderately skewed"
-        report.append(line)
+        report.append(line + _skew_note(skewness))
 
     return "\n".join(report)
 
@@ -47,8 +80,11 @@ def explain_missing_data(df: pd.DataFrame) -> str:
     return "\n".join(report) or "✅ No missing values found."
 
 
-def explain_correlations(df: pd.DataFrame) -> str:
-    corr = df.select_dtypes(include=np.number).corr()
+def explain_correlations(df: pd.DataFrame, approximate: bool = False) -> str:
+    numeric_df = df.select_dtypes(include=np.number)
+    if approximate:
+        numeric_df = sample_rows(numeric_df)
+    corr = numeric_df.corr()
     report = []
     threshold = 0.75
     for col1 in corr.columns:
@@ -58,14 +94,18 @@ def explain_correlations(df: pd.DataFrame) -> str:
     return "\n".join(report) or "✅ No highly correlated feature pairs."
 
 
-def generate_explanations(df: pd.DataFrame) -> str:
+def generate_explanations(df: pd.DataFrame, approximate: bool = None) -> str:
+    # Large frames switch to the sampled / one-pass mode unless told otherwise
+    if approximate is None:
+        approximate = len(df) > EDA_ROW_BUDGET
+    suffix = " (approximate)" if approximate else ""
     explanations = [
-        "### 🧠 Data Summary Explanation",
-        explain_numeric_summary(df),
+        f"### 🧠 Data Summary Explanation{suffix}",
+        explain_numeric_summary(df, approximate=approximate),
         "\n### ❓ Missing Values Analysis",
         explain_missing_data(df),
-        "\n### 🔍 Correlation Insights",
-        explain_correlations(df),
+        f"\n### 🔍 Correlation Insights{suffix}",
+        explain_correlations(df, approximate=approximate),
     ]
 
     return "\n\n".join(explanations)
@@ -0,0 +1,139 @@
+import os
+import sys
+import json
+import uuid
+import threading
+from datetime import datetime, timedelta
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+if CURRENT_DIR not in sys.path:
+    sys.path.insert(0, CURRENT_DIR)
+
+try:
+    from database import Feedback, session_scope, feedback_high_water_marks
+except ModuleNotFoundError as e:
+    print("❌ Import failed:", e)
+    raise
+
+load_dotenv()
+
+FEEDBACK_ARCHIVE_DIR = os.path.abspath(os.getenv("FEEDBACK_ARCHIVE_DIR", os.path.join(CURRENT_DIR, "../data/feedback_archive")))
+FEEDBACK_HOT_DAYS = int(os.getenv("FEEDBACK_HOT_DAYS", 30))  # feedback older than this leaves the database
+FEEDBACK_ARCHIVE_BATCH = int(os.getenv("FEEDBACK_ARCHIVE_BATCH", 10000))
+
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("timestamp", pa.timestamp("us")),
+    ("model_name", pa.string()),
+    ("model_version", pa.int64()),
+    ("prediction", pa.string()),
+    ("user_correction", pa.string()),
+    ("input_data", pa.string()),  # JSON text: feature sets differ between models
+])
+
+_archive_lock = threading.Lock()
+
+
+def _partition_dir(timestamp: datetime) -> str:
+    # Monthly rollover: one hive-style partition per calendar month
+    return os.path.join(FEEDBACK_ARCHIVE_DIR, f"month={timestamp:%Y-%m}")
+
+
+def _write_part(partition: str, rows: list) -> str:
+    os.makedirs(partition, exist_ok=True)
+    table = pa.Table.from_pylist(rows, schema=ARCHIVE_SCHEMA)
+    path = os.path.join(partition, f"part-{rows[0]['id']}-{rows[-1]['id']}.parquet")
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+    return path
+
+
+def compact_partition(partition: str) -> int:
+    """Merge a partition's part files into one sorted, deduplicated file; returns its row count."""
+    parts = sorted(os.path.join(partition, f) for f in os.listdir(partition) if f.endswith(".parquet"))
+    if len(parts) <= 1:
+        return pq.read_metadata(parts[0]).num_rows if parts else 0
+    df = pd.concat([pq.read_table(p, schema=ARCHIVE_SCHEMA).to_pandas() for p in parts], ignore_index=True)
+    # A run interrupted between writing a part and deleting its rows archives them twice
+    df = df.drop_duplicates(subset="id").sort_values("id")
+    path = os.path.join(partition, f"part-{df['id'].iloc[0]}-{df['id'].iloc[-1]}.parquet")
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    pq.write_table(pa.Table.from_pandas(df, schema=ARCHIVE_SCHEMA, preserve_index=False), tmp, compression="zstd")
+    os.replace(tmp, path)
+    for part in parts:
+        if part != path:
+            os.remove(part)
+    print(f"🗜️ Compacted {len(parts)} feedback parts into {os.path.relpath(path, FEEDBACK_ARCHIVE_DIR)}")
+    return len(df)
+
+
+def archive_feedback(older_than_days: int = FEEDBACK_HOT_DAYS, batch_size: int = FEEDBACK_ARCHIVE_BATCH) -> dict:
+    """
+    Move feedback older than `older_than_days` from the database into monthly Parquet partitions.
+
+    Corrections a model hasn't been retrained on yet (above its high-water mark) stay in the
+    database. Each batch is written to its partitions before its rows are deleted, and touched
+    partitions are compacted into a single file at the end.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    archived = kept = 0
+    touched = set()
+    with _archive_lock:
+        with session_scope() as session:
+            hwm = feedback_high_water_marks(session)
+            # Never remove the newest row: SQLite would hand its id out again, behind the high-water marks
+            max_id = session.query(Feedback.id).order_by(Feedback.id.desc()).limit(1).scalar() or 0
+            last_id = 0
+            while True:
+                batch = session.query(Feedback).filter(
+                    Feedback.timestamp < cutoff, Feedback.id > last_id, Feedback.id < max_id
+                ).order_by(Feedback.id).limit(batch_size).all()
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                partitions = {}
+                for row in batch:
+                    if row.user_correction is not None and row.model_name is not None \
+                            and row.id > hwm.get(row.model_name, 0):
+                        kept += 1
+                        continue
+                    partitions.setdefault(_partition_dir(row.timestamp), []).append({
+                        "id": row.id, "timestamp": row.timestamp, "model_name": row.model_name,
+                        "model_version": row.model_version, "prediction": row.prediction,
+                        "user_correction": row.user_correction,
+                        "input_data": json.dumps(row.input_data),
+                    })
+                ids = []
+                for partition, rows in partitions.items():
+                    _write_part(partition, rows)
+                    touched.add(partition)
+                    ids.extend(r["id"] for r in rows)
+                if ids:
+                    session.query(Feedback).filter(Feedback.id.in_(ids)).delete(synchronize_session=False)
+                    session.commit()
+                    archived += len(ids)
+                session.expunge_all()
+        for partition in touched:
+            compact_partition(partition)
+
+    print(f"📦 Archived {archived} feedback rows older than {older_than_days} days ({kept} pending corrections kept)")
+    return {"archived": archived, "kept": kept, "cutoff": cutoff.isoformat(),
+            "partitions": sorted(os.path.basename(p) for p in touched)}
+
+
+def read_feedback_archive(model_name: str = None, since: datetime = None, columns: list = None) -> pd.DataFrame:
+    """Archived feedback, reading only the partitions and row groups that can match the filters."""
+    if not os.path.isdir(FEEDBACK_ARCHIVE_DIR):
+        return pd.DataFrame(columns=columns or ARCHIVE_SCHEMA.names)
+    filters = []
+    if model_name is not None:
+        filters.append(("model_name", "==", model_name))
+    if since is not None:
+        filters.append(("month", ">=", f"{since:%Y-%m}"))
+        filters.append(("timestamp", ">=", pd.Timestamp(since)))
+    return pd.read_parquet(FEEDBACK_ARCHIVE_DIR, columns=columns, filters=filters or None, partitioning="hive")
@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import threading
+from datetime import datetime
+from dotenv import load_dotenv
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+if CURRENT_DIR not in sys.path:
+    sys.path.insert(0, CURRENT_DIR)
+
+try:
+    from database import Feedback, session_scope
+except ModuleNotFoundError as e:
+    print("❌ Import failed:", e)
+    raise
+
+load_dotenv()
+
+FEEDBACK_QUEUE_MAXSIZE = int(os.getenv("FEEDBACK_QUEUE_MAXSIZE", 10000))
+FEEDBACK_BATCH_SIZE = int(os.getenv("FEEDBACK_BATCH_SIZE", 500))
+FEEDBACK_FLUSH_INTERVAL = float(os.getenv("FEEDBACK_FLUSH_INTERVAL", 1.0))
+FEEDBACK_ENQUEUE_TIMEOUT = float(os.getenv("FEEDBACK_ENQUEUE_TIMEOUT", 0.5))
+FEEDBACK_MAX_RETRIES = int(os.getenv("FEEDBACK_MAX_RETRIES", 5))  # failed flushes before a batch is given up on
+FEEDBACK_DEAD_LETTER_PATH = os.path.abspath(os.getenv(
+    "FEEDBACK_DEAD_LETTER_PATH", os.path.join(CURRENT_DIR, "../data/feedback_dead_letter.jsonl")))
+
+
+class FeedbackQueueFull(Exception):
+    """Raised when the feedback buffer stays full for longer than the enqueue timeout."""
+
+
+class FeedbackWriter:
+    """
+    Write-behind buffer for Feedback rows.
+
+    Callers enqueue plain dicts and return immediately; a daemon thread persists them
+    with one bulk insert per batch, flushing when `batch_size` rows are pending or
+    `flush_interval` seconds have passed. The queue is bounded, so a stalled database
+    pushes back on producers instead of growing memory without limit.
+
+    A batch that still fails after `max_retries` flushes (or at shutdown) is inserted row
+    by row, so one bad row can't hold back the rest; rows that fail on their own are
+    appended to a JSONL dead-letter file with the error, for inspection or replay.
+    """
+
+    def __init__(self, maxsize: int = FEEDBACK_QUEUE_MAXSIZE, batch_size: int = FEEDBACK_BATCH_SIZE,
+                 flush_interval: float = FEEDBACK_FLUSH_INTERVAL, enqueue_timeout: float = FEEDBACK_ENQUEUE_TIMEOUT,
+                 max_retries: int = FEEDBACK_MAX_RETRIES, dead_letter_path: str = FEEDBACK_DEAD_LETTER_PATH):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.max_retries = max(1, max_retries)
+        self.dead_letter_path = dead_letter_path
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._atexit_registered = False
+        self.enqueued = 0
+        self.flushed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.dead_lettered = 0
+
+    def start(self):
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    def stop(self, timeout: float = 30.0):
+        """Stop the flusher after draining every queued row."""
+        if not self._thread:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def enqueue(self, record: dict):
+        if not self._thread:
+            self.start()
+        record.setdefault("timestamp", datetime.utcnow())
+        try:
+            self._queue.put(record, timeout=self.enqueue_timeout)
+        except queue.Full:
+            self.rejected += 1
+            raise FeedbackQueueFull(f"Feedback queue full ({self._queue.maxsize} rows pending)")
+        self.enqueued += 1
+
+    def _take_batch(self, timeout: float) -> list:
+        batch = []
+        deadline = time.monotonic() + timeout
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        pending, attempts = [], 0
+        while not (self._stop.is_set() and self._queue.empty() and not pending):
+            if len(pending) < self.batch_size:
+                pending.extend(self._take_batch(self.flush_interval if not self._stop.is_set() else 0))
+            if not pending:
+                continue
+            if self._flush(pending):
+                pending, attempts = [], 0
+                continue
+            attempts += 1
+            if attempts >= self.max_retries or self._stop.is_set():
+                self._salvage(pending)
+                pending, attempts = [], 0
+            else:
+                time.sleep(self.flush_interval)
+
+    def _insert(self, rows: list):
+        with session_scope() as session:
+            session.bulk_insert_mappings(Feedback, rows)
+        self.flushed += len(rows)
+
+    def _flush(self, rows: list) -> bool:
+        try:
+            self._insert(rows)
+        except Exception as e:
+            self.failed += 1
+            print(f"❌ Failed to flush {len(rows)} feedback rows: {e}")
+            return False
+        return True
+
+    def _salvage(self, rows: list):
+        """Insert a batch that keeps failing one row at a time; dead-letter the rows that still fail."""
+        dead = []
+        for row in rows:
+            try:
+                self._insert([row])
+            except Exception as e:
+                dead.append({"error": str(e), "row": row})
+        if dead:
+            self._dead_letter(dead)
+
+    def _dead_letter(self, entries: list):
+        self.dead_lettered += len(entries)
+        try:
+            os.makedirs(os.path.dirname(self.dead_letter_path), exist_ok=True)
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, default=str) + "\n")
+        except OSError as e:
+            print(f"❌ Dropping {len(entries)} feedback rows, dead-letter file unavailable: {e}")
+            return
+        print(f"☠️ Dead-lettered {len(entries)} feedback rows to {self.dead_letter_path}")
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "failed_flushes": self.failed,
+            "rejected": self.rejected,
+            "dead_lettered": self.dead_lettered,
+            "running": bool(self._thread and self._thread.is_alive()),
+        }
+
+
+FEEDBACK_WRITER = FeedbackWriter()
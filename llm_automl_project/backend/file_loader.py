@@ -1,5 +1,12 @@
 import pandas as pd
 import os
+import sys
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+if CURRENT_DIR not in sys.path:
+    sys.path.insert(0, CURRENT_DIR)
+
+from utils import iter_dataset, DATASET_MEMORY_BUDGET_MB
 
 def load_file(file_path: str):
     ext = os.path.splitext(file_path)[-1].lower()
@@ -17,3 +24,8 @@ def load_file(file_path: str):
         return pd.read_csv(file_path, delimiter=None)
     else:
         raise ValueError(f"Unsupported file format: {ext}")
+
+
+def iter_file(file_path: str, chunksize: int = None, memory_budget_mb: float = DATASET_MEMORY_BUDGET_MB):
+    """Streaming counterpart of load_file: yields DataFrame chunks sized to the memory budget."""
+    return iter_dataset(file_path, chunksize=chunksize, memory_budget_mb=memory_budget_mb)
@@ -4,16 +4,15 @@ import pandas as pd
 import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
-import re
-from transformers import pipeline
 from nltk.tokenize import sent_tokenize
-from better_profanity import profanity
 from langdetect import detect
 from scipy.stats import entropy, kurtosis, skew
 from sklearn.impute import SimpleImputer
 
-# ✅ Load profanity words once
-profanity.load_censor_words()
+try:
+    from dataset_cache import load_cached_dataset
+except ImportError:
+    load_cached_dataset = None
 
 # ✅ Optional LLM fallback
 try:
@@ -21,11 +20,20 @@ try:
 except:
     deepseek_fallback = None
 
+try:
+    from backend.text_batch import correct_grammar_batch
+except ImportError:
+    correct_grammar_batch = None
+
+from backend.text_cleaning import clean_text_column
+
 def run_nlp_cleaner_tab():
     st.subheader("🧹 NLP Data Cleaner, Profiler, and Validator")
 
     DATA_DIR = "data"
-    files = [f for f in os.listdir(DATA_DIR) if f.endswith((".csv", ".json", ".xlsx"))]
+    # Dotfiles are internal (e.g. the upload index), never datasets
+    files = [f for f in os.listdir(DATA_DIR)
+             if f.endswith((".csv", ".json", ".xlsx")) and not f.startswith(".")]
 
     if not files:
         st.warning("No uploaded datasets found.")
@@ -34,15 +42,28 @@ def run_nlp_cleaner_tab():
     selected_file = st.selectbox("Choose a file", files)
 
     # Load data
-    if selected_file.endswith(".csv"):
-        df = pd.read_csv(os.path.join(DATA_DIR, selected_file))
-    elif selected_file.endswith(".xlsx"):
-        df = pd.read_excel(os.path.join(DATA_DIR, selected_file))
-    elif selected_file.endswith(".json"):
-        df = pd.read_json(os.path.join(DATA_DIR, selected_file))
-    else:
-        st.error("Unsupported file format.")
-        return
+    path = os.path.join(DATA_DIR, selected_file)
+    df = None
+    if load_cached_dataset is not None:
+        try:
+            df = load_cached_dataset(path)
+        except Exception as e:
+            # A failed cache build shouldn't take the tab down; the raw file is still readable
+            st.warning(f"⚠️ Columnar cache unavailable, reading the raw file instead: {e}")
+    if df is None:
+        try:
+            if selected_file.endswith(".csv"):
+                df = pd.read_csv(path)
+            elif selected_file.endswith(".xlsx"):
+                df = pd.read_excel(path)
+            elif selected_file.endswith(".json"):
+                df = pd.read_json(path)
+            else:
+                st.error("Unsupported file format.")
+                return
+        except Exception as e:
+            st.error(f"❌ Failed to load file: {e}")
+            return
 
     text_cols = df.select_dtypes(include="object").columns.tolist()
     num_cols = df.select_dtypes(include='number').columns.tolist()
@@ -95,45 +116,49 @@ def run_nlp_cleaner_tab():
         col = st.selectbox("Text column to clean", text_cols)
 
         df_cleaned = df.copy()
-        cleaned_texts = []
-        errors = []
-
-        def detect_offensive(text):
-            return profanity.contains_profanity(text)
-
-        def correct_grammar(text):
-            if deepseek_fallback:
-                try:
-                    return deepseek_fallback(f"Fix grammar and fluency:\n{text}")
-                except:
-                    return text
-            return text
-
-        def clean_entities(text):
-            return re.sub(r"\b(Mr\.|Mrs\.|Dr\.|Prof\.|Sir)\s\w+", "<NAME>", text)
-
-        limit = st.slider("Rows to clean", 1, min(500, len(df)), 10)
+        limit = st.slider("Rows to grammar-correct with the LLM", 1, len(df), min(10, len(df)))
 
         if st.button("🚀 Run Cleaning"):
             progress = st.progress(0)
-            for i, row in df.head(limit).iterrows():
-                text = str(row[col])
-                if detect_offensive(text):
-                    errors.append(("Offensive", i))
-                text = clean_entities(text)
-                text = correct_grammar(text)
-                cleaned_texts.append(text)
-                progress.progress((i + 1) / limit)
-
-            df_cleaned[col + "_cleaned"] = cleaned_texts
+            # Profanity flags and entity masking cover the whole column in one vectorized pass
+            rules = clean_text_column(df[col])
+            df_cleaned[col + "_offensive"] = rules["offensive"]
+            df_cleaned[col + "_cleaned"] = rules["cleaned"]
+            texts = df[col].head(limit)
+            cleaned_texts = rules["cleaned"].head(limit).tolist()
+
+            grammar = {"unique": 0, "requests": 0, "failed": 0}
+            if correct_grammar_batch is not None:
+                # Identical texts are corrected once; rows are packed into concurrent, rate-limited prompts
+                status = st.empty()
+                preview = st.empty()
+
+                def show_progress(done, total, results):
+                    # Write each finished batch back so the table fills in while the rest are in flight
+                    df_cleaned.loc[texts.index, col + "_cleaned"] = [results.get(t, t) for t in cleaned_texts]
+                    preview.dataframe(df_cleaned.loc[texts.index, [col, col + "_cleaned"]])
+                    progress.progress(done / total)
+                    status.text(f"Corrected {done}/{total} unique texts")
+
+                grammar = correct_grammar_batch(cleaned_texts, on_progress=show_progress)
+                cleaned_texts = grammar["texts"]
+            progress.progress(1.0)
+
+            df_cleaned.loc[texts.index, col + "_cleaned"] = cleaned_texts
             st.success("✅ Cleaning Done")
-            st.dataframe(df_cleaned[[col, col + "_cleaned"]])
+            if correct_grammar_batch is not None:
+                preview.empty()
+            st.dataframe(df_cleaned[[col, col + "_cleaned", col + "_offensive"]])
 
             st.markdown("### 📑 Cleaning Summary")
             st.json({
-                "Rows Processed": limit,
-                "Offensive Content": len([e for e in errors if e[0] == "Offensive"]),
-                "Entity Tags Rewritten": limit,
+                "Rows Processed": len(df),
+                "Offensive Content": int(rules["offensive"].sum()),
+                "Entity Tags Rewritten": int((rules["cleaned"] != df[col].fillna("").astype(str)).sum()),
+                "Rows Grammar-Corrected": limit,
+                "Unique Texts Corrected": grammar["unique"],
+                "LLM Requests": grammar["requests"],
+                "LLM Failures": grammar["failed"],
             })
 
             st.download_button("⬇️ Download Cleaned CSV", df_cleaned.to_csv(index=False),
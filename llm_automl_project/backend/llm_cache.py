@@ -0,0 +1,177 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_PATH = os.path.abspath(os.getenv("LLM_CACHE_PATH", os.path.join(CURRENT_DIR, "../data/llm_cache.sqlite")))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))  # seconds a response stays valid
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 5000))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", 50))
+LLM_CACHE_SEMANTIC = os.getenv("LLM_CACHE_SEMANTIC", "0") == "1"  # also serve near-duplicate prompts
+LLM_CACHE_SIMILARITY = float(os.getenv("LLM_CACHE_SIMILARITY", 0.98))  # cosine similarity a near-duplicate needs
+LLM_CACHE_EMBED_DIM = 512
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(text: str) -> str:
+    # Reruns differ only in spacing (padding in markdown tables, trailing newlines)
+    return _WHITESPACE.sub(" ", text or "").strip()
+
+
+def embed_prompt(text: str) -> np.ndarray:
+    """Hashed character-trigram set as a unit vector, used to find near-duplicate prompts."""
+    codes = np.frombuffer(normalize_prompt(text).lower().encode("utf-8"), dtype=np.uint8).astype(np.uint32)
+    vector = np.zeros(LLM_CACHE_EMBED_DIM, dtype=np.float32)
+    if len(codes) >= 3:
+        trigrams = (codes[:-2] << 16) | (codes[1:-1] << 8) | codes[2:]
+        buckets = (trigrams.astype(np.uint64) * 2654435761) % LLM_CACHE_EMBED_DIM
+        # Presence rather than counts, so long repeated runs can't dominate the similarity
+        vector[buckets.astype(np.int64)] = 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class LLMResponseCache:
+    """
+    Persistent cache of LLM replies keyed by normalized messages + model + temperature.
+
+    Entries live in a small SQLite file shared by the backend and the Streamlit frontend.
+    They expire after `ttl` seconds and are evicted least-recently-used first once the
+    entry or byte budget is exceeded. With `semantic` on, a miss falls back to the most
+    similar cached prompt for the same model and temperature above `similarity`.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL, max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 max_bytes: int = int(LLM_CACHE_MAX_MB * 1024 * 1024), semantic: bool = LLM_CACHE_SEMANTIC,
+                 similarity: float = LLM_CACHE_SIMILARITY):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.semantic = semantic
+        self.similarity = similarity
+        self._conn = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY, scope TEXT NOT NULL, response TEXT NOT NULL, embedding BLOB,
+                size INTEGER NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_scope ON llm_cache (scope)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed ON llm_cache (accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _scope(model: str, temperature: float, params: dict = None) -> str:
+        return f"{model}|{temperature}|{json.dumps(params, sort_keys=True)}" if params else f"{model}|{temperature}"
+
+    @staticmethod
+    def _key(scope: str, messages: list) -> str:
+        normalized = [{**m, "content": normalize_prompt(m.get("content"))} for m in messages]
+        return hashlib.sha256(f"{scope}|{json.dumps(normalized, sort_keys=True)}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _text(messages: list) -> str:
+        return "\n".join(m.get("content") or "" for m in messages)
+
+    def get(self, messages: list, model: str, temperature: float, params: dict = None):
+        """The cached reply for this request, or None."""
+        scope = self._scope(model, temperature, params)
+        key = self._key(scope, messages)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT response FROM llm_cache WHERE key = ? AND created_at > ?",
+                               (key, now - self.ttl)).fetchone()
+            if row is None and self.semantic:
+                row = self._nearest(conn, scope, self._text(messages), now)
+                if row is not None:
+                    self.semantic_hits += 1
+                    key = row[1]
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def _nearest(self, conn, scope: str, text: str, now: float):
+        rows = conn.execute("SELECT response, key, embedding FROM llm_cache "
+                            "WHERE scope = ? AND created_at > ? AND embedding IS NOT NULL",
+                            (scope, now - self.ttl)).fetchall()
+        if not rows:
+            return None
+        matrix = np.frombuffer(b"".join(r[2] for r in rows), dtype=np.float32).reshape(len(rows), -1)
+        scores = matrix @ embed_prompt(text)
+        best = int(np.argmax(scores))
+        return rows[best][:2] if scores[best] >= self.similarity else None
+
+    def put(self, messages: list, model: str, temperature: float, response: str, params: dict = None):
+        scope = self._scope(model, temperature, params)
+        embedding = embed_prompt(self._text(messages)).tobytes() if self.semantic else None
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (self._key(scope, messages), scope, response, embedding,
+                          len(response.encode("utf-8")) + len(embedding or b""), now, now))
+            self._evict(conn, now)
+
+    def _evict(self, conn, now: float):
+        expired = conn.execute("DELETE FROM llm_cache WHERE created_at <= ?", (now - self.ttl,)).rowcount
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        evicted = 0
+        if entries > self.max_entries or size > self.max_bytes:
+            # Walk from least recently used until both budgets hold
+            cutoff = None
+            for row_size, accessed_at in conn.execute("SELECT size, accessed_at FROM llm_cache ORDER BY accessed_at"):
+                if entries <= self.max_entries and size <= self.max_bytes:
+                    break
+                entries, size, cutoff = entries - 1, size - row_size, accessed_at
+            evicted = conn.execute("DELETE FROM llm_cache WHERE accessed_at <= ?", (cutoff,)).rowcount
+        self.evictions += expired + evicted
+
+    def clear(self):
+        with self._lock:
+            self._connect().execute("DELETE FROM llm_cache")
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "cached_bytes": size,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "semantic": self.semantic,
+            }
+
+
+LLM_CACHE = LLMResponseCache() if LLM_CACHE_ENABLED else None
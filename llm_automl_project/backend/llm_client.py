@@ -0,0 +1,350 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+if CURRENT_DIR not in sys.path:
+    sys.path.insert(0, CURRENT_DIR)
+
+try:
+    from llm_cache import LLM_CACHE
+except ModuleNotFoundError as e:
+    print("❌ Import failed:", e)
+    raise
+
+try:
+    import httpx
+except ModuleNotFoundError:
+    httpx = None  # optional: without httpx async calls run the pooled sync client in a worker thread
+
+load_dotenv()
+
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.deepseek.com/v1").rstrip("/")  # point at a local stub for tests
+LLM_API_KEY = os.getenv("LLM_API_KEY") or os.getenv("DEEPSEEK_API_KEY")
+LLM_MODEL = os.getenv("LLM_MODEL", "deepseek-coder")
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", 5))  # seconds to open a connection
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", 120))  # seconds an attempt may wait on the response
+LLM_CALL_BUDGET = float(os.getenv("LLM_CALL_BUDGET", 300))  # seconds per call, every attempt and backoff included
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", 0.5))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", 8))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", 10))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", 5))  # consecutive failed calls that open the circuit
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", 30))  # seconds before a trial call is let through
+
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """An LLM call failed after its retries, or within its deadline."""
+
+
+class CircuitOpenError(LLMError):
+    """The provider failed repeatedly; calls fail fast until the cooldown has passed."""
+
+
+class LLMRejectedError(LLMError):
+    """The provider refused the request (4xx): a problem with the request, not with the provider."""
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `threshold` consecutive failed calls; open -> half-open after `cooldown`
+    seconds, when a single trial call decides whether the circuit closes or opens again.
+    """
+
+    def __init__(self, threshold: int = LLM_BREAKER_THRESHOLD, cooldown: float = LLM_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self._opened_at >= self.cooldown else "open"
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial_running:
+                raise CircuitOpenError("LLM provider circuit is open; failing fast")
+            self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def release(self):
+        """End a call that was cancelled before it succeeded or failed, freeing the half-open trial."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or (self._opened_at is None and self._failures >= self.threshold):
+                self._opened_at = time.monotonic()
+                self.opened += 1
+                print(f"⚡ LLM circuit opened after {self._failures} consecutive failures")
+            self._trial_running = False
+
+
+class _RetryableResponse(Exception):
+    def __init__(self, status_code: int, retry_after: str = None):
+        super().__init__(f"HTTP {status_code}")
+        self.retry_after = retry_after
+
+
+class LLMClient:
+    """
+    Chat-completions client shared by every LLM caller in the process.
+
+    One keep-alive connection pool per client (a requests Session, plus an httpx
+    AsyncClient for async callers). Every attempt has its own connect and read timeouts,
+    and the call as a whole has a budget covering all of its attempts and backoff;
+    connection errors, timeouts, 429 and 5xx responses are retried with full jitter
+    exponential backoff (honouring Retry-After). A call that still fails counts once
+    towards the circuit breaker, which after repeated failures makes callers fail fast
+    instead of waiting on a dead provider.
+
+    Successful replies are stored in the response cache; `use_cache=False` skips the
+    lookup (the fresh reply still replaces the cached one).
+    """
+
+    def __init__(self, base_url: str = LLM_BASE_URL, api_key: str = LLM_API_KEY, model: str = LLM_MODEL,
+                 connect_timeout: float = LLM_CONNECT_TIMEOUT, read_timeout: float = LLM_READ_TIMEOUT,
+                 budget: float = LLM_CALL_BUDGET, max_retries: int = LLM_MAX_RETRIES, pool_size: int = LLM_POOL_SIZE,
+                 breaker: CircuitBreaker = None, cache=LLM_CACHE):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.budget = budget
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+        self.cache = cache
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._async_client = None
+        self._async_loop = None
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.short_circuited = 0
+
+    @property
+    def configured(self) -> bool:
+        # A custom base URL (e.g. a local stub server) doesn't need a key
+        return bool(self.api_key) or self.base_url != "https://api.deepseek.com/v1"
+
+    def _count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def _request(self, prompt: str, messages: list, model: str, temperature: float, params: dict) -> tuple:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        payload = {"model": model or self.model,
+                   "messages": messages or [{"role": "user", "content": prompt}],
+                   "temperature": temperature, **params}
+        return f"{self.base_url}/chat/completions", headers, payload
+
+    def _cache_get(self, payload: dict, params: dict, use_cache: bool):
+        if self.cache is None or not use_cache:
+            return None
+        return self.cache.get(payload["messages"], payload["model"], payload["temperature"], params)
+
+    def _cache_put(self, payload: dict, params: dict, reply: str) -> str:
+        if self.cache is not None:
+            self.cache.put(payload["messages"], payload["model"], payload["temperature"], reply, params)
+        return reply
+
+    @staticmethod
+    def _content(data: dict) -> str:
+        try:
+            return data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            raise LLMError(f"Unexpected LLM response: {str(data)[:200]}")
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: str = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), LLM_BACKOFF_MAX)
+            except ValueError:
+                pass  # an HTTP date: fall back to our own schedule
+        return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+
+    def _start_call(self, budget: float) -> float:
+        """Ask the breaker to let one call through and return its deadline."""
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self._count("short_circuited")
+            raise
+        return time.monotonic() + (budget or self.budget)
+
+    def _end_call(self, error: Exception = None):
+        # Once per call, however many attempts it took
+        if error is None or isinstance(error, LLMRejectedError):
+            self.breaker.record_success()  # a rejected request says nothing about the provider's health
+        else:
+            self.breaker.record_failure()
+        if error is not None:
+            self._count("failures")
+
+    def _attempt_timeouts(self, deadline: float) -> tuple:
+        """(connect, read) timeouts for the next attempt, capped by what is left of the call's budget."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMError("LLM call budget exceeded")
+        self._count("calls")
+        return min(self.connect_timeout, remaining), min(self.read_timeout, remaining)
+
+    def _retry_delay(self, attempt: int, deadline: float, error: Exception) -> float:
+        """The pause before retrying a failed attempt, or raise when out of retries or budget."""
+        delay = self._backoff(attempt, getattr(error, "retry_after", None))
+        if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+            raise LLMError(f"LLM request failed after {attempt + 1} attempt(s): {error}") from error
+        self._count("retries")
+        return delay
+
+    def _reply(self, status_code: int, body) -> str:
+        if status_code >= 400:
+            raise LLMRejectedError(f"LLM request rejected with HTTP {status_code}: {str(body)[:200]}")
+        return self._content(body)
+
+    def chat(self, prompt: str = None, messages: list = None, model: str = None, temperature: float = 0.5,
+             budget: float = None, use_cache: bool = True, **params) -> str:
+        """Send one chat completion and return the reply text; raises LLMError on failure."""
+        url, headers, payload = self._request(prompt, messages, model, temperature, params)
+        cached = self._cache_get(payload, params, use_cache)
+        if cached is not None:
+            return cached
+        deadline = self._start_call(budget)
+        attempt = 0
+        try:
+            while True:
+                timeouts = self._attempt_timeouts(deadline)
+                try:
+                    response = self.session.post(url, headers=headers, json=payload, timeout=timeouts)
+                    if response.status_code in RETRY_STATUSES:
+                        raise _RetryableResponse(response.status_code, response.headers.get("Retry-After"))
+                    body = response.json() if response.status_code < 400 else response.text
+                except (requests.ConnectionError, requests.Timeout, _RetryableResponse, ValueError) as e:
+                    time.sleep(self._retry_delay(attempt, deadline, e))
+                    attempt += 1
+                    continue
+                reply = self._reply(response.status_code, body)
+                break
+        except Exception as e:
+            self._end_call(e)
+            raise
+        self._end_call()
+        return self._cache_put(payload, params, reply)
+
+    async def _get_async_client(self):
+        # httpx clients are bound to the event loop they were created on
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            stale = self._async_client
+            limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            self._async_client = httpx.AsyncClient(limits=limits)
+            self._async_loop = loop
+            if stale is not None:
+                await self._close_stale(stale)
+        return self._async_client
+
+    @staticmethod
+    async def _close_stale(client):
+        # Its loop may already be closed, in which case its sockets were dropped with it
+        try:
+            await client.aclose()
+        except Exception as e:
+            print(f"⚠️ Couldn't close previous async LLM client cleanly: {e}")
+
+    async def achat(self, prompt: str = None, messages: list = None, model: str = None, temperature: float = 0.5,
+                    budget: float = None, use_cache: bool = True, **params) -> str:
+        """Async `chat`, for event-loop callers."""
+        if httpx is None:
+            return await asyncio.to_thread(self.chat, prompt, messages, model, temperature, budget, use_cache, **params)
+        url, headers, payload = self._request(prompt, messages, model, temperature, params)
+        cached = self._cache_get(payload, params, use_cache)
+        if cached is not None:
+            return cached
+        deadline = self._start_call(budget)
+        attempt = 0
+        try:
+            client = await self._get_async_client()
+            while True:
+                connect, read = self._attempt_timeouts(deadline)
+                try:
+                    response = await client.post(url, headers=headers, json=payload,
+                                                 timeout=httpx.Timeout(read, connect=connect))
+                    if response.status_code in RETRY_STATUSES:
+                        raise _RetryableResponse(response.status_code, response.headers.get("Retry-After"))
+                    body = response.json() if response.status_code < 400 else response.text
+                except (httpx.TransportError, _RetryableResponse, ValueError) as e:
+                    await asyncio.sleep(self._retry_delay(attempt, deadline, e))
+                    attempt += 1
+                    continue
+                reply = self._reply(response.status_code, body)
+                break
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception as e:
+            self._end_call(e)
+            raise
+        self._end_call()
+        return self._cache_put(payload, params, reply)
+
+    def close(self):
+        self.session.close()
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "base_url": self.base_url,
+                "timeouts": {"connect": self.connect_timeout, "read": self.read_timeout, "budget": self.budget},
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+                "short_circuited": self.short_circuited,
+                "circuit": self.breaker.state,
+                "circuit_opened": self.breaker.opened,
+                "cache": self.cache.stats() if self.cache is not None else None,
+            }
+
+
+LLM_CLIENT = LLMClient()
+
+
+def chat_completion(prompt: str, **kwargs) -> str:
+    return LLM_CLIENT.chat(prompt, **kwargs)
@@ -1,45 +1,34 @@
 import os
-import requests
+import sys
 from dotenv import load_dotenv
 
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+if CURRENT_DIR not in sys.path:
+    sys.path.insert(0, CURRENT_DIR)
+
+try:
+    from llm_client import LLM_CLIENT
+except ModuleNotFoundError as e:
+    print("❌ Import failed:", e)
+    raise
+
 # 🔄 Load environment variables
 load_dotenv()
 
-# 🔐 Get API key from environment
-DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")  # Set this in your .env file
-
 
 def generate_preprocessing_code(task: str) -> str:
     """Generate placeholder preprocessing code (if fallback fails or offline mode)."""
     return f"# Placeholder: code to perform '{task}'\nprint('Implement logic here')"
 
 
-def deepseek_fallback(task: str) -> str:
-    """Send fallback task to DeepSeek API for reasoning/code generation."""
-    if not DEEPSEEK_API_KEY:
+def deepseek_fallback(task: str, use_cache: bool = True) -> str:
+    """Send fallback task to DeepSeek API for reasoning/code generation (`use_cache=False` forces a fresh reply)."""
+    if not LLM_CLIENT.configured:
         return "❌ DeepSeek API key not set in environment."
 
     prompt = f"You are a Python ML engineer. Generate sklearn-compatible code to: {task}"
 
-    headers = {
-        "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    payload = {
-        "model": "deepseek-coder",
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": 0.5
-    }
-
     try:
-        response = requests.post(
-            "https://api.deepseek.com/v1/chat/completions",
-            headers=headers,
-            json=payload,
-            timeout=90  # ⏱️ Increased timeout to 60 seconds
-        )
-        response.raise_for_status()
-        return response.json()["choices"][0]["message"]["content"]
+        return LLM_CLIENT.chat(prompt, temperature=0.5, use_cache=use_cache)
     except Exception as e:
         return f"❌ DeepSeek request failed: {e}"
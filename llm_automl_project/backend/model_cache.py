@@ -0,0 +1,141 @@
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+import joblib
+from dotenv import load_dotenv
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+if CURRENT_DIR not in sys.path:
+    sys.path.insert(0, CURRENT_DIR)
+
+from utils import file_sha256
+
+load_dotenv()
+
+MODEL_CACHE_MAX_ITEMS = int(os.getenv("MODEL_CACHE_MAX_ITEMS", 8))
+MODEL_CACHE_MAX_MB = float(os.getenv("MODEL_CACHE_MAX_MB", 1024))
+
+
+class ModelCache:
+    """
+    Bounded in-memory LRU cache of loaded models keyed by model name.
+
+    Entries are sized by their artifact size on disk and evicted least-recently-used
+    first once either the item or the byte budget is exceeded. Each lookup stats the
+    file; when mtime or size changed the file is re-hashed and the model is reloaded
+    only if the content hash differs.
+    """
+
+    def __init__(self, max_items: int = MODEL_CACHE_MAX_ITEMS, max_bytes: int = int(MODEL_CACHE_MAX_MB * 1024 * 1024),
+                 loader=joblib.load, on_load=None):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.on_load = on_load  # called with (path, seconds) after each load from disk
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _lookup(self, key: str, path: str, signature: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry["path"] == path and entry["signature"] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        return None
+
+    def get(self, key: str, path: str):
+        """Return the model stored at `path`, loading it on a miss or after the file changed."""
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        entry = self._lookup(key, path, signature)
+        if entry:
+            return entry["model"]
+
+        # Serialize loads per key so concurrent misses unpickle the file only once
+        with self._key_lock(key):
+            entry = self._lookup(key, path, signature)
+            if entry:
+                return entry["model"]
+
+            sha256 = file_sha256(path)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and entry["path"] == path and entry["sha256"] == sha256:
+                    # File was touched or rewritten with identical content: keep the loaded model
+                    entry["signature"] = signature
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry["model"]
+                if entry:
+                    self.reloads += 1
+                self.misses += 1
+
+            print(f"📦 Loading model: {path}")
+            start = time.perf_counter()
+            model = self.loader(path)
+            load_seconds = time.perf_counter() - start
+            with self._lock:
+                self._entries[key] = {
+                    "model": model,
+                    "path": path,
+                    "signature": signature,
+                    "sha256": sha256,
+                    "nbytes": stat.st_size,
+                    "load_seconds": load_seconds,
+                }
+                self._entries.move_to_end(key)
+                self._evict()
+            if self.on_load is not None:
+                try:
+                    self.on_load(path, load_seconds)
+                except Exception as e:
+                    print(f"⚠️ Couldn't record load time for {path}: {e}")
+            return model
+
+    def _evict(self):
+        # Always keep the most recently used entry, even if it alone exceeds the byte budget
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_items or self._total_bytes() > self.max_bytes
+        ):
+            key, _ = self._entries.popitem(last=False)
+            self.evictions += 1
+            print(f"♻️ Evicted model from cache: {key}")
+
+    def _total_bytes(self) -> int:
+        return sum(entry["nbytes"] for entry in self._entries.values())
+
+    def invalidate(self, key: str = None):
+        """Drop one cached model, or all of them when no key is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "cached_models": list(self._entries.keys()),
+                "load_seconds": {key: round(entry["load_seconds"], 4) for key, entry in self._entries.items()},
+                "cached_bytes": self._total_bytes(),
+                "max_items": self.max_items,
+                "max_bytes": self.max_bytes,
+            }
@@ -1,18 +1,31 @@
 # ------------------------------------------
 # 📦 ML Model Training and Saving Pipeline
 # ------------------------------------------
-# This script loads a dataset, trains a RandomForestClassifier,
-# evaluates the model, saves it to disk, and logs metadata to the database.
+# This script loads a dataset, detects whether the target is a classification or
+# regression problem, trains a preprocessing + model pipeline, evaluates it,
+# saves it to disk, and logs metadata to the database.
 # It’s designed to be run directly or imported into a FastAPI service.
 # ------------------------------------------
 
 import os
 import sys
+import json
+import time
+import uuid
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score
-import joblib
+from sklearn.base import clone
+from sklearn.ensemble import (
+    RandomForestClassifier, ExtraTreesClassifier, HistGradientBoostingClassifier,
+    RandomForestRegressor, ExtraTreesRegressor, HistGradientBoostingRegressor, BaseEnsemble,
+)
+from sklearn.linear_model import SGDClassifier, SGDRegressor, LogisticRegression, Ridge
+from sklearn.model_selection import ParameterGrid, ParameterSampler
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler, FunctionTransformer
+from sklearn.metrics import accuracy_score, f1_score, r2_score, mean_squared_error, mean_absolute_error
+from joblib import Parallel, delayed
 
 # ✅ Step 1: Fix Python path for direct execution
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -20,50 +33,413 @@ sys.path.insert(0, CURRENT_DIR)
 
 # ✅ Step 2: Import custom database logger
 try:
-    from database import save_model_metadata
+    from database import log_model_candidates
+    from model_registry import new_version_dir, register_model, discard_version_dir
+    from model_store import save_model_artifact
+    from tree_engine import export_engine
+    from utils import (
+        load_dataset, iter_dataset, build_preprocessor, to_dense, get_target_column, detect_task_type,
+        STREAMABLE_FORMATS,
+    )
 except ModuleNotFoundError as e:
     print("❌ Import failed (is your working directory correct?):", e)
     raise
 
+TRAIN_STREAMING_MIN_MB = float(os.getenv("TRAIN_STREAMING_MIN_MB", 512))
+STREAMING_HOLDOUT_EVERY = 5  # every 5th row of each chunk is held out for evaluation
+TRAIN_SEARCH_ENABLED = os.getenv("TRAIN_SEARCH_ENABLED", "0") == "1"
+TRAIN_SEARCH_BUDGET_SECONDS = float(os.getenv("TRAIN_SEARCH_BUDGET_SECONDS", 300))
+TRAIN_SEARCH_CANDIDATES = int(os.getenv("TRAIN_SEARCH_CANDIDATES", 8))  # sampled configurations per model family
+TRAIN_SEARCH_N_JOBS = int(os.getenv("TRAIN_SEARCH_N_JOBS", -1))
+TRAIN_SEARCH_ETA = 3  # keep the top 1/eta of candidates and give them eta times the rows each rung
+TRAIN_SEARCH_MIN_ROWS = 500
+TRAIN_TEST_SIZE = 0.2
+TRAIN_SPLIT_SEED = int(os.getenv("TRAIN_SPLIT_SEED", 42))  # recorded per version, so retraining can rebuild the test rows
+
+PRIMARY_METRIC = {"classification": "accuracy", "regression": "r2"}
+
+
+def _dense_model(estimator) -> Pipeline:
+    # Histogram GBMs need dense input
+    return Pipeline([("dense", FunctionTransformer(to_dense, accept_sparse=True)), ("model", estimator)])
+
+# Default model per task when no search is requested: (file name tag, estimator)
+DEFAULT_MODELS = {
+    "classification": ("rf", RandomForestClassifier(n_jobs=-1)),
+    "regression": ("hgb", _dense_model(HistGradientBoostingRegressor())),
+}
+
+
 # ------------------------------------------
-# 🔁 Main training function
+# 📏 Evaluation
 # ------------------------------------------
-def train_and_save_model(file_path: str) -> str:
-    # Step 3: Load dataset
+def evaluate_model(task_type: str, y_true, y_pred) -> dict:
+    if task_type == "regression":
+        return {
+            "r2": float(r2_score(y_true, y_pred)),
+            "rmse": float(np.sqrt(mean_squared_error(y_true, y_pred))),
+            "mae": float(mean_absolute_error(y_true, y_pred)),
+        }
+    return {
+        "accuracy": float(accuracy_score(y_true, y_pred)),
+        "f1_macro": float(f1_score(y_true, y_pred, average="macro")),
+    }
+
+def metric_fields(task_type: str, metrics: dict) -> dict:
+    """ModelMetadata columns for a set of metrics; `accuracy` is only filled for classifiers."""
+    metric = PRIMARY_METRIC[task_type]
+    return {
+        "accuracy": metrics.get("accuracy"),
+        "task_type": task_type,
+        "metric": metric,
+        "score": metrics[metric],
+        "metrics": json.dumps(metrics),
+    }
+
+def _format_metrics(metrics: dict) -> str:
+    return ", ".join(f"{name}={value:.4f}" for name, value in metrics.items())
+
+def split_train_test(X, y, seed: int):
+    """The train/test split models are scored on; the same rows and seed always give the same test rows."""
+    return train_test_split(X, y, test_size=TRAIN_TEST_SIZE, random_state=seed)
+
+def _load_training_frame(file_path: str, target: str = None) -> tuple:
     print(f"📂 Loading dataset from: {file_path}")
-    df = pd.read_csv(file_path)
+    df = load_dataset(file_path)
+    target = get_target_column(df, target)
+    df = df.dropna(subset=[target])
+    X, y = df.drop(columns=[target]), df[target]
+    task_type = detect_task_type(y)
+    print(f"📊 Dataset summary: {len(df)} rows, {len(X.columns)} features, Target: '{target}' ({task_type})")
+    return X, y, task_type
+
+
+def model_name(file_path: str) -> str:
+    """Registered model name for a dataset: its file name without extension."""
+    return os.path.basename(file_path).split('.')[0]
+
+def save_model_version(model, file_path: str, tag: str, X_check, before_register=None, **fields) -> dict:
+    """
+    Save `model` as the next immutable version of the dataset's registered model.
 
-    # Step 4: Separate features and target
-    target = df.columns[-1]
-    X = df.drop(columns=[target])
-    y = df[target]
-    print(f"📊 Dataset summary: {len(df)} rows, {len(X.columns)} features, Target: '{target}'")
+    Each version gets its own directory, so retraining never overwrites an artifact that is
+    being served; which version serves is decided by the registry's aliases. `before_register`
+    is called once the artifact is written; if it raises (e.g. the training job was
+    cancelled), the version directory is discarded and nothing is registered.
+    """
+    name = model_name(file_path)
+    version, version_dir = new_version_dir(name)
+    model_path = os.path.join(version_dir, f"{name}_{tag}_model.pkl")
+    try:
+        artifact = save_model_artifact(model, model_path)
+        print(f"✅ Trained model saved at: {model_path}")
+        # Forests also get a compiled inference engine, checked against sklearn on the test rows
+        export_engine(model, model_path, X_check)
+        if before_register:
+            before_register()
+        print("🗃️ Logging model metadata to database...")
+        registered = register_model(name, version, model_path, dataset_path=file_path, **fields, **artifact)
+    except Exception:
+        discard_version_dir(version_dir)
+        raise
+    return registered
+
+
+# ------------------------------------------
+# 🔁 Main training function
+# ------------------------------------------
+def train_and_save_model(file_path: str, streaming: bool = None, search: bool = None, time_budget: float = None,
+                         target: str = None, before_register=None) -> str:
+    # Files too large to hold in memory go through the out-of-core trainer
+    if streaming is None:
+        ext = os.path.splitext(file_path)[1].lower()
+        streaming = ext in STREAMABLE_FORMATS and os.path.getsize(file_path) > TRAIN_STREAMING_MIN_MB * 1024 * 1024
+    if streaming:
+        return train_and_save_model_streaming(file_path, target=target, before_register=before_register)
+    if search if search is not None else TRAIN_SEARCH_ENABLED:
+        return search_and_save_model(file_path, time_budget=time_budget or TRAIN_SEARCH_BUDGET_SECONDS, target=target,
+                                     before_register=before_register)
+
+    # Step 3-4: Load dataset, separate features and target, detect the task
+    X, y, task_type = _load_training_frame(file_path, target)
 
     # Step 5: Split into training and testing sets
     print("🔀 Splitting data into training and testing sets (80/20)...")
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2)
+    X_train, X_test, y_train, y_test = split_train_test(X, y, TRAIN_SPLIT_SEED)
 
-    # Step 6: Train a Random Forest model
-    print("🧠 Training RandomForestClassifier...")
-    model = RandomForestClassifier()
+    # Step 6: Train the task's default model behind the preprocessing steps (imputation, scaling,
+    # sparse float32 one-hot), so the saved pipeline applies the same transforms at inference
+    tag, estimator = DEFAULT_MODELS[task_type]
+    print(f"🧠 Training {tag} {task_type} model...")
+    model = Pipeline([
+        ("preprocess", build_preprocessor(X_train, task_type=task_type)),
+        ("model", clone(estimator)),
+    ])
     model.fit(X_train, y_train)
 
     # Step 7: Evaluate the model
     y_pred = model.predict(X_test)
-    acc = accuracy_score(y_test, y_pred)
-    print(f"📈 Model accuracy on test set: {acc:.4f}")
-
-    # Step 8: Save the trained model to disk
-    model_name = os.path.basename(file_path).split('.')[0] + "_rf_model.pkl"
-    model_path = os.path.join(CURRENT_DIR, "../models/saved_models", model_name)
-    os.makedirs(os.path.dirname(model_path), exist_ok=True)
-    joblib.dump(model, model_path)
-    print(f"✅ Trained model saved at: {model_path}")
+    metrics = evaluate_model(task_type, y_test, y_pred)
+    print(f"📈 Model metrics on test set: {_format_metrics(metrics)}")
 
-    # Step 9: Log model metadata to the database
-    print("🗃️ Logging model metadata to database...")
-    save_model_metadata(name=model_name, accuracy=acc, path=model_path)
+    # Step 8: Save the trained model as a new registry version and log its metadata
+    model_path = save_model_version(model, file_path, tag, X_test, before_register, model_family=tag, target=y.name,
+                                    split_seed=TRAIN_SPLIT_SEED, **metric_fields(task_type, metrics))["path"]
 
-    # Step 10: Return saved model path
+    # Step 9: Return saved model path
     print("🚀 Training pipeline complete.\n")
     return model_path
+
+
+# ------------------------------------------
+# 🔍 Multi-model search with successive halving
+# ------------------------------------------
+_TREE_GRID = {
+    "n_estimators": [100, 200, 400],
+    "max_depth": [None, 8, 16, 32],
+    "min_samples_leaf": [1, 2, 5],
+    "max_features": ["sqrt", 0.5],
+}
+_HGB_GRID = {
+    "model__learning_rate": [0.03, 0.1, 0.3],
+    "model__max_leaf_nodes": [15, 31, 63],
+    "model__l2_regularization": [0.0, 0.1, 1.0],
+    "model__max_iter": [100, 300],
+}
+
+SEARCH_SPACES = {
+    "classification": {
+        "random_forest": (RandomForestClassifier(n_jobs=1), _TREE_GRID),
+        "extra_trees": (ExtraTreesClassifier(n_jobs=1), _TREE_GRID),
+        "hist_gradient_boosting": (_dense_model(HistGradientBoostingClassifier()), _HGB_GRID),
+        "logistic_regression": (LogisticRegression(max_iter=1000), {"C": [0.01, 0.1, 1.0, 10.0]}),
+    },
+    "regression": {
+        "random_forest": (RandomForestRegressor(n_jobs=1), _TREE_GRID),
+        "extra_trees": (ExtraTreesRegressor(n_jobs=1), _TREE_GRID),
+        "hist_gradient_boosting": (_dense_model(HistGradientBoostingRegressor()), _HGB_GRID),
+        "ridge": (Ridge(), {"alpha": [0.1, 1.0, 10.0, 100.0]}),
+    },
+}
+
+def _sample_candidates(task_type: str, n_per_family: int, seed: int = 42) -> list:
+    candidates = []
+    for family, (estimator, grid) in SEARCH_SPACES[task_type].items():
+        n_iter = min(n_per_family, len(ParameterGrid(grid)))
+        for params in ParameterSampler(grid, n_iter=n_iter, random_state=seed):
+            candidates.append({"family": family, "params": params})
+    # Interleave families so a tight budget still samples each of them
+    order = np.random.default_rng(seed).permutation(len(candidates))
+    return [candidates[i] for i in order]
+
+def _fit_candidate(task_type: str, candidate: dict, X_train, y_train, X_val, y_val, deadline: float):
+    # Candidates that start after the deadline are skipped rather than run
+    if time.time() >= deadline:
+        return None
+    estimator = clone(SEARCH_SPACES[task_type][candidate["family"]][0]).set_params(**candidate["params"])
+    start = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    metrics = evaluate_model(task_type, y_val, estimator.predict(X_val))
+    return {"metrics": metrics, "score": metrics[PRIMARY_METRIC[task_type]], "fit_seconds": fit_seconds}
+
+def search_and_save_model(file_path: str, time_budget: float = TRAIN_SEARCH_BUDGET_SECONDS,
+                          n_candidates: int = TRAIN_SEARCH_CANDIDATES, n_jobs: int = TRAIN_SEARCH_N_JOBS,
+                          seed: int = 42, target: str = None, before_register=None) -> str:
+    """
+    Search several model families with successive halving under a wall-clock budget.
+
+    The preprocessing pipeline is fitted once; every candidate then trains on a growing
+    slice of the (shuffled) training rows, and only the best 1/eta of each rung moves on
+    with eta times as many rows. Candidates in a rung run in parallel across cores. Each
+    evaluation is logged to ModelMetadata under one search id, and the winner is refitted
+    on all training rows and saved behind the preprocessor.
+    """
+    deadline = time.time() + time_budget
+    search_id = uuid.uuid4().hex
+    X, y, task_type = _load_training_frame(file_path, target)
+    # Shuffled splits, so each rung's leading slice of training rows is a random subsample
+    X_train, X_test, y_train, y_test = split_train_test(X, y, seed)
+    X_train, X_val, y_train, y_val = train_test_split(X_train, y_train, test_size=0.2, random_state=seed)
+
+    preprocessor = build_preprocessor(X_train, task_type=task_type).fit(X_train, y_train)
+    Xt_train, Xt_val = preprocessor.transform(X_train), preprocessor.transform(X_val)
+    y_train, y_val = y_train.to_numpy(), y_val.to_numpy()
+
+    candidates = _sample_candidates(task_type, n_candidates, seed)
+    n_rows = Xt_train.shape[0]
+    n_rungs = max(1, int(np.floor(np.log(len(candidates)) / np.log(TRAIN_SEARCH_ETA))) + 1)
+    rows = max(min(TRAIN_SEARCH_MIN_ROWS, n_rows), int(n_rows / TRAIN_SEARCH_ETA ** (n_rungs - 1)))
+    print(f"🔍 Search {search_id}: {len(candidates)} {task_type} candidates, {n_rungs} rungs, "
+          f"{time_budget:.0f}s budget")
+
+    best = None
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for rung in range(n_rungs):
+            if time.time() >= deadline:
+                print("⏱️ Search budget exhausted.")
+                break
+            rows = min(rows, n_rows)
+            results = parallel(
+                delayed(_fit_candidate)(task_type, c, Xt_train[:rows], y_train[:rows], Xt_val, y_val, deadline)
+                for c in candidates
+            )
+            scored = [(c, r) for c, r in zip(candidates, results) if r is not None]
+            log_model_candidates([{
+                "name": model_name(file_path), "status": "candidate", "search_id": search_id,
+                "model_family": c["family"], "params": json.dumps(c["params"], default=str),
+                "rung": rung, "train_rows": rows, "fit_seconds": r["fit_seconds"],
+                **metric_fields(task_type, r["metrics"]),
+            } for c, r in scored])
+            if not scored:
+                break
+            scored.sort(key=lambda cr: cr[1]["score"], reverse=True)
+            best = scored[0][0]
+            print(f"🏁 Rung {rung}: {len(scored)} candidates on {rows} rows, best {best['family']} "
+                  f"({PRIMARY_METRIC[task_type]}={scored[0][1]['score']:.4f})")
+            if rows >= n_rows:
+                break
+            candidates = [c for c, _ in scored[:max(1, len(scored) // TRAIN_SEARCH_ETA)]]
+            rows *= TRAIN_SEARCH_ETA
+
+    if best is None:
+        raise RuntimeError(f"Time budget of {time_budget:.0f}s too small to evaluate any candidate.")
+
+    # Refit the winner on every training row; forests build their trees on all cores. Other
+    # families either have no n_jobs or (LogisticRegression since sklearn 1.8) ignore it with a warning
+    estimator = clone(SEARCH_SPACES[task_type][best["family"]][0]).set_params(**best["params"])
+    if isinstance(estimator, BaseEnsemble) and "n_jobs" in estimator.get_params():
+        estimator.set_params(n_jobs=-1)
+    start = time.perf_counter()
+    estimator.fit(preprocessor.transform(pd.concat([X_train, X_val])), np.concatenate([y_train, y_val]))
+    fit_seconds = time.perf_counter() - start
+    model = Pipeline([("preprocess", preprocessor), ("model", estimator)])
+    metrics = evaluate_model(task_type, y_test, model.predict(X_test))
+    print(f"📈 Best model ({best['family']}) metrics on test set: {_format_metrics(metrics)}")
+
+    model_path = save_model_version(model, file_path, best["family"], X_test, before_register, search_id=search_id,
+                                    model_family=best["family"], params=json.dumps(best["params"], default=str),
+                                    train_rows=len(X_train) + len(X_val), fit_seconds=fit_seconds,
+                                    target=y_test.name, split_seed=seed, **metric_fields(task_type, metrics))["path"]
+    print("🚀 Search pipeline complete.\n")
+    return model_path
+
+
+# ------------------------------------------
+# 🌊 Out-of-core training over dataset chunks
+# ------------------------------------------
+class ScaledTargetRegressor:
+    """
+    A regressor fitted on a standardized target, with predictions mapped back to target units.
+
+    The streaming trainer fits the regressor chunk by chunk on targets scaled by a
+    StandardScaler that was itself fitted incrementally. sklearn's TransformedTargetRegressor
+    only fits both at once on the whole target, so this pairs the two fitted pieces instead;
+    `regressor_` and `transformer_` mirror its fitted attributes.
+    """
+
+    def __init__(self, regressor, transformer):
+        self.regressor_ = regressor
+        self.transformer_ = transformer
+
+    @property
+    def feature_names_in_(self):
+        return self.regressor_.feature_names_in_
+
+    def predict(self, X) -> np.ndarray:
+        y_scaled = np.asarray(self.regressor_.predict(X), dtype=float).reshape(-1, 1)
+        return self.transformer_.inverse_transform(y_scaled).ravel()
+
+
+def _split_chunk(chunk: pd.DataFrame, feature_cols: list, target: str):
+    chunk = chunk.dropna(subset=[target])
+    holdout = np.arange(len(chunk)) % STREAMING_HOLDOUT_EVERY == 0
+    return chunk[feature_cols], chunk[target], holdout
+
+def train_and_save_model_streaming(file_path: str, target: str = None, before_register=None) -> str:
+    """
+    Train on a dataset too large for memory with SGDClassifier/SGDRegressor.partial_fit over chunks.
+
+    Pass 1 collects the classes (or target scaling) and fits the feature scaler, pass 2
+    trains and pass 3 scores the held-out rows, so peak memory is bounded by one chunk.
+    The task type is detected on the first chunk. Only numeric feature columns are used.
+    """
+    print(f"🌊 Streaming dataset from: {file_path}")
+    chunks = iter_dataset(file_path)
+    first = next(chunks)
+    chunks.close()
+    target = get_target_column(first, target)
+    task_type = detect_task_type(first[target])
+    feature_cols = first.drop(columns=[target]).select_dtypes(include="number").columns.tolist()
+    if not feature_cols:
+        raise ValueError("Streaming training needs at least one numeric feature column.")
+    columns = feature_cols + [target]
+
+    # Pass 1: label set (or target scale) and feature scaling statistics
+    scaler, y_scaler = StandardScaler(), StandardScaler()
+    classes, rows = set(), 0
+    for chunk in iter_dataset(file_path, columns=columns):
+        X, y, _ = _split_chunk(chunk, feature_cols, target)
+        if task_type == "classification":
+            classes.update(y.unique().tolist())
+        elif len(y):
+            y_scaler.partial_fit(y.to_numpy(dtype=float).reshape(-1, 1))
+        scaler.partial_fit(X)
+        rows += len(chunk)
+    classes = np.array(sorted(classes))
+    print(f"📊 Dataset summary: {rows} rows, {len(feature_cols)} numeric features, Target: '{target}' ({task_type})")
+
+    # Pass 2: incremental fit on the training rows
+    fill_missing = FunctionTransformer(np.nan_to_num)
+    if task_type == "classification":
+        print("🧠 Training SGDClassifier incrementally...")
+        model = SGDClassifier(loss="log_loss", random_state=42)
+    else:
+        print("🧠 Training SGDRegressor incrementally...")
+        model = SGDRegressor(random_state=42)
+    for chunk in iter_dataset(file_path, columns=columns):
+        X, y, holdout = _split_chunk(chunk, feature_cols, target)
+        if (~holdout).any():
+            X_fit = fill_missing.fit_transform(scaler.transform(X[~holdout]))
+            if task_type == "classification":
+                model.partial_fit(X_fit, y[~holdout], classes=classes)
+            else:
+                model.partial_fit(X_fit, y_scaler.transform(y[~holdout].to_numpy(dtype=float).reshape(-1, 1)).ravel())
+
+    pipeline = Pipeline([("scale", scaler), ("fill_missing", fill_missing), ("model", model)])
+    if task_type == "regression":
+        # The regressor learned a standardized target; wrap it so predictions come back in target units
+        pipeline = ScaledTargetRegressor(pipeline, y_scaler)
+
+    # Pass 3: evaluate on held-out rows with running sums, so no predictions are kept
+    correct = total = 0
+    sse = sae = sum_y = sum_y2 = 0.0
+    for chunk in iter_dataset(file_path, columns=columns):
+        X, y, holdout = _split_chunk(chunk, feature_cols, target)
+        if holdout.any():
+            y_true = y[holdout].to_numpy()
+            y_pred = pipeline.predict(X[holdout])
+            total += int(holdout.sum())
+            if task_type == "classification":
+                correct += int((y_pred == y_true).sum())
+            else:
+                y_true = y_true.astype(float)
+                sse += float(((y_true - y_pred) ** 2).sum())
+                sae += float(np.abs(y_true - y_pred).sum())
+                sum_y += float(y_true.sum())
+                sum_y2 += float((y_true ** 2).sum())
+    if task_type == "classification":
+        metrics = {"accuracy": correct / total if total else 0.0}
+    else:
+        sst = sum_y2 - sum_y ** 2 / total if total else 0.0
+        metrics = {
+            "r2": 1 - sse / sst if sst > 0 else 0.0,
+            "rmse": float(np.sqrt(sse / total)) if total else 0.0,
+            "mae": sae / total if total else 0.0,
+        }
+    print(f"📈 Model metrics on held-out rows: {_format_metrics(metrics)}")
+
+    model_path = save_model_version(pipeline, file_path, "sgd", None, before_register, model_family="sgd",
+                                    target=target, train_rows=rows, **metric_fields(task_type, metrics))["path"]
+    print("🚀 Streaming training pipeline complete.\n")
+    return model_path
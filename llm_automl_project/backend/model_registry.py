@@ -0,0 +1,268 @@
+import os
+import sys
+import json
+import uuid
+import shutil
+import threading
+from datetime import datetime
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+if CURRENT_DIR not in sys.path:
+    sys.path.insert(0, CURRENT_DIR)
+
+try:
+    from database import ModelMetadata, ModelAlias, save_model_metadata, session_scope
+    from dataset_cache import dataset_sha256
+except ModuleNotFoundError as e:
+    print("❌ Import failed:", e)
+    raise
+
+load_dotenv()
+
+REGISTRY_DIR = os.path.abspath(os.getenv("MODEL_REGISTRY_DIR", os.path.join(CURRENT_DIR, "../models/registry")))
+MODEL_AUTO_PROMOTE = os.getenv("MODEL_AUTO_PROMOTE", "staging")  # alias new versions get: staging, production or none
+ALIASES = ("staging", "production")
+DEFAULT_ALIAS = "production"
+
+_promote_lock = threading.Lock()
+# Alias pointers read by the predictor: pointer path -> (mtime_ns, pointer contents)
+_pointers = {}
+
+
+# ------------------------------------------
+# 🗂️ Versioned artifacts
+# ------------------------------------------
+def _safe_name(name: str) -> str:
+    if not name or name != os.path.basename(name) or name.startswith(".") or "@" in name:
+        raise HTTPException(status_code=400, detail=f"Invalid model name: {name!r}")
+    return name
+
+
+def _check_alias(alias: str) -> str:
+    if alias not in ALIASES:
+        raise HTTPException(status_code=400, detail=f"Unknown alias '{alias}', expected one of {list(ALIASES)}")
+    return alias
+
+
+def _pointer_path(name: str, alias: str) -> str:
+    return os.path.join(REGISTRY_DIR, name, f"{alias}.json")
+
+
+def new_version_dir(name: str) -> tuple:
+    """
+    Claim the next version number of `name` and create its artifact directory.
+
+    Creating the directory is the claim: a version whose directory already exists (e.g.
+    taken by another worker) is skipped, so two trainings never write the same version.
+    """
+    name = _safe_name(name)
+    with session_scope() as session:
+        latest = session.query(ModelMetadata.version).filter(
+            ModelMetadata.name == name, ModelMetadata.version.isnot(None)
+        ).order_by(ModelMetadata.version.desc()).first()
+    version = (latest[0] if latest else 0) + 1
+    while True:
+        path = os.path.join(REGISTRY_DIR, name, f"v{version}")
+        try:
+            os.makedirs(path)
+            return version, path
+        except FileExistsError:
+            version += 1
+
+
+def register_model(name: str, version: int, model_path: str, dataset_path: str = None,
+                   promote_to: str = MODEL_AUTO_PROMOTE, **fields) -> dict:
+    """
+    Record a saved artifact as version `version` of `name` and optionally point an alias at it.
+
+    The first version of a model is also promoted to production so it can serve right away;
+    later versions only move `promote_to` (staging by default) until an operator promotes them.
+    """
+    sha256 = dataset_sha256(dataset_path) if dataset_path and os.path.exists(dataset_path) else None
+    save_model_metadata(name=name, path=model_path, version=version, status="registered", dataset_sha256=sha256,
+                        dataset_path=os.path.abspath(dataset_path) if dataset_path else None, **fields)
+    print(f"🏷️ Registered {name} v{version}")
+    aliases = [promote_to] if promote_to in ALIASES else []
+    if get_alias(name, "production") is None and "production" not in aliases:
+        aliases.append("production")
+    for alias in aliases:
+        promote_model(name, version, alias)
+    return {"name": name, "version": version, "path": model_path, "aliases": aliases}
+
+
+def discard_version_dir(path: str):
+    """Remove a claimed version directory whose artifact never got registered."""
+    shutil.rmtree(path, ignore_errors=True)
+
+
+# ------------------------------------------
+# 🔀 Aliases: promote / rollback
+# ------------------------------------------
+def _sync_status(session, name: str):
+    # A version's status is the alias serving it (production wins); versions that lost
+    # their alias are archived, versions never aliased stay registered
+    held = {}
+    for row in session.query(ModelAlias).filter(ModelAlias.name == name):
+        if row.alias == "production" or row.model_id not in held:
+            held[row.model_id] = row.alias
+    for model in session.query(ModelMetadata).filter(ModelMetadata.name == name, ModelMetadata.version.isnot(None)):
+        if model.id in held:
+            model.status = held[model.id]
+        elif model.status in ALIASES:
+            model.status = "archived"
+
+
+def _write_pointer(name: str, alias: str, model: ModelMetadata):
+    path = _pointer_path(name, alias)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"name": name, "alias": alias, "version": model.version, "model_id": model.id,
+                   "path": model.filepath, "promoted_at": datetime.utcnow().isoformat()}, f)
+    # Atomic swap: a reader sees either the old pointer or the new one, never a partial file
+    os.replace(tmp, path)
+
+
+def _set_alias(name: str, alias: str, model_id: int, rollback: bool = False) -> dict:
+    with _promote_lock:
+        with session_scope() as session:
+            model = session.get(ModelMetadata, model_id)
+            row = session.get(ModelAlias, (name, alias))
+            if row is None:
+                row = ModelAlias(name=name, alias=alias)
+                session.add(row)
+            elif row.model_id != model_id:
+                row.previous_model_id = row.model_id
+            row.model_id = model_id
+            row.updated_at = datetime.utcnow()
+            session.flush()
+            _sync_status(session, name)
+        _write_pointer(name, alias, model)
+        print(f"{'⏪ Rolled back' if rollback else '🚀 Promoted'} {name} {alias} -> v{model.version}")
+        return {"name": name, "alias": alias, "version": model.version, "path": model.filepath}
+
+
+def promote_model(name: str, version: int, alias: str = DEFAULT_ALIAS) -> dict:
+    """Point `alias` of `name` at `version`; the replaced version is remembered for rollback."""
+    name, alias = _safe_name(name), _check_alias(alias)
+    with session_scope() as session:
+        model = session.query(ModelMetadata).filter(
+            ModelMetadata.name == name, ModelMetadata.version == version
+        ).first()
+    if model is None:
+        raise HTTPException(status_code=404, detail=f"Model '{name}' has no version {version}")
+    if not os.path.isfile(model.filepath):
+        raise HTTPException(status_code=409, detail=f"Artifact for {name} v{version} is missing")
+    return _set_alias(name, alias, model.id)
+
+
+def rollback_model(name: str, alias: str = DEFAULT_ALIAS) -> dict:
+    """Point `alias` back at the version it served before its last change (a second rollback undoes it)."""
+    name, alias = _safe_name(name), _check_alias(alias)
+    row = get_alias(name, alias)
+    if row is None or row["previous_model_id"] is None:
+        raise HTTPException(status_code=409, detail=f"No previous {alias} version of '{name}' to roll back to")
+    return _set_alias(name, alias, row["previous_model_id"], rollback=True)
+
+
+def get_alias(name: str, alias: str) -> dict:
+    with session_scope() as session:
+        row = session.get(ModelAlias, (name, alias))
+        return None if row is None else {"model_id": row.model_id, "previous_model_id": row.previous_model_id}
+
+
+def get_alias_model(name: str, alias: str = DEFAULT_ALIAS) -> ModelMetadata:
+    """The ModelMetadata row `alias` of `name` currently points at, or None."""
+    row = get_alias(name, alias)
+    if row is None:
+        return None
+    with session_scope() as session:
+        return session.get(ModelMetadata, row["model_id"])
+
+
+# ------------------------------------------
+# 📋 Listing
+# ------------------------------------------
+def _version_dict(model: ModelMetadata) -> dict:
+    return {
+        "version": model.version,
+        "status": model.status,
+        "created_at": model.created_at.isoformat() if model.created_at else None,
+        "path": model.filepath,
+        "dataset_sha256": model.dataset_sha256,
+        "model_family": model.model_family,
+        "task_type": model.task_type,
+        "metric": model.metric,
+        "score": model.score,
+        "artifact_bytes": model.artifact_bytes,
+    }
+
+
+def list_models() -> list:
+    """Every registered model with its latest version and the versions its aliases point at."""
+    with session_scope() as session:
+        models = {}
+        for model in session.query(ModelMetadata).filter(ModelMetadata.version.isnot(None)) \
+                .order_by(ModelMetadata.name, ModelMetadata.version):
+            entry = models.setdefault(model.name, {"name": model.name, "latest_version": None, "aliases": {}})
+            entry["latest_version"] = model.version
+        versions = {m.id: m.version for m in session.query(ModelMetadata.id, ModelMetadata.version)
+                    .filter(ModelMetadata.name.in_(list(models)), ModelMetadata.version.isnot(None))}
+        for row in session.query(ModelAlias).filter(ModelAlias.name.in_(list(models))):
+            models[row.name]["aliases"][row.alias] = versions.get(row.model_id)
+        return list(models.values())
+
+
+def list_versions(name: str) -> dict:
+    with session_scope() as session:
+        versions = session.query(ModelMetadata).filter(
+            ModelMetadata.name == name, ModelMetadata.version.isnot(None)
+        ).order_by(ModelMetadata.version.desc()).all()
+        if not versions:
+            raise HTTPException(status_code=404, detail=f"Model '{name}' is not registered")
+        by_id = {m.id: m.version for m in versions}
+        aliases = {row.alias: by_id.get(row.model_id)
+                   for row in session.query(ModelAlias).filter(ModelAlias.name == name)}
+        return {"name": name, "aliases": aliases, "versions": [_version_dict(m) for m in versions]}
+
+
+# ------------------------------------------
+# 🔎 Resolving references for serving
+# ------------------------------------------
+def _read_pointer(path: str) -> dict:
+    # One stat per lookup; the pointer is only re-read after a promotion replaced it
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _pointers.get(path)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+    with open(path) as f:
+        pointer = json.load(f)
+    _pointers[path] = (mtime_ns, pointer)
+    return pointer
+
+
+def resolve_model(reference: str) -> tuple:
+    """
+    Resolve `name`, `name@staging`/`name@production` or `name@v3` to (cache key, artifact path, version).
+
+    Returns None when the reference is not a registered model.
+    """
+    name, _, selector = reference.partition("@")
+    selector = selector or DEFAULT_ALIAS
+    if not name or name != os.path.basename(name) or name.startswith("."):
+        return None
+    if selector in ALIASES:
+        pointer = _read_pointer(_pointer_path(name, selector))
+        return None if pointer is None else (f"{name}@{selector}", pointer["path"], pointer["version"])
+    if selector[:1] == "v" and selector[1:].isdigit():
+        version_dir = os.path.join(REGISTRY_DIR, name, selector)
+        if os.path.isdir(version_dir):
+            artifacts = [f for f in os.listdir(version_dir) if f.endswith(".pkl")]
+            if artifacts:
+                return f"{name}@{selector}", os.path.join(version_dir, artifacts[0]), int(selector[1:])
+    return None
@@ -0,0 +1,74 @@
+import os
+import time
+import uuid
+import warnings
+import joblib
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MODEL_COMPRESS = int(os.getenv("MODEL_COMPRESS", 0))  # 0 keeps artifacts memory-mappable
+MODEL_MMAP = os.getenv("MODEL_MMAP", "1") == "1"
+COLD_STORAGE_COMPRESS = ("zlib", 3)
+
+
+def _describe(compress) -> str:
+    if not compress:
+        return "none"
+    return f"{compress[0]}:{compress[1]}" if isinstance(compress, tuple) else f"zlib:{compress}"
+
+
+def load_model_artifact(path: str, mmap: bool = MODEL_MMAP):
+    """
+    Load a saved model, memory-mapping its numpy arrays read-only when possible.
+
+    Uncompressed artifacts keep every large array as a raw block in the file, and
+    `mmap_mode='r'` maps the ones an object holds as plain attributes: pages load on
+    first use and are shared between worker processes through the OS page cache. That
+    covers the compiled tree engine's node arrays (int32 indices, float32 thresholds),
+    HGB predictor nodes and linear coefficients, but not sklearn's own trees, whose
+    `Tree.__setstate__` copies every node array into a private buffer; a forest served
+    from its sklearn artifact is fully read into each worker. Compressed artifacts
+    can't be mapped and are read into memory as usual.
+    """
+    if not mmap:
+        return joblib.load(path)
+    with warnings.catch_warnings():
+        # joblib warns (and falls back to a normal load) when the file is compressed
+        warnings.filterwarnings("ignore", message=".*mmap_mode.*compress", category=UserWarning)
+        return joblib.load(path, mmap_mode="r")
+
+
+def save_model_artifact(model, path: str, compress=None) -> dict:
+    """
+    Write `model` to `path` atomically.
+
+    Args:
+        compress: joblib compression (level or (method, level)); defaults to MODEL_COMPRESS.
+            Use 0 for serving (memory-mappable) and COLD_STORAGE_COMPRESS for archives.
+
+    Returns:
+        dict: artifact_bytes and compression, as recorded in ModelMetadata. Load time is
+        recorded by the serving cache when the artifact is first loaded.
+    """
+    compress = MODEL_COMPRESS if compress is None else compress
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        joblib.dump(model, tmp, compress=compress)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    size = os.path.getsize(path)
+    print(f"💾 Model artifact {os.path.basename(path)}: {size / 1024 / 1024:.1f} MB ({_describe(compress)})")
+    return {
+        "artifact_bytes": size,
+        "compression": _describe(compress),
+    }
+
+
+def recompress_model_artifact(path: str, compress=COLD_STORAGE_COMPRESS) -> dict:
+    """Rewrite an artifact in place with different compression (e.g. for cold storage, or 0 to serve it again)."""
+    return save_model_artifact(joblib.load(path), path, compress=compress)
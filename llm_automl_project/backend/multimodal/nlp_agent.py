@@ -1,6 +1,16 @@
-from transformers import pipeline
+import os
+import sys
 
-classifier = pipeline("text-classification", model="distilbert-base-uncased")
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+if CURRENT_DIR not in sys.path:
+    sys.path.insert(0, CURRENT_DIR)
+
+try:
+    from text_models import classify_texts
+except ModuleNotFoundError as e:
+    print("❌ Import failed:", e)
+    raise
 
 def process_text_column(text_column):
-    return [classifier(text)[0] for text in text_column[:5]]  # Sample top 5
+    # The shared model loads on first call and classifies the whole column in padded batches
+    return classify_texts(list(text_column))
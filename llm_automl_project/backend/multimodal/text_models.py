@@ -0,0 +1,80 @@
+import os
+import math
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TEXT_MODEL_ID = os.getenv("TEXT_MODEL_ID", "distilbert-base-uncased")
+TEXT_MODEL_BATCH_SIZE = int(os.getenv("TEXT_MODEL_BATCH_SIZE", 32))
+TEXT_MODEL_MAX_LENGTH = int(os.getenv("TEXT_MODEL_MAX_LENGTH", 256))  # tokens kept per text
+TEXT_MODEL_QUANTIZE = os.getenv("TEXT_MODEL_QUANTIZE", "0") == "1"  # dynamic int8 Linear layers for CPU inference
+TEXT_MODEL_THREADS = int(os.getenv("TEXT_MODEL_THREADS", 0))  # torch intra-op threads (0 = torch default)
+
+_classifiers = {}
+_classifiers_lock = threading.Lock()
+
+
+class TextClassifier:
+    """
+    A sequence-classification model and its tokenizer, loaded once and shared.
+
+    Texts are tokenized without padding, sorted by length and cut into batches, so each
+    batch is only padded to its own longest text rather than to the longest in the column.
+    Results come back in input order as {"label", "score"} dicts, like a transformers
+    text-classification pipeline.
+    """
+
+    def __init__(self, model_id: str = TEXT_MODEL_ID, quantize: bool = TEXT_MODEL_QUANTIZE,
+                 max_length: int = TEXT_MODEL_MAX_LENGTH):
+        # Imported here so importing the agents doesn't pull in torch
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+        print(f"🧠 Loading text model {model_id}{' (int8 dynamic quantization)' if quantize else ''}...")
+        if TEXT_MODEL_THREADS:
+            torch.set_num_threads(TEXT_MODEL_THREADS)
+        self.torch = torch
+        self.model_id = model_id
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_id)
+        model = AutoModelForSequenceClassification.from_pretrained(model_id).eval()
+        if quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model
+        self.labels = model.config.id2label
+        self._lock = threading.Lock()
+
+    def classify(self, texts, batch_size: int = TEXT_MODEL_BATCH_SIZE) -> list:
+        texts = ["" if t is None or (isinstance(t, float) and math.isnan(t)) else str(t) for t in texts]
+        # Identical texts (common in categorical-ish columns) are classified once
+        unique = list(dict.fromkeys(texts))
+        encoded = self.tokenizer(unique, truncation=True, max_length=self.max_length)["input_ids"]
+        order = sorted(range(len(unique)), key=lambda i: len(encoded[i]))
+        results = {}
+        with self._lock, self.torch.inference_mode():
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                inputs = self.tokenizer.pad({"input_ids": [encoded[i] for i in batch]}, return_tensors="pt")
+                probs = self.model(**inputs).logits.softmax(dim=-1)
+                scores, label_ids = probs.max(dim=-1)
+                for i, score, label_id in zip(batch, scores.tolist(), label_ids.tolist()):
+                    results[unique[i]] = {"label": self.labels[label_id], "score": score}
+        return [results[t] for t in texts]
+
+
+def get_text_classifier(model_id: str = TEXT_MODEL_ID, quantize: bool = TEXT_MODEL_QUANTIZE) -> TextClassifier:
+    """The shared classifier for `model_id`, loaded on first use."""
+    key = (model_id, quantize)
+    classifier = _classifiers.get(key)
+    if classifier is None:
+        with _classifiers_lock:
+            classifier = _classifiers.get(key)
+            if classifier is None:
+                classifier = _classifiers[key] = TextClassifier(model_id, quantize)
+    return classifier
+
+
+def classify_texts(texts, model_id: str = TEXT_MODEL_ID, quantize: bool = TEXT_MODEL_QUANTIZE,
+                   batch_size: int = TEXT_MODEL_BATCH_SIZE) -> list:
+    return get_text_classifier(model_id, quantize).classify(texts, batch_size=batch_size)
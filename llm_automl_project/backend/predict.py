@@ -1,7 +1,6 @@
 import os
 import sys
 import pandas as pd
-import joblib
 from fastapi import HTTPException
 
 # Ensure current directory in sys.path for imports
@@ -10,28 +9,65 @@ if CURRENT_DIR not in sys.path:
     sys.path.insert(0, CURRENT_DIR)
 
 try:
-    from database import SessionLocal, Feedback
+    from feedback_writer import FEEDBACK_WRITER, FeedbackQueueFull
+    from model_cache import ModelCache
+    from database import record_model_load
+    from model_store import load_model_artifact
+    from model_registry import resolve_model
+    from tree_engine import engine_path, CompiledPipeline, CompiledPreprocessor, TREE_ENGINE_ENABLED, ENGINE_SUFFIX
 except ModuleNotFoundError as e:
     print("❌ Import failed:", e)
     raise
 
 MODEL_DIR = os.path.abspath(os.path.join(CURRENT_DIR, "../models/saved_models"))
+MODEL_CACHE = ModelCache(loader=load_model_artifact, on_load=record_model_load)
+PREDICT_BATCH_CHUNK_SIZE = int(os.getenv("PREDICT_BATCH_CHUNK_SIZE", 10000))
 
-def load_model(model_name: str):
+def _resolve_model_path(model_name: str) -> tuple:
+    # Legacy flat artifacts are addressed by file name; registered models by name[@alias|@vN]
     model_path = os.path.join(MODEL_DIR, model_name)
-    print(f"📦 Loading model: {model_path}")
-    if not os.path.isfile(model_path):
-        raise HTTPException(status_code=404, detail=f"Model '{model_name}' not found at {model_path}")
+    if os.path.isfile(model_path):
+        return model_name, model_path
+    resolved = resolve_model(model_name)
+    if resolved is None or not os.path.isfile(resolved[1]):
+        raise HTTPException(status_code=404, detail=f"Model '{model_name}' not found")
+    return resolved[:2]
+
+def load_model(model_name: str, use_engine: bool = TREE_ENGINE_ENABLED):
+    """
+    Load a model by file name or registry reference (`name`, `name@staging`, `name@v3`).
+
+    Registry aliases resolve through a pointer file that promotions replace atomically; the
+    cache key stays the alias, so the next request after a promotion loads the new version
+    while in-flight requests finish on the old one.
+    """
+    cache_key, model_path = _resolve_model_path(model_name)
     try:
-        model = joblib.load(model_path)
-        return model
+        # Prefer the compiled tree engine exported with the model; an engine older than the
+        # model file belongs to a previous version and is ignored
+        compiled_path = engine_path(model_path)
+        if use_engine and os.path.isfile(compiled_path) \
+                and os.stat(compiled_path).st_mtime_ns >= os.stat(model_path).st_mtime_ns:
+            return MODEL_CACHE.get(cache_key + ENGINE_SUFFIX, compiled_path)
+        return MODEL_CACHE.get(cache_key, model_path)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading model: {str(e)}")
 
+def _align_columns(model, input_df: pd.DataFrame) -> pd.DataFrame:
+    # Pipelines fitted on a DataFrame know their input columns; absent ones become missing values to impute
+    expected = getattr(model, "feature_names_in_", None)
+    if expected is None or list(input_df.columns) == list(expected):
+        return input_df
+    return input_df.reindex(columns=expected)
+
 def predict(model_name: str, input_data: dict):
     print(f"🔮 Running prediction using model: {model_name}")
     model = load_model(model_name)
-    input_df = pd.DataFrame([input_data])
+    if isinstance(model, CompiledPipeline) and isinstance(model.steps[0][1], CompiledPreprocessor):
+        # The compiled engine reads the row dict directly; a one-row DataFrame would cost more than the model
+        input_df = [input_data]
+    else:
+        input_df = _align_columns(model, pd.DataFrame([input_data]))
     try:
         prediction = model.predict(input_df)[0]
     except Exception as e:
@@ -39,21 +75,57 @@ def predict(model_name: str, input_data: dict):
     print(f"✅ Prediction result: {prediction}")
     return prediction
 
-def save_prediction_feedback(input_data: dict, prediction: str, correction: str = None):
-    print("🗂️ Saving prediction feedback...")
-    session = SessionLocal()
+def predict_batch(model_name: str, records, chunk_size: int = PREDICT_BATCH_CHUNK_SIZE, return_proba: bool = False) -> dict:
+    """
+    Score many rows with one vectorized model call per chunk.
+
+    Args:
+        model_name (str): File name of the saved model.
+        records (list[dict] | pd.DataFrame): Rows to score.
+        chunk_size (int): Maximum rows passed to the model at once, bounding peak memory.
+        return_proba (bool): Also return class probabilities (classifiers only).
+
+    Returns:
+        dict: Predictions, plus classes and probabilities when requested.
+    """
+    model = load_model(model_name)
+    input_df = records if isinstance(records, pd.DataFrame) else pd.DataFrame.from_records(records)
+    input_df = _align_columns(model, input_df)
+    if input_df.empty:
+        raise HTTPException(status_code=400, detail="No records to score.")
+    if return_proba and not hasattr(model, "predict_proba"):
+        raise HTTPException(status_code=400, detail=f"Model '{model_name}' does not support probabilities.")
+
+    chunk_size = max(1, chunk_size)
+    print(f"🔮 Running batch prediction on {len(input_df)} rows using model: {model_name}")
+    predictions, probabilities = [], []
     try:
-        entry = Feedback(
-            input_data=str(input_data),
-            prediction=prediction,
-            user_correction=correction
-        )
-        session.add(entry)
-        session.commit()
-        print("✅ Feedback saved to database.")
+        for start in range(0, len(input_df), chunk_size):
+            chunk = input_df.iloc[start:start + chunk_size]
+            predictions.extend(model.predict(chunk).tolist())
+            if return_proba:
+                probabilities.extend(model.predict_proba(chunk).tolist())
     except Exception as e:
-        session.rollback()
-        print(f"❌ Failed to save feedback: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to save feedback: {str(e)}")
-    finally:
-        session.close()
+        raise HTTPException(status_code=400, detail=f"Batch prediction failed: {str(e)}")
+
+    result = {"count": len(predictions), "predictions": predictions}
+    if return_proba:
+        result["classes"] = model.classes_.tolist()
+        result["probabilities"] = probabilities
+    return result
+
+def save_prediction_feedback(input_data: dict, prediction: str, correction: str = None, model_name: str = None):
+    """Queue a feedback row for the write-behind flusher; no database I/O on the request path."""
+    # Registered models are retrained per name; the version records which one served the request
+    resolved = resolve_model(model_name) if model_name else None
+    try:
+        FEEDBACK_WRITER.enqueue({
+            "input_data": input_data,
+            "prediction": str(prediction),
+            "user_correction": correction,
+            "model_name": model_name.partition("@")[0] if model_name else None,
+            "model_version": resolved[2] if resolved else None,
+        })
+    except FeedbackQueueFull as e:
+        print(f"❌ Failed to queue feedback: {e}")
+        raise HTTPException(status_code=503, detail=f"Failed to save feedback: {str(e)}")
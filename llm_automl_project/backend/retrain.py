@@ -1,49 +1,266 @@
 import os
 import sys
+import time
 import pandas as pd
-import json
+from dotenv import load_dotenv
+from sklearn.compose import TransformedTargetRegressor
+from sklearn.ensemble import BaseEnsemble, HistGradientBoostingClassifier, HistGradientBoostingRegressor
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
 
 # Fix imports when running this script directly
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, CURRENT_DIR)
 
 try:
-    from model_pipeline import train_and_save_model
-    from database import SessionLocal, Feedback
+    from model_pipeline import save_model_version, evaluate_model, metric_fields, split_train_test, PRIMARY_METRIC, ScaledTargetRegressor
+    from model_registry import get_alias_model, MODEL_AUTO_PROMOTE
+    from model_store import load_model_artifact
+    from dataset_cache import load_cached_dataset, dataset_sha256
+    from database import Feedback, RetrainRun, session_scope, feedback_high_water_marks, get_feedback_stats
 except ModuleNotFoundError as e:
     print("❌ Import failed:", e)
     raise
 
-def retrain_from_feedback():
+load_dotenv()
+
+RETRAIN_WARM_START_TREES = int(os.getenv("RETRAIN_WARM_START_TREES", 20))  # trees added to forests per retrain
+RETRAIN_WARM_START_ITER = int(os.getenv("RETRAIN_WARM_START_ITER", 20))  # boosting iterations added per retrain
+RETRAIN_MIN_EVAL_ROWS = 10  # smaller feedback batches are all trained on, none held out
+RETRAIN_FEEDBACK_HOLDOUT = 0.2  # share of new feedback held out to score the base and retrained versions
+
+
+def _new_feedback(name: str, after_id: int) -> tuple:
+    """Corrected feedback for `name` with id > `after_id`, as (features, labels, last id seen, skipped rows)."""
+    with session_scope() as session:
+        rows = session.query(Feedback.id, Feedback.input_data, Feedback.user_correction).filter(
+            Feedback.model_name == name, Feedback.user_correction.isnot(None), Feedback.id > after_id
+        ).order_by(Feedback.id).yield_per(1000)
+        records, labels, last_id, skipped = [], [], after_id, 0
+        for feedback_id, record, correction in rows:
+            last_id = feedback_id
+            if not isinstance(record, dict):
+                print(f"⚠️ Skipping feedback entry {feedback_id}: input is not a JSON object")
+                skipped += 1
+                continue
+            records.append(record)
+            labels.append(correction)
+    return pd.DataFrame.from_records(records), pd.Series(labels, dtype=object), last_id, skipped
+
+
+# Regressors wrapping a pipeline fitted on a standardized target (older streaming versions used sklearn's)
+TARGET_SCALED = (ScaledTargetRegressor, TransformedTargetRegressor)
+
+
+def _feature_names(model) -> list:
+    if isinstance(model, TARGET_SCALED):
+        model = model.regressor_
+    return list(model.feature_names_in_)
+
+
+def _final_estimator(model):
+    # Pipeline(preprocess, model), where model may itself be a dense-input Pipeline
+    if isinstance(model, TARGET_SCALED):
+        model = model.regressor_
+    estimator = model.steps[-1][1]
+    return estimator.steps[-1][1] if isinstance(estimator, Pipeline) else estimator
+
+
+def _cast_labels(labels: pd.Series, like) -> pd.Series:
+    # Corrections are stored as strings; numeric targets are converted and unparseable ones become NaN
+    if pd.api.types.is_numeric_dtype(like):
+        return pd.to_numeric(labels, errors="coerce")
+    return labels
+
+
+def _match_dtype(values: pd.Series, dtype) -> pd.Series:
+    # e.g. corrections parsed as 1.0 for an integer target, which would otherwise turn the classes into floats
     try:
-        print("🔁 Starting feedback-based retraining...")
+        return values.astype(dtype)
+    except (ValueError, TypeError):
+        return values
+
+
+def _update_model(model, X: pd.DataFrame, y: pd.Series, task_type: str) -> str:
+    """
+    Fit `model` further on (X, y) in place and return how it was updated.
 
-        session = SessionLocal()
-        feedback_entries = session.query(Feedback).filter(Feedback.user_correction.isnot(None)).all()
+    Forests grow extra trees and gradient boosting adds iterations with `warm_start`, on top
+    of the fitted preprocessing; SGD models take `partial_fit` steps. Anything else, or a
+    classifier whose rows don't cover exactly its known classes, is refitted from scratch on (X, y).
+    """
+    estimator = _final_estimator(model)
+    if hasattr(estimator, "partial_fit") and not isinstance(estimator, BaseEnsemble):
+        if isinstance(model, TARGET_SCALED):
+            pipeline = model.regressor_
+            y_scaled = model.transformer_.transform(y.to_numpy(dtype=float).reshape(-1, 1)).ravel()
+            pipeline.steps[-1][1].partial_fit(pipeline[:-1].transform(X), y_scaled)
+        else:
+            model.steps[-1][1].partial_fit(model[:-1].transform(X), y)
+        return "partial_fit"
 
-        if not feedback_entries:
-            print("ℹ️ No feedback found with user corrections.")
-            return "No feedback to retrain"
+    # Warm-started trees must predict the same classes as the existing ones
+    if task_type == "classification" and set(pd.unique(y)) != set(model.classes_):
+        model.fit(X, y)
+        return "refit"
+    if isinstance(estimator, BaseEnsemble):
+        estimator.set_params(warm_start=True, n_estimators=estimator.n_estimators + RETRAIN_WARM_START_TREES)
+    elif isinstance(estimator, (HistGradientBoostingClassifier, HistGradientBoostingRegressor)):
+        estimator.set_params(warm_start=True, max_iter=estimator.n_iter_ + RETRAIN_WARM_START_ITER)
+    else:
+        model.fit(X, y)
+        return "refit"
+    # Only the estimator step is fitted, so existing trees keep the feature space they were built on
+    model.steps[-1][1].fit(model[:-1].transform(X), y)
+    estimator.set_params(warm_start=False)
+    return "warm_start"
 
-        records = []
-        for entry in feedback_entries:
-            try:
-                x = json.loads(entry.input_data)
-                x['target'] = entry.user_correction
-                records.append(x)
-            except Exception as parse_err:
-                print(f"⚠️ Failed to parse feedback entry {entry.id}: {parse_err}")
 
-        df = pd.DataFrame(records)
-        file_path = os.path.join(CURRENT_DIR, "../data/feedback_retrain.csv")
-        df.to_csv(file_path, index=False)
+def _split_feedback(X: pd.DataFrame, y: pd.Series) -> tuple:
+    """(X_fit, X_eval, y_fit, y_eval) over new feedback, which no version has trained on yet."""
+    if len(X) < RETRAIN_MIN_EVAL_ROWS:
+        return X, X.iloc[:0], y, y.iloc[:0]
+    return train_test_split(X, y, test_size=RETRAIN_FEEDBACK_HOLDOUT, random_state=42)
 
-        print(f"📄 Saved retraining dataset to {file_path} with {len(df)} rows.")
 
-        model_path = train_and_save_model(file_path)
-        print(f"✅ Retrained model saved to {model_path}")
-        return model_path
+def _split_original(base, features: list) -> tuple:
+    """
+    The base's training set as (X_fit, X_eval, y_fit, y_eval), with its recorded test split held out.
 
+    When the split can't be rebuilt (no recorded seed, or the dataset changed since the base was
+    trained) every row is for fitting and the evaluation falls to the held-out feedback alone.
+    """
+    print(f"📂 Loading training set for {base.name} from the columnar cache: {base.dataset_path}")
+    original = load_cached_dataset(base.dataset_path, columns=features + [base.target])
+    original = original.dropna(subset=[base.target])
+    X, y = original[features], original[base.target]
+    if base.split_seed is not None and base.dataset_sha256 == dataset_sha256(base.dataset_path):
+        return split_train_test(X, y, base.split_seed)
+    print(f"⚠️ Can't rebuild the test split of {base.name} v{base.version}; scoring on held-out feedback only")
+    return X, X.iloc[:0], y, y.iloc[:0]
+
+
+def _record_run(**fields) -> int:
+    with session_scope() as session:
+        run = RetrainRun(**fields)
+        session.add(run)
+        session.flush()
+        return run.id
+
+
+def retrain_model_from_feedback(name: str) -> dict:
+    """
+    Fold corrected feedback received since the last run into the latest staged (else production) version of `name`.
+
+    Only feedback above the model's high-water mark is read. Warm-startable models are
+    updated on the original training rows (read from the columnar cache) plus the new
+    corrections; SGD models take partial_fit steps on the corrections alone. Both versions
+    are scored on rows the base never trained on: the base's own test split, rebuilt from
+    its recorded seed, plus a share of the new feedback held out from the update. The result
+    is registered as a new version and only promoted if it scores at least as well as the
+    base; the run records the feedback id range, rows consumed and both scores. A version that
+    isn't promoted leaves its run "rejected", which doesn't move the high-water mark, so the
+    same corrections are retried (with any newer ones) on the next run.
+    """
+    # Build on the newest candidate, so feedback folded into a not-yet-promoted version isn't lost
+    base = get_alias_model(name, "staging") or get_alias_model(name, "production")
+    if base is None:
+        raise ValueError(f"'{name}' is not a registered model")
+    if not base.target or not base.dataset_path:
+        raise ValueError(f"{name} v{base.version} has no recorded training set; retrain it from its dataset first")
+
+    with session_scope() as session:
+        after_id = feedback_high_water_marks(session).get(name, 0)
+    X_new, labels, last_id, skipped = _new_feedback(name, after_id)
+    if last_id == after_id:
+        print(f"ℹ️ No new feedback for {name}.")
+        return {"model_name": name, "status": "up_to_date", "feedback_rows": 0}
+
+    run = {"model_name": name, "base_version": base.version, "feedback_from_id": after_id}
+    start = time.perf_counter()
+    try:
+        model = load_model_artifact(base.filepath, mmap=False)
+        features = _feature_names(model)
+        task_type = base.task_type or "classification"
+        family = base.model_family or "model"
+        incremental = family == "sgd"
+
+        # Feedback rows carry whatever keys the client sent; align them to the training columns
+        X_new = X_new.reindex(columns=features)
+        like = pd.Series(model.classes_) if task_type == "classification" else pd.Series(dtype=float)
+        y_new = _cast_labels(labels, like)
+        keep = y_new.notna().to_numpy()
+        if incremental and task_type == "classification":
+            keep = keep & y_new.isin(model.classes_).to_numpy()  # partial_fit can't learn new classes
+        X_new, y_new = X_new[keep].reset_index(drop=True), y_new[keep].reset_index(drop=True)
+        if task_type == "classification":
+            y_new = _match_dtype(y_new, model.classes_.dtype)
+        skipped += int((~keep).sum())
+        if X_new.empty:
+            raise ValueError("no usable corrections in the new feedback")
+
+        X_fit, X_eval, y_fit, y_eval = _split_feedback(X_new, y_new)
+        dataset_rows = 0
+        if not incremental:
+            X_orig_fit, X_orig_eval, y_orig_fit, y_orig_eval = _split_original(base, features)
+            dataset_rows = len(X_orig_fit) + len(X_orig_eval)
+            dtype = y_orig_fit.dtype
+            X_fit = pd.concat([X_orig_fit, X_fit], ignore_index=True)
+            y_fit = pd.concat([y_orig_fit, _match_dtype(y_fit, dtype)], ignore_index=True)
+            X_eval = pd.concat([X_orig_eval, X_eval], ignore_index=True)
+            y_eval = pd.concat([y_orig_eval, _match_dtype(y_eval, dtype)], ignore_index=True)
+        if X_eval.empty:
+            print(f"ℹ️ Too little new feedback for {name} to hold any out for evaluation; waiting for more.")
+            return {"model_name": name, "status": "insufficient_feedback", "feedback_rows": len(X_new)}
+        print(f"🔁 Retraining {name} v{base.version} on {dataset_rows} dataset + {len(X_new)} feedback rows "
+              f"(feedback ids {after_id + 1}..{last_id}, {skipped} skipped), scoring on {len(X_eval)} unseen rows")
+
+        # The base is scored first: updating warm-starts it in place
+        metric = PRIMARY_METRIC[task_type]
+        base_score = evaluate_model(task_type, y_eval, model.predict(X_eval))[metric]
+        mode = _update_model(model, X_fit, y_fit, task_type)
+        metrics = evaluate_model(task_type, y_eval, model.predict(X_eval))
+        promoted = metrics[metric] >= base_score
+        fit_seconds = time.perf_counter() - start
+        print(f"📈 Retrained model ({mode}) metrics: {metrics} ({metric} {base_score:.4f} before)")
+
+        # A version that scores worse than its base is kept for inspection but not promoted
+        registered = save_model_version(model, base.dataset_path, family, None if incremental else X_eval,
+                                        promote_to=MODEL_AUTO_PROMOTE if promoted else "none",
+                                        model_family=family, target=base.target, params=base.params,
+                                        train_rows=len(X_fit), fit_seconds=fit_seconds, split_seed=base.split_seed,
+                                        **metric_fields(task_type, metrics))
+        run.update(version=registered["version"], mode=mode, feedback_to_id=last_id, feedback_rows=len(X_new),
+                   dataset_rows=dataset_rows, rows_consumed=len(X_fit), holdout_rows=len(X_eval),
+                   base_score=base_score, score=metrics[metric], promoted=promoted,
+                   status="completed" if promoted else "rejected")
+        run["id"] = _record_run(**run)
+        print(f"✅ Retrained {name}: v{base.version} -> v{registered['version']} ({mode}, {len(X_fit)} rows)")
+        if not promoted:
+            print(f"⚠️ v{registered['version']} not promoted: {metric} fell from {base_score:.4f} to {metrics[metric]:.4f}; "
+                  f"feedback ids {after_id + 1}..{last_id} stay pending")
+        return {**run, "model_path": registered["path"], "skipped_feedback": skipped, "metrics": metrics}
     except Exception as e:
-        print("❌ Error during retraining:", e)
+        # The high-water mark stays put, so the same feedback is picked up by the next run
+        _record_run(**run, feedback_to_id=after_id, status="failed", error=str(e))
         raise
+
+
+def retrain_from_feedback(model_name: str = None):
+    """Retrain `model_name`, or every registered model with new corrected feedback."""
+    print("🔁 Starting feedback-based retraining...")
+    if model_name:
+        return [retrain_model_from_feedback(model_name.partition("@")[0])]
+
+    names = sorted(get_feedback_stats()["pending_by_model"])
+    if not names:
+        print("ℹ️ No feedback found with user corrections.")
+        return "No feedback to retrain"
+    results = []
+    for name in names:
+        try:
+            results.append(retrain_model_from_feedback(name))
+        except Exception as e:
+            print("❌ Error during retraining:", e)
+            results.append({"model_name": name, "status": "failed", "error": str(e)})
+    return results
@@ -1,7 +1,15 @@
+import os
+import sys
 from apscheduler.schedulers.background import BackgroundScheduler
-from backend.background_tasks import auto_retrain_task
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+if CURRENT_DIR not in sys.path:
+    sys.path.insert(0, CURRENT_DIR)
+
+from background_tasks import run_daily_monitoring
 
 def start_retrain_scheduler():
+    # Alternative to the API's monitoring loop for processes that don't run the server
     scheduler = BackgroundScheduler()
-    scheduler.add_job(auto_retrain_task, 'interval', hours=24)
+    scheduler.add_job(run_daily_monitoring, 'interval', hours=24)
     scheduler.start()
@@ -0,0 +1,16 @@
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Every store the backend writes to points into a throwaway directory, before any module reads its settings
+_SCRATCH = tempfile.mkdtemp(prefix="automl-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_SCRATCH, 'automl.db')}"
+os.environ["MODEL_REGISTRY_DIR"] = os.path.join(_SCRATCH, "registry")
+os.environ["FEEDBACK_ARCHIVE_DIR"] = os.path.join(_SCRATCH, "feedback_archive")
+os.environ["FEEDBACK_DEAD_LETTER_PATH"] = os.path.join(_SCRATCH, "feedback_dead_letter.jsonl")
+os.environ["LLM_CACHE_PATH"] = os.path.join(_SCRATCH, "llm_cache.sqlite")
+os.environ["EDA_CACHE_DIR"] = os.path.join(_SCRATCH, "eda_cache")
@@ -0,0 +1,33 @@
+import sys
+import threading
+
+from fastapi.testclient import TestClient
+
+import app
+import background_tasks
+import database
+
+
+def test_tasks_share_the_app_modules():
+    assert background_tasks.get_feedback_stats is database.get_feedback_stats
+    assert not [name for name in sys.modules if name.startswith("backend.")]
+
+
+def test_server_lifespan_runs_retrain_then_archive(monkeypatch):
+    calls, archived = [], threading.Event()
+
+    def stats():
+        calls.append("retrain")
+        return {"should_retrain": False, "feedback_count": 0}
+
+    def archive():
+        calls.append("archive")
+        archived.set()
+
+    monkeypatch.setattr(background_tasks, "get_feedback_stats", stats)
+    monkeypatch.setattr(background_tasks, "archive_feedback", archive)
+
+    with TestClient(app.app):
+        assert archived.wait(timeout=10)
+
+    assert calls == ["retrain", "archive"]
@@ -0,0 +1,13 @@
+import pandas as pd
+
+from eda_generator import generate_eda_report
+
+
+def test_columns_with_the_same_slug_get_separate_charts(tmp_path):
+    df = pd.DataFrame({"a b": [1.0, 2.0, 3.0, 4.0] * 5, "a_b": [10.0, 20.0, 30.0, 40.0] * 5, "a/b": [0.5, 1.5] * 10})
+
+    report = generate_eda_report(df, output_dir=str(tmp_path), workers=1)
+
+    hists = sorted(p.name for p in tmp_path.glob("*_hist.png"))
+    assert len(hists) == 3
+    assert len(set(report["charts"])) == len(report["charts"])
@@ -0,0 +1,51 @@
+import json
+import time
+
+import pytest
+
+import feedback_writer
+from database import Feedback, init_db, session_scope
+from feedback_writer import FeedbackWriter
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _db():
+    init_db()
+
+
+def _stored(model_name: str) -> list:
+    with session_scope() as session:
+        return [row.prediction for row in session.query(Feedback).filter(Feedback.model_name == model_name)]
+
+
+def test_poison_row_is_dead_lettered_and_the_rest_of_its_batch_saved(tmp_path):
+    dead_letter = tmp_path / "dead.jsonl"
+    writer = FeedbackWriter(batch_size=10, flush_interval=0.05, max_retries=2, dead_letter_path=str(dead_letter))
+    for n in range(3):
+        writer.enqueue({"input_data": {"x": n}, "prediction": str(n), "model_name": "poison_batch"})
+    # SQLite's DateTime type rejects strings, so every insert containing this row fails
+    writer.enqueue({"input_data": {"x": 3}, "prediction": "bad", "model_name": "poison_batch", "timestamp": "yesterday"})
+    writer.enqueue({"input_data": {"x": 4}, "prediction": "4", "model_name": "poison_batch"})
+
+    # Given up on after max_retries while the writer keeps running, not retried forever
+    deadline = time.monotonic() + 10
+    while writer.stats()["dead_lettered"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert writer.stats()["running"]
+    writer.stop(timeout=10)
+
+    assert sorted(_stored("poison_batch")) == ["0", "1", "2", "4"]
+    entries = [json.loads(line) for line in dead_letter.read_text().splitlines()]
+    assert [entry["row"]["prediction"] for entry in entries] == ["bad"]
+    assert writer.stats()["dead_lettered"] == 1
+    assert writer.stats()["failed_flushes"] <= 2
+
+
+def test_restarts_register_one_exit_hook(monkeypatch):
+    hooks = []
+    monkeypatch.setattr(feedback_writer.atexit, "register", hooks.append)
+    writer = FeedbackWriter(flush_interval=0.05)
+    for _ in range(3):
+        writer.start()
+        writer.stop(timeout=5)
+    assert len(hooks) == 1
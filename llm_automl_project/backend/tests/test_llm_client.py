@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+import requests
+
+import llm_client
+from llm_client import CircuitBreaker, CircuitOpenError, LLMClient, LLMError
+
+
+class _Response:
+    def __init__(self, status_code: int, body=None):
+        self.status_code = status_code
+        self.headers = {}
+        self._body = body
+        self.text = str(body)
+
+    def json(self):
+        return self._body
+
+
+def _client(monkeypatch, replies, **kwargs) -> tuple:
+    """A client whose HTTP posts return (or raise) `replies` in turn, and the list of timeouts it used."""
+    monkeypatch.setattr(llm_client, "LLM_BACKOFF_BASE", 0.001)
+    client = LLMClient(base_url="http://stub", api_key="test", cache=None, **kwargs)
+    timeouts = []
+
+    def post(url, headers=None, json=None, timeout=None):
+        timeouts.append(timeout)
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    monkeypatch.setattr(client.session, "post", post)
+    return client, timeouts
+
+
+def test_breaker_counts_one_failure_per_call_not_per_attempt(monkeypatch):
+    replies = [requests.ConnectionError("down")] * 4
+    client, timeouts = _client(monkeypatch, replies, max_retries=3, breaker=CircuitBreaker(threshold=2, cooldown=60))
+
+    with pytest.raises(LLMError):
+        client.chat("hi")
+
+    assert len(timeouts) == 4
+    assert client.breaker.state == "closed"  # four failed attempts, one failed call
+    assert client.stats()["failures"] == 1
+
+
+def test_breaker_opens_after_threshold_failed_calls(monkeypatch):
+    replies = [requests.ConnectionError("down")] * 2
+    client, _ = _client(monkeypatch, replies, max_retries=0, breaker=CircuitBreaker(threshold=2, cooldown=60))
+    for _ in range(2):
+        with pytest.raises(LLMError):
+            client.chat("hi")
+    with pytest.raises(CircuitOpenError):
+        client.chat("hi")
+
+
+def test_rejected_request_does_not_trip_the_breaker(monkeypatch):
+    replies = [_Response(400, "bad payload")] * 3
+    client, _ = _client(monkeypatch, replies, breaker=CircuitBreaker(threshold=1, cooldown=60))
+    for _ in range(3):
+        with pytest.raises(LLMError):
+            client.chat("hi")
+    assert client.breaker.state == "closed"
+
+
+def test_attempts_get_connect_and_read_timeouts_within_the_budget(monkeypatch):
+    ok = _Response(200, {"choices": [{"message": {"content": "fine"}}]})
+    client, timeouts = _client(monkeypatch, [ok, ok], connect_timeout=3, read_timeout=90, budget=600)
+
+    assert client.chat("hi") == "fine"
+    assert timeouts[0] == (3, 90)
+
+    assert client.chat("hi", budget=10) == "fine"
+    connect, read = timeouts[1]
+    assert connect == 3 and 9 < read <= 10
+
+
+@pytest.mark.skipif(llm_client.httpx is None, reason="httpx not installed")
+def test_async_client_from_a_previous_loop_is_closed():
+    client = LLMClient(base_url="http://stub", api_key="test", cache=None)
+    first = asyncio.run(client._get_async_client())
+    second = asyncio.run(client._get_async_client())
+    assert second is not first
+    assert first.is_closed
+    asyncio.run(client.aclose())
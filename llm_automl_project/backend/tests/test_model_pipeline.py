@@ -0,0 +1,75 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import model_pipeline
+from database import ModelMetadata, init_db, session_scope
+from model_pipeline import ScaledTargetRegressor, search_and_save_model, train_and_save_model_streaming
+from model_registry import list_models
+from model_store import load_model_artifact
+from retrain import _update_model
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _db():
+    init_db()
+
+
+def test_search_candidates_are_logged_under_the_dataset_name(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(300, 3)), columns=["a", "b", "c"])
+    df["label"] = (df["a"] > 0).astype(int)
+    path = tmp_path / "churn.csv"
+    df.to_csv(path, index=False)
+
+    search_and_save_model(str(path), time_budget=60, n_candidates=1, n_jobs=1)
+
+    with session_scope() as session:
+        rows = session.query(ModelMetadata.name, ModelMetadata.model_family, ModelMetadata.status,
+                             ModelMetadata.version).filter(ModelMetadata.search_id.isnot(None)).all()
+    candidates = [row for row in rows if row.version is None]
+    assert candidates
+    assert {row.name for row in rows} == {"churn"}
+    assert {row.status for row in candidates} == {"candidate"}
+    assert {row.model_family for row in candidates} >= {"random_forest", "logistic_regression"}
+    assert [model["name"] for model in list_models()].count("churn") == 1
+
+
+@pytest.mark.parametrize("family, n_jobs", [("random_forest", -1), ("logistic_regression", None)])
+def test_refit_only_parallelises_forests(tmp_path, monkeypatch, family, n_jobs):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(300, 3)), columns=["a", "b", "c"])
+    df["label"] = (df["a"] > 0).astype(int)
+    path = tmp_path / f"refit_{family}.csv"
+    df.to_csv(path, index=False)
+    space = model_pipeline.SEARCH_SPACES["classification"]
+    monkeypatch.setitem(model_pipeline.SEARCH_SPACES, "classification", {family: space[family]})
+
+    with warnings.catch_warnings():
+        warnings.filterwarnings("error", message=".*n_jobs.*", category=FutureWarning)
+        model_path = search_and_save_model(str(path), time_budget=60, n_candidates=1, n_jobs=1)
+
+    estimator = load_model_artifact(model_path, mmap=False).steps[-1][1]
+    assert estimator.get_params().get("n_jobs") == n_jobs
+
+
+def test_streaming_regressor_predicts_in_target_units_and_keeps_learning(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(2000, 2)), columns=["a", "b"])
+    df["price"] = 1000 + 50 * df["a"] - 20 * df["b"]
+    path = tmp_path / "prices.csv"
+    df.to_csv(path, index=False)
+
+    # Loaded writable, as retraining does; partial_fit updates the coefficients in place
+    model = load_model_artifact(train_and_save_model_streaming(str(path), target="price"), mmap=False)
+
+    assert isinstance(model, ScaledTargetRegressor)
+    assert model.feature_names_in_.tolist() == ["a", "b"]
+    X = df[["a", "b"]].head(100)
+    assert np.abs(model.predict(X) - df["price"].head(100)).mean() < 5
+
+    # Feedback corrections are scaled like the original target before the partial_fit step
+    assert _update_model(model, X, df["price"].head(100) + 100, "regression") == "partial_fit"
+    assert 1000 < model.predict(X).mean() < 1100
@@ -0,0 +1,58 @@
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+import model_store
+from model_cache import ModelCache
+from model_store import load_model_artifact, save_model_artifact
+from tree_engine import compile_model
+
+
+def _forest():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 4))
+    return RandomForestClassifier(n_estimators=10, random_state=0).fit(X, (X[:, 0] > 0).astype(int)), X
+
+
+def test_save_does_not_reload_the_artifact(tmp_path, monkeypatch):
+    def no_load(*args, **kwargs):
+        raise AssertionError("save_model_artifact loaded the file it wrote")
+
+    monkeypatch.setattr(model_store.joblib, "load", no_load)
+    info = save_model_artifact({"weights": np.arange(10)}, str(tmp_path / "model.pkl"))
+    assert info["artifact_bytes"] > 0
+    assert "load_seconds" not in info
+
+
+def test_engine_node_arrays_are_memory_mapped(tmp_path):
+    forest, X = _forest()
+    path = str(tmp_path / "forest.engine")
+    save_model_artifact(compile_model(forest), path)
+
+    engine = load_model_artifact(path)
+
+    for name in ("feature", "threshold", "left", "right", "value"):
+        assert isinstance(getattr(engine, name), np.memmap), name
+    assert engine.threshold.dtype == np.float32
+    np.testing.assert_array_equal(engine.predict(X), forest.predict(X))
+
+
+def test_sklearn_trees_copy_their_node_arrays(tmp_path):
+    # Why serving prefers the compiled engine: Tree.__setstate__ copies, so nothing stays mapped
+    forest, _ = _forest()
+    path = str(tmp_path / "forest.pkl")
+    save_model_artifact(forest, path)
+    assert not isinstance(load_model_artifact(path).estimators_[0].tree_.threshold, np.memmap)
+
+
+def test_cache_reports_measured_load_time(tmp_path):
+    path = str(tmp_path / "model.pkl")
+    joblib.dump({"weights": np.arange(10)}, path)
+    loads = []
+    cache = ModelCache(loader=load_model_artifact, on_load=lambda p, seconds: loads.append((p, seconds)))
+
+    cache.get("model", path)
+    cache.get("model", path)
+
+    assert len(loads) == 1 and loads[0][0] == path and loads[0][1] >= 0
+    assert cache.stats()["load_seconds"]["model"] >= 0
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import model_pipeline
+import retrain
+from database import Feedback, feedback_high_water_marks, get_feedback_stats, init_db, session_scope
+from model_pipeline import train_and_save_model
+from model_registry import get_alias_model
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _db():
+    init_db()
+
+
+def _dataset(tmp_path, name: str, learnable: bool, n_rows: int = 600) -> str:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(n_rows, 4)), columns=["a", "b", "c", "d"])
+    df.insert(0, "row_id", np.arange(n_rows))
+    df["label"] = (df["a"] > 0).astype(int) if learnable else rng.integers(0, 2, n_rows)
+    path = tmp_path / f"{name}.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def _add_feedback(name: str, n_rows: int, learnable: bool, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    with session_scope() as session:
+        for i in range(n_rows):
+            record = {"row_id": 10_000 + i, **{col: float(v) for col, v in zip("abcd", rng.normal(size=4))}}
+            label = int(record["a"] > 0) if learnable else int(rng.integers(0, 2))
+            session.add(Feedback(input_data=record, prediction="0", user_correction=str(label), model_name=name))
+
+
+def test_random_labels_are_not_scored_above_chance(tmp_path):
+    # Scoring on rows the base trained on used to report ~0.9 accuracy on pure noise
+    train_and_save_model(_dataset(tmp_path, "noise_labels", learnable=False), streaming=False, search=False)
+    _add_feedback("noise_labels", 100, learnable=False)
+
+    result = retrain.retrain_model_from_feedback("noise_labels")
+
+    assert result["status"] == ("completed" if result["promoted"] else "rejected")
+    assert result["holdout_rows"] == 120 + 20  # the base's test split plus a fifth of the feedback
+    assert result["metrics"]["accuracy"] < 0.7
+    assert result["base_score"] < 0.7
+
+
+def test_holdout_is_disjoint_from_base_training_rows(tmp_path, monkeypatch):
+    seen = {}
+    split = model_pipeline.split_train_test
+
+    def spy(X, y, seed):
+        parts = split(X, y, seed)
+        seen["train"], seen["test"] = set(parts[0]["row_id"]), set(parts[1]["row_id"])
+        return parts
+
+    monkeypatch.setattr(model_pipeline, "split_train_test", spy)
+    train_and_save_model(_dataset(tmp_path, "split_rows", learnable=True), streaming=False, search=False)
+    base = get_alias_model("split_rows", "production")
+
+    X_fit, X_eval, _, _ = retrain._split_original(base, ["row_id", "a", "b", "c", "d"])
+
+    assert set(X_eval["row_id"]) == seen["test"]
+    assert not set(X_eval["row_id"]) & seen["train"]
+    assert set(X_fit["row_id"]) == seen["train"]
+
+
+def test_worse_version_is_registered_but_not_promoted(tmp_path, monkeypatch):
+    train_and_save_model(_dataset(tmp_path, "gated", learnable=True), streaming=False, search=False)
+    base = get_alias_model("gated", "staging") or get_alias_model("gated", "production")
+    _add_feedback("gated", 50, learnable=True)
+
+    def unlearn(model, X, y, task_type):
+        model.fit(X, 1 - y)  # flipped labels: strictly worse on the holdout
+        return "refit"
+
+    monkeypatch.setattr(retrain, "_update_model", unlearn)
+    with session_scope() as session:
+        after_id = feedback_high_water_marks(session).get("gated", 0)
+    result = retrain.retrain_model_from_feedback("gated")
+
+    assert result["status"] == "rejected"
+    assert result["promoted"] is False
+    assert result["score"] < result["base_score"]
+    assert result["version"] == base.version + 1
+    for alias in ("staging", "production"):
+        served = get_alias_model("gated", alias)
+        assert served is None or served.version == base.version
+    # The corrections never reached a served model, so the next run picks them up again
+    with session_scope() as session:
+        assert feedback_high_water_marks(session).get("gated", 0) == after_id
+    assert get_feedback_stats()["pending_by_model"]["gated"] == 50
@@ -0,0 +1,48 @@
+import asyncio
+import threading
+
+import text_batch
+
+
+class _FakeClient:
+    configured = True
+
+    def __init__(self):
+        self.loops = set()
+        self.prompts = 0
+
+    async def achat(self, prompt: str, **kwargs) -> str:
+        self.loops.add(id(asyncio.get_running_loop()))
+        self.prompts += 1
+        items = text_batch._ITEM.findall(prompt)
+        if not items:
+            return prompt.rsplit("\n", 1)[-1].upper()
+        return "\n".join(f"<t id={n}>{text.upper()}</t>" for n, text in items)
+
+
+def test_blocking_calls_share_one_event_loop(monkeypatch):
+    # One loop for every call, so the async client's pooled connections are reused
+    client = _FakeClient()
+    monkeypatch.setattr(text_batch, "LLM_CLIENT", client)
+
+    first = text_batch.process_texts(["a", "b", "a"], rate=0)
+    second = text_batch.process_texts(["c"], rate=0)
+
+    assert first["texts"] == ["A", "B", "A"] and first["unique"] == 2
+    assert second["texts"] == ["C"]
+    assert len(client.loops) == 1
+
+
+def test_progress_is_reported_on_the_calling_thread(monkeypatch):
+    monkeypatch.setattr(text_batch, "LLM_CLIENT", _FakeClient())
+    caller = threading.get_ident()
+    updates = []
+
+    def on_progress(done, total, results):
+        updates.append((threading.get_ident(), done, total, dict(results)))
+
+    result = text_batch.process_texts([f"t{n}" for n in range(5)], batch_size=2, rate=0, on_progress=on_progress)
+
+    assert {thread for thread, *_ in updates} == {caller}
+    assert updates[-1][1:3] == (5, 5)
+    assert result["texts"] == [f"T{n}" for n in range(5)]
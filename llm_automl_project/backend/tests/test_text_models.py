@@ -0,0 +1,86 @@
+from contextlib import nullcontext
+
+from multimodal import text_models
+from multimodal.text_models import TextClassifier
+
+
+class _Rows:
+    """Just enough of a torch tensor for TextClassifier.classify: softmax, max and tolist."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def softmax(self, dim):
+        return self
+
+    def max(self, dim):
+        return _Rows([max(row) for row in self.rows]), _Rows([row.index(max(row)) for row in self.rows])
+
+    def tolist(self):
+        return self.rows
+
+
+class _Tokenizer:
+    def __call__(self, texts, truncation, max_length):
+        # One token per character, so token length follows text length
+        return {"input_ids": [[ord(c) for c in text][:max_length] for text in texts]}
+
+    def pad(self, encoded, return_tensors):
+        width = max(len(ids) for ids in encoded["input_ids"])
+        return {"input_ids": [ids + [0] * (width - len(ids)) for ids in encoded["input_ids"]]}
+
+
+class _Model:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, input_ids):
+        self.batches.append(input_ids)
+        lengths = [sum(1 for token in row if token) for row in input_ids]
+        # "odd" or "even" token count, with the length itself as the score
+        return type("Output", (), {"logits": _Rows([[n * (n % 2 == 0), n * (n % 2)] for n in lengths])})
+
+
+def _classifier() -> TextClassifier:
+    classifier = TextClassifier.__new__(TextClassifier)
+    classifier.torch = type("Torch", (), {"inference_mode": staticmethod(nullcontext)})
+    classifier.tokenizer, classifier.model = _Tokenizer(), _Model()
+    classifier.labels = {0: "even", 1: "odd"}
+    classifier.max_length = 64
+    classifier._lock = nullcontext()
+    return classifier
+
+
+def test_sorted_batches_map_back_to_input_order_and_duplicates_run_once():
+    classifier = _classifier()
+    texts = ["ccc", "a", "eeeee", "bb", "a", None, "dddd", "ccc"]
+
+    results = classifier.classify(texts, batch_size=2)
+
+    lengths = [0 if t is None else len(t) for t in texts]
+    assert [r["label"] for r in results] == ["odd" if n % 2 else "even" for n in lengths]
+    assert [r["score"] for r in results] == lengths
+    # Six distinct texts in three batches, shortest first, each padded only to its own longest text
+    batches = classifier.model.batches
+    assert sum(len(batch) for batch in batches) == 6
+    assert [len(batch[0]) for batch in batches] == [1, 3, 5]
+
+
+def test_classify_texts_loads_the_requested_quantization(monkeypatch):
+    loaded = []
+
+    class _Loaded:
+        def __init__(self, model_id, quantize):
+            loaded.append((model_id, quantize))
+
+        def classify(self, texts, batch_size):
+            return [{"label": "x", "score": 1.0} for _ in texts]
+
+    monkeypatch.setattr(text_models, "TextClassifier", _Loaded)
+    monkeypatch.setattr(text_models, "_classifiers", {})
+
+    text_models.classify_texts(["a"], model_id="m", quantize=True)
+    text_models.classify_texts(["b"], model_id="m", quantize=True)
+    text_models.classify_texts(["c"], model_id="m", quantize=False)
+
+    assert loaded == [("m", True), ("m", False)]
@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import eda_generator
+import model_pipeline
+import training_jobs
+from database import ModelMetadata, TrainingJob, init_db, session_scope
+from model_registry import REGISTRY_DIR
+from training_jobs import JobCancelled, cancel_job, get_job, run_training_job
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _db():
+    init_db()
+
+
+def _job(dataset: str) -> str:
+    job_id = f"job-{dataset}"
+    with session_scope() as session:
+        session.add(TrainingJob(id=job_id, dataset=dataset, status="queued", progress=0.0))
+    return job_id
+
+
+def _dataset(tmp_path, name: str) -> str:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(200, 3)), columns=["a", "b", "c"])
+    df["label"] = (df["a"] > 0).astype(int)
+    path = tmp_path / f"{name}.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def test_job_cancelled_during_training_registers_no_version(tmp_path, monkeypatch):
+    job_id = _job("cancelled_mid_fit")
+    monkeypatch.setattr(eda_generator, "generate_cached_eda_report",
+                        lambda path, loader: {"eda_dir": None, "eda_pdf": None, "cached": True})
+    export = model_pipeline.export_engine
+
+    def cancel_while_saving(*args):
+        assert cancel_job(job_id) == "cancelling"
+        return export(*args)
+
+    monkeypatch.setattr(model_pipeline, "export_engine", cancel_while_saving)
+
+    with pytest.raises(JobCancelled):
+        run_training_job(job_id, _dataset(tmp_path, "cancelled_mid_fit"), search=False)
+
+    assert get_job(job_id)["status"] == "cancelled"
+    with session_scope() as session:
+        assert session.query(ModelMetadata).filter(ModelMetadata.name == "cancelled_mid_fit").count() == 0
+    assert not os.listdir(os.path.join(REGISTRY_DIR, "cancelled_mid_fit"))
+
+
+def test_cancel_after_registration_is_not_overwritten_with_completed():
+    job_id = _job("cancelled_late")
+    training_jobs._update_job(job_id, status="cancelling")
+
+    training_jobs._finish(job_id, {"model_path": "/models/late/v1/model.pkl"})
+
+    job = get_job(job_id)
+    assert job["status"] == "cancelled"
+    assert job["result"]["model_path"] == "/models/late/v1/model.pkl"
@@ -0,0 +1,80 @@
+import subprocess
+import sys
+import textwrap
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.pipeline import Pipeline
+
+import predict
+from conftest import BACKEND_DIR
+from tree_engine import CompiledForest, CompiledPreprocessor, compile_model, validate_engine
+from utils import build_preprocessor
+
+
+def test_compiled_forest_matches_sklearn():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 5))
+    y = (X[:, 0] + X[:, 1] > 0).astype(int)
+    forest = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    engine = compile_model(forest)
+    np.testing.assert_array_equal(engine.predict(X), forest.predict(X))
+    np.testing.assert_allclose(engine.predict_proba(X), forest.predict_proba(X))
+
+
+@pytest.mark.parametrize("with_categories", [False, True])
+def test_compiled_pipeline_matches_sklearn(with_categories):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(300, 3)), columns=["a", "b", "c"])
+    if with_categories:
+        X["colour"] = rng.choice(["red", "green", "blue"], size=len(X))
+    y = (X["a"] > 0).astype(int)
+    model = Pipeline([("preprocess", build_preprocessor(X)),
+                      ("model", RandomForestClassifier(n_estimators=10, random_state=0))]).fit(X, y)
+    engine = compile_model(model, X)
+    assert isinstance(engine.steps[0][1], CompiledPreprocessor)
+    assert validate_engine(model, engine, X)
+    np.testing.assert_array_equal(engine.predict(X.to_dict("records")), model.predict(X))
+
+
+def test_compiled_regressor_pipeline_has_no_probabilities(monkeypatch):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(300, 3)), columns=["a", "b", "c"])
+    model = Pipeline([("preprocess", build_preprocessor(X, task_type="regression")),
+                      ("model", RandomForestRegressor(n_estimators=10, random_state=0))]).fit(X, X["a"] * 2)
+    engine = compile_model(model, X)
+    assert not hasattr(engine, "predict_proba")
+    monkeypatch.setattr(predict, "load_model", lambda name: engine)
+
+    result = predict.predict_batch("prices", X.head(20))
+    np.testing.assert_allclose(result["predictions"], model.predict(X.head(20)))
+    with pytest.raises(HTTPException) as rejected:
+        predict.predict_batch("prices", X.head(20), return_proba=True)
+    assert rejected.value.status_code == 400
+    assert "does not support probabilities" in rejected.value.detail
+
+
+def test_compiled_objects_are_inference_only():
+    assert not hasattr(CompiledForest, "fit")
+    assert not hasattr(CompiledPreprocessor, "fit")
+
+
+def test_process_exits_after_prediction_on_worker_thread():
+    # FastAPI runs sync endpoints on threadpool threads; the interpreter must still exit afterwards
+    script = textwrap.dedent(f"""
+        import sys, threading
+        sys.path.insert(0, {BACKEND_DIR!r})
+        import numpy as np
+        from sklearn.ensemble import RandomForestRegressor
+        from tree_engine import compile_model
+        X = np.random.default_rng(0).normal(size=(2000, 4))
+        engine = compile_model(RandomForestRegressor(n_estimators=5, random_state=0).fit(X, X[:, 0]))
+        worker = threading.Thread(target=engine.predict, args=(X,))
+        worker.start()
+        worker.join()
+    """)
+    result = subprocess.run([sys.executable, "-c", script], timeout=60, capture_output=True)
+    assert result.returncode == 0, result.stderr.decode()
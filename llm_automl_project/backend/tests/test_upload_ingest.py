@@ -0,0 +1,69 @@
+import asyncio
+import os
+
+import pytest
+from fastapi import HTTPException
+
+from upload_ingest import append_upload_chunk, complete_upload, start_resumable_upload, upload_status
+
+
+async def _body(data: bytes, piece: int = 4):
+    for start in range(0, len(data), piece):
+        await asyncio.sleep(0)  # yield between pieces, as a network body would
+        yield data[start:start + piece]
+
+
+def test_concurrent_puts_at_the_same_offset_write_once(tmp_path):
+    data_dir = str(tmp_path)
+    chunk = b"a,b\n1,2\n3,4\n"
+    upload = start_resumable_upload(data_dir, "race.csv", total_size=len(chunk))
+
+    async def race():
+        return await asyncio.gather(
+            append_upload_chunk(data_dir, upload["upload_id"], 0, _body(chunk)),
+            append_upload_chunk(data_dir, upload["upload_id"], 0, _body(chunk)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(race())
+
+    accepted = [r for r in results if isinstance(r, dict)]
+    conflicts = [r for r in results if isinstance(r, HTTPException)]
+    assert len(accepted) == 1 and accepted[0]["offset"] == len(chunk)
+    assert len(conflicts) == 1 and conflicts[0].status_code == 409
+    assert conflicts[0].detail["offset"] == len(chunk)
+    assert upload_status(data_dir, upload["upload_id"])["offset"] == len(chunk)
+
+    stored = asyncio.run(complete_upload(data_dir, upload["upload_id"]))
+    assert (tmp_path / "race.csv").read_bytes() == chunk
+    assert stored["size"] == len(chunk)
+
+
+def test_resumed_chunks_append_in_order(tmp_path):
+    data_dir = str(tmp_path)
+    upload = start_resumable_upload(data_dir, "resumed.csv", total_size=12)
+
+    asyncio.run(append_upload_chunk(data_dir, upload["upload_id"], 0, _body(b"a,b\n1,2\n")))
+    with pytest.raises(HTTPException) as stale:
+        asyncio.run(append_upload_chunk(data_dir, upload["upload_id"], 0, _body(b"a,b\n1,2\n")))
+    assert stale.value.detail["offset"] == 8
+    asyncio.run(append_upload_chunk(data_dir, upload["upload_id"], 8, _body(b"3,4\n")))
+
+    asyncio.run(complete_upload(data_dir, upload["upload_id"]))
+    assert (tmp_path / "resumed.csv").read_bytes() == b"a,b\n1,2\n3,4\n"
+
+
+def test_dedupe_index_stays_out_of_the_dataset_listing(tmp_path):
+    data_dir = str(tmp_path)
+    chunk = b"a,b\n1,2\n"
+    stored = []
+    for name in ("first.csv", "copy.csv"):
+        upload = start_resumable_upload(data_dir, name, total_size=len(chunk))
+        asyncio.run(append_upload_chunk(data_dir, upload["upload_id"], 0, _body(chunk)))
+        stored.append(asyncio.run(complete_upload(data_dir, upload["upload_id"])))
+
+    assert [s["deduplicated"] for s in stored] == [False, True]
+    assert (tmp_path / ".partial" / "upload_index.json").exists()
+    datasets = [f for f in os.listdir(data_dir) if f.endswith((".csv", ".json")) and not f.startswith(".")]
+    assert sorted(datasets) == ["copy.csv", "first.csv"]
+    assert not [f for f in os.listdir(data_dir) if f.endswith(".json")]
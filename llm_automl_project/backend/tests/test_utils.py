@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from utils import detect_task_type, optimize_dtypes
+
+
+def test_floats_are_only_downcast_when_they_round_trip_exactly():
+    df = pd.DataFrame({
+        "halves": [0.5, 1.25, np.nan, -3.75],  # exactly representable in float32
+        "prices": [19.99, 0.1, np.nan, 1234.5678],  # not: np.allclose(rtol=1e-6) used to accept these
+        "tiny_step": [1.0000001, 1.0000002, 1.0, np.nan],
+    })
+
+    optimized, _ = optimize_dtypes(df)
+
+    assert optimized["halves"].dtype == np.float32
+    assert optimized["prices"].dtype == np.float64
+    assert optimized["tiny_step"].dtype == np.float64
+    for col in df.columns:
+        pd.testing.assert_series_equal(optimized[col].astype("float64"), df[col])
+
+
+def test_lossy_float32_is_opt_in():
+    df = pd.DataFrame({"prices": [19.99, 0.1, np.nan], "huge": [1e39, 2.5, 3.5]})
+
+    optimized, _ = optimize_dtypes(df, lossy_floats=True)
+
+    assert optimized["prices"].dtype == np.float32
+    assert optimized["huge"].dtype == np.float64  # would overflow to inf
+
+
+def test_integral_floats_become_integers():
+    optimized, _ = optimize_dtypes(pd.DataFrame({"counts": [1.0, 2.0, 300.0]}))
+    assert optimized["counts"].dtype == np.uint16
+
+
+def test_small_integer_labelled_multiclass_target_is_classification():
+    # 3 classes on 30 rows used to need at least 60 rows to count as classification
+    assert detect_task_type(pd.Series([0, 1, 2] * 10)) == "classification"
+    assert detect_task_type(pd.Series([0, 1, 1, 0])) == "classification"
+    assert detect_task_type(pd.Series(np.arange(30))) == "regression"  # IDs: every value distinct
+    assert detect_task_type(pd.Series(np.arange(200) % 80)) == "regression"  # more values than max_classes
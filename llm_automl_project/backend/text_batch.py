@@ -0,0 +1,169 @@
+import os
+import re
+import sys
+import queue
+import asyncio
+import threading
+from dotenv import load_dotenv
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+if CURRENT_DIR not in sys.path:
+    sys.path.insert(0, CURRENT_DIR)
+
+try:
+    from llm_client import LLM_CLIENT, LLMError
+except ModuleNotFoundError as e:
+    print("❌ Import failed:", e)
+    raise
+
+load_dotenv()
+
+LLM_TEXT_BATCH_SIZE = int(os.getenv("LLM_TEXT_BATCH_SIZE", 20))  # texts packed into one prompt
+LLM_TEXT_BATCH_CHARS = int(os.getenv("LLM_TEXT_BATCH_CHARS", 6000))  # ...unless they'd exceed this many characters
+LLM_TEXT_CONCURRENCY = int(os.getenv("LLM_TEXT_CONCURRENCY", 4))  # prompts in flight at once
+LLM_TEXT_RATE = float(os.getenv("LLM_TEXT_RATE", 2))  # prompts started per second (0 = unlimited)
+
+GRAMMAR_INSTRUCTION = "Fix grammar and fluency"
+
+_ITEM = re.compile(r"<t id=(\d+)>(.*?)</t>", re.S)
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+class AsyncRateLimiter:
+    """Spaces out call starts to at most `rate` per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _batches(texts: list, batch_size: int, max_chars: int) -> list:
+    batches, current, size = [], [], 0
+    for text in texts:
+        if current and (len(current) >= batch_size or size + len(text) > max_chars):
+            batches.append(current)
+            current, size = [], 0
+        current.append(text)
+        size += len(text)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _batch_prompt(instruction: str, texts: list) -> str:
+    items = "\n".join(f"<t id={n}>{text}</t>" for n, text in enumerate(texts))
+    return (f"{instruction} for each text below. Every text is wrapped in <t id=N>...</t> tags. "
+            f"Reply with each corrected text wrapped in the same tags with the same id, and nothing else.\n\n{items}")
+
+
+async def _run_batch(instruction: str, texts: list, limiter: AsyncRateLimiter, semaphore: asyncio.Semaphore,
+                     stats: dict) -> dict:
+    """Corrected text per input text; texts the model dropped from a packed reply are sent on their own."""
+    async with semaphore:
+        await limiter.wait()
+        stats["requests"] += 1
+        if len(texts) == 1:
+            return {texts[0]: (await LLM_CLIENT.achat(f"{instruction}:\n{texts[0]}")).strip()}
+        reply = await LLM_CLIENT.achat(_batch_prompt(instruction, texts))
+    results = {}
+    for n, corrected in _ITEM.findall(reply):
+        if int(n) < len(texts):
+            results[texts[int(n)]] = corrected.strip()
+    for text in [t for t in texts if t not in results]:
+        try:
+            results.update(await _run_batch(instruction, [text], limiter, semaphore, stats))
+        except LLMError:
+            stats["failed"] += 1
+    return results
+
+
+async def process_texts_async(texts: list, instruction: str = GRAMMAR_INSTRUCTION, batch_size: int = LLM_TEXT_BATCH_SIZE,
+                              concurrency: int = LLM_TEXT_CONCURRENCY, rate: float = LLM_TEXT_RATE,
+                              max_chars: int = LLM_TEXT_BATCH_CHARS, on_progress=None) -> dict:
+    """
+    Apply an LLM `instruction` to every text and return {"texts": [...], "unique", "requests", "failed"}.
+
+    Identical texts are sent once; unique ones are packed `batch_size` to a prompt and the
+    prompts run with at most `concurrency` in flight and `rate` started per second. A batch
+    that fails keeps its original texts. `on_progress(done, total, results)` is called as
+    each batch lands, with `results` mapping every finished input text to its output.
+    """
+    unique = list(dict.fromkeys(t for t in texts if t and t.strip()))
+    if not LLM_CLIENT.configured:
+        print("⚠️ No LLM API key configured; texts are returned unchanged.")
+        unique = []
+    limiter = AsyncRateLimiter(rate)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    stats = {"requests": 0, "failed": 0}
+    results = {}
+
+    async def run(batch):
+        try:
+            return batch, await _run_batch(instruction, batch, limiter, semaphore, stats)
+        except LLMError as e:
+            print(f"⚠️ LLM batch of {len(batch)} texts failed, keeping originals: {e}")
+            stats["failed"] += len(batch)
+            return batch, {}
+
+    tasks = [asyncio.ensure_future(run(batch)) for batch in _batches(unique, batch_size, max_chars)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            batch, corrected = await finished
+            for text in batch:
+                results[text] = corrected.get(text, text)
+            if on_progress is not None:
+                on_progress(len(results), len(unique), results)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return {"texts": [results.get(t, t) for t in texts], "unique": len(unique), **stats}
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """The event loop blocking callers share, on a daemon thread, so the async client's pool outlives each call."""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="text-batch-loop", daemon=True).start()
+        return _loop
+
+
+def process_texts(texts: list, instruction: str = GRAMMAR_INSTRUCTION, on_progress=None, **kwargs) -> dict:
+    """
+    Blocking wrapper around process_texts_async for scripts and Streamlit callbacks.
+
+    Runs on a long-lived background event loop, so LLM_CLIENT keeps its pooled connections
+    from one call to the next. `on_progress` is still called on the calling thread, since
+    Streamlit elements can only be updated from the script's own thread.
+    """
+    updates = queue.Queue()
+    report = None if on_progress is None else lambda done, total, results: updates.put((done, total, dict(results)))
+    future = asyncio.run_coroutine_threadsafe(
+        process_texts_async(texts, instruction, on_progress=report, **kwargs), _background_loop())
+    future.add_done_callback(lambda _: updates.put(None))
+    try:
+        while (update := updates.get()) is not None:
+            on_progress(*update)
+    except BaseException:
+        future.cancel()
+        raise
+    return future.result()
+
+
+def correct_grammar_batch(texts: list, **kwargs) -> dict:
+    return process_texts(texts, GRAMMAR_INSTRUCTION, **kwargs)
@@ -0,0 +1,101 @@
+import os
+import re
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TEXT_CLEAN_WORKERS = int(os.getenv("TEXT_CLEAN_WORKERS", os.cpu_count() or 1))
+TEXT_CLEAN_CHUNK_ROWS = int(os.getenv("TEXT_CLEAN_CHUNK_ROWS", 1000000))  # longer columns are split across processes
+PROFANITY_WORDLIST = os.getenv("PROFANITY_WORDLIST")  # one word per line; defaults to better_profanity's list
+
+ENTITY_PATTERN = r"\b(?:Mr\.|Mrs\.|Dr\.|Prof\.|Sir)\s\w+"
+ENTITY_TAG = "<NAME>"
+
+# Same character substitutions better_profanity matches ("sh1t", "@ss")
+LEET_VARIANTS = {
+    "a": "a@*4", "i": "i*l1", "o": "o*0@", "u": "u*v", "v": "v*u", "l": "l1", "e": "e*3", "s": "s$5", "t": "t7",
+}
+
+
+def _default_wordlist() -> str:
+    spec = importlib.util.find_spec("better_profanity")
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    path = os.path.join(list(spec.submodule_search_locations)[0], "profanity_wordlist.txt")
+    return path if os.path.exists(path) else None
+
+
+def load_profanity_words(path: str = None) -> list:
+    path = path or PROFANITY_WORDLIST or _default_wordlist()
+    if not path:
+        print("⚠️ No profanity word list found; set PROFANITY_WORDLIST or install better_profanity.")
+        return []
+    with open(path, encoding="utf-8") as f:
+        return sorted({line.strip().lower() for line in f if line.strip()})
+
+
+def _char_class(char: str) -> str:
+    variants = LEET_VARIANTS.get(char)
+    return "[" + "".join(re.escape(c) for c in variants) + "]" if variants else re.escape(char)
+
+
+def _trie_regex(words: list) -> str:
+    """One alternation shaped like a trie of `words`, so shared prefixes are matched once."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        ends = "" in node
+        branches = [_char_class(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 and not ends else "(?:" + "|".join(branches) + ")"
+        return body + "?" if ends else body
+
+    return build(trie)
+
+
+@lru_cache(maxsize=4)
+def profanity_pattern(path: str = None) -> str:
+    """Case-insensitive regex matching any listed word (or leetspeak variant) as a whole word, or None."""
+    words = load_profanity_words(path)
+    if not words:
+        return None
+    # Explicit boundaries rather than lookarounds, so pandas can hand the pattern to pyarrow's RE2
+    return r"(?i)(?:^|[^a-z0-9])" + _trie_regex(words) + r"(?:$|[^a-z0-9])"
+
+
+def _clean_chunk(texts: pd.Series, pattern: str) -> pd.DataFrame:
+    offensive = texts.str.contains(pattern, regex=True) if pattern else pd.Series(False, index=texts.index)
+    return pd.DataFrame({
+        "offensive": offensive.fillna(False).astype(bool),
+        "cleaned": texts.str.replace(ENTITY_PATTERN, ENTITY_TAG, regex=True),
+    }, index=texts.index)
+
+
+def clean_text_column(series: pd.Series, workers: int = TEXT_CLEAN_WORKERS,
+                      chunk_rows: int = TEXT_CLEAN_CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Flag profanity and mask titled names ("Dr. Smith" -> "<NAME>") across a whole text column.
+
+    Both run as vectorized `Series.str` regex operations over the column. Columns longer
+    than `chunk_rows` are split into chunks processed in parallel worker processes.
+    Returns a frame aligned to `series` with `offensive` (bool) and `cleaned` (str) columns.
+    """
+    texts = series.fillna("").astype(str)
+    pattern = profanity_pattern()
+    if workers > 1 and len(texts) > chunk_rows:
+        chunks = [texts.iloc[start:start + chunk_rows] for start in range(0, len(texts), chunk_rows)]
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            return pd.concat(pool.map(_clean_chunk, chunks, [pattern] * len(chunks)))
+    return _clean_chunk(texts, pattern)
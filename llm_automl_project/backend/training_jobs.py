@@ -0,0 +1,206 @@
+import os
+import sys
+import json
+import uuid
+import threading
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from fastapi.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+if CURRENT_DIR not in sys.path:
+    sys.path.insert(0, CURRENT_DIR)
+
+try:
+    from database import TrainingJob, session_scope, async_session_scope, get_async_engine
+except ModuleNotFoundError as e:
+    print("❌ Import failed:", e)
+    raise
+
+load_dotenv()
+
+TRAINING_MAX_WORKERS = int(os.getenv("TRAINING_MAX_WORKERS", 2))
+
+ACTIVE_STATUSES = ("queued", "running", "cancelling")
+
+_executor = None
+_executor_lock = threading.Lock()
+_futures = {}
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when the job was cancelled between stages or before its model was registered."""
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Spawned workers don't inherit the server's threads, locks or open DB connections
+            _executor = ProcessPoolExecutor(
+                max_workers=TRAINING_MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _update_job(job_id: str, **fields) -> str:
+    """Apply `fields` to a job row and return its current status."""
+    with session_scope() as session:
+        job = session.get(TrainingJob, job_id)
+        if job is None:
+            raise KeyError(job_id)
+        for key, value in fields.items():
+            setattr(job, key, value)
+        return job.status
+
+
+def _advance(job_id: str, stage: str, progress: float):
+    # Cancellation is cooperative: the worker checks for it whenever it reports progress
+    status = _update_job(job_id, stage=stage, progress=progress)
+    if status == "cancelling":
+        raise JobCancelled(f"Job {job_id} cancelled during '{stage}'")
+
+
+def _finish(job_id: str, result: dict):
+    # A cancel that arrived after registration still wins over "completed"; the result records the version it left
+    with session_scope() as session:
+        job = session.get(TrainingJob, job_id)
+        if job.status == "cancelling":
+            job.status, job.error = "cancelled", "Cancelled after the model version was registered"
+            print(f"🛑 Job {job_id} cancelled after registering {result['model_path']}")
+        else:
+            job.status, job.stage, job.progress = "completed", "done", 1.0
+        job.result = json.dumps(result)
+        job.finished_at = datetime.utcnow()
+
+
+def run_training_job(job_id: str, dataset_path: str, search: bool = None, time_budget: float = None,
+                     target: str = None) -> dict:
+    """Worker entry point: cached EDA report (charts + PDF) and model training for one dataset."""
+    from utils import load_dataset_sample
+    from eda_generator import generate_cached_eda_report
+    from model_pipeline import train_and_save_model
+
+    try:
+        if _update_job(job_id) == "cancelling":
+            raise JobCancelled(f"Job {job_id} cancelled before start")
+        _update_job(job_id, status="running", started_at=datetime.utcnow())
+        _advance(job_id, "eda", 0.1)
+        eda = generate_cached_eda_report(dataset_path, load_dataset_sample)
+        _advance(job_id, "training", 0.5)
+        # Checked again once the model is saved, so a job cancelled mid-training registers no version
+        model_path = train_and_save_model(dataset_path, search=search, time_budget=time_budget, target=target,
+                                          before_register=lambda: _advance(job_id, "registering", 0.9))
+        result = {
+            "message": "Model trained and EDA generated successfully",
+            "model_path": model_path,
+            "eda_dir": eda["eda_dir"],
+            "eda_pdf": eda["eda_pdf"],
+            "eda_cached": eda["cached"],
+        }
+        _finish(job_id, result)
+        return result
+    except JobCancelled as e:
+        print(f"🛑 {e}")
+        _update_job(job_id, status="cancelled", finished_at=datetime.utcnow())
+        raise
+    except Exception as e:
+        print(f"❌ Training job {job_id} failed: {e}")
+        _update_job(job_id, status="failed", error=str(e), finished_at=datetime.utcnow())
+        raise
+
+
+def _on_done(job_id: str, future):
+    _futures.pop(job_id, None)
+    if future.cancelled():
+        _update_job(job_id, status="cancelled", finished_at=datetime.utcnow())
+        return
+    error = future.exception()
+    if error is None or isinstance(error, JobCancelled):
+        return
+    # The worker records its own failures; this catches crashes that killed the process
+    with session_scope() as session:
+        job = session.get(TrainingJob, job_id)
+        if job and job.status in ACTIVE_STATUSES:
+            job.status = "failed"
+            job.error = str(error) or type(error).__name__
+            job.finished_at = datetime.utcnow()
+
+
+def submit_training_job(dataset_path: str, search: bool = None, time_budget: float = None, target: str = None) -> str:
+    job_id = uuid.uuid4().hex
+    with session_scope() as session:
+        session.add(TrainingJob(id=job_id, dataset=os.path.basename(dataset_path), status="queued", progress=0.0))
+
+    future = _get_executor().submit(run_training_job, job_id, dataset_path, search, time_budget, target)
+    _futures[job_id] = future
+    future.add_done_callback(lambda f: _on_done(job_id, f))
+    print(f"📥 Queued training job {job_id} for {dataset_path}")
+    return job_id
+
+
+def _job_dict(job: TrainingJob) -> dict:
+    if job is None:
+        return None
+    return {
+        "id": job.id,
+        "dataset": job.dataset,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "error": job.error,
+        "result": json.loads(job.result) if job.result else None,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def get_job(job_id: str) -> dict:
+    with session_scope() as session:
+        return _job_dict(session.get(TrainingJob, job_id))
+
+
+async def get_job_async(job_id: str) -> dict:
+    """get_job for async endpoints (frequent status polling) without blocking the event loop."""
+    if get_async_engine() is None:
+        return await run_in_threadpool(get_job, job_id)
+    async with async_session_scope() as session:
+        return _job_dict(await session.get(TrainingJob, job_id))
+
+
+def cancel_job(job_id: str) -> str:
+    """Cancel a queued job immediately, or ask a running one to stop at its next stage."""
+    future = _futures.get(job_id)
+    if future is not None and future.cancel():
+        return "cancelled"
+    with session_scope() as session:
+        job = session.get(TrainingJob, job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job.status in ("queued", "running"):
+            job.status = "cancelling"
+        return job.status
+
+
+def recover_interrupted_jobs():
+    """Mark jobs left active by a previous server process as failed."""
+    with session_scope() as session:
+        stale = session.query(TrainingJob).filter(TrainingJob.status.in_(ACTIVE_STATUSES)).all()
+        for job in stale:
+            job.status = "failed"
+            job.error = "Interrupted by server restart"
+            job.finished_at = datetime.utcnow()
+    if stale:
+        print(f"⚠️ Marked {len(stale)} interrupted training jobs as failed.")
+
+
+def shutdown_training_jobs():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,344 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor, ExtraTreesClassifier, ExtraTreesRegressor
+from sklearn.base import BaseEstimator, ClassifierMixin, RegressorMixin, TransformerMixin
+from sklearn.pipeline import Pipeline
+from sklearn.utils.metaestimators import available_if
+from dotenv import load_dotenv
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+if CURRENT_DIR not in sys.path:
+    sys.path.insert(0, CURRENT_DIR)
+
+from model_store import save_model_artifact
+
+try:
+    from numba import njit
+except ModuleNotFoundError:
+    njit = None  # optional: without numba the engine traverses with vectorized NumPy instead
+
+load_dotenv()
+
+TREE_ENGINE_ENABLED = os.getenv("TREE_ENGINE_ENABLED", "1") == "1"
+ENGINE_SUFFIX = ".engine"
+_BLOCK_ROWS = 256
+
+COMPILABLE_FORESTS = (RandomForestClassifier, RandomForestRegressor, ExtraTreesClassifier, ExtraTreesRegressor)
+
+
+def _forest_sum(X, roots, feature, threshold, left, right, missing_go_to_left, value, out):
+    # Leaf values summed into `out`; within a block of samples each tree walks every
+    # sample before the next tree, so its nodes stay in cache
+    n_samples = X.shape[0]
+    n_blocks = (n_samples + _BLOCK_ROWS - 1) // _BLOCK_ROWS
+    for b in range(n_blocks):
+        stop = min(n_samples, (b + 1) * _BLOCK_ROWS)
+        for t in range(roots.shape[0]):
+            for i in range(b * _BLOCK_ROWS, stop):
+                node = roots[t]
+                while left[node] != node:
+                    x = X[i, feature[node]]
+                    if x <= threshold[node] or (np.isnan(x) and missing_go_to_left[node]):
+                        node = left[node]
+                    else:
+                        node = right[node]
+                for k in range(value.shape[1]):
+                    out[i, k] += value[node, k]
+
+if njit is not None:
+    # Not parallel=True: numba's threading layer keeps a process that called it from a
+    # non-main thread (FastAPI's threadpool) from exiting
+    _forest_sum = njit(cache=True, nogil=True)(_forest_sum)
+
+
+def _float32_thresholds(threshold: np.ndarray) -> np.ndarray:
+    """
+    Round float64 split thresholds down to float32.
+
+    Features are float32, so `x <= t` holds exactly when `x` is at most the largest
+    float32 not above `t`; the halved arrays give identical decisions.
+    """
+    rounded = threshold.astype(np.float32)
+    above = rounded.astype(np.float64) > threshold
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+class CompiledForest(BaseEstimator):
+    """
+    A fitted forest flattened into NumPy node arrays and evaluated for all trees at once.
+
+    Every tree's nodes are stacked into global `feature`, `threshold`, `left`, `right`
+    and `value` arrays. Leaves point back to themselves, so traversal is a fixed number
+    of vectorized steps (the deepest tree's depth) over an (n_samples, n_trees) matrix
+    of node ids, with no per-tree Python dispatch or input validation. When numba is
+    installed, a compiled kernel walks the same arrays instead, tree by tree over
+    blocks of samples, without the intermediate node matrix. The arrays are plain
+    ndarrays, so a saved engine memory-maps with `mmap_mode='r'`.
+    """
+
+    @classmethod
+    def from_forest(cls, forest):
+        engine = cls()
+        engine._compile(forest)
+        return engine
+
+    def _compile(self, forest):
+        trees = [est.tree_ for est in forest.estimators_]
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError("Only single-output forests can be compiled.")
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        self.roots = offsets[:-1].astype(np.int32)
+        self.depth = max(tree.max_depth for tree in trees)
+        self.n_features_in_ = forest.n_features_in_
+
+        feature, threshold, left, right, missing_left, value = [], [], [], [], [], []
+        for tree, offset in zip(trees, self.roots):
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left == -1
+            feature.append(np.where(leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            left.append(np.where(leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(leaf, nodes, tree.children_right) + offset)
+            missing_left.append(tree.missing_go_to_left.astype(bool))
+            value.append(tree.value[:, 0, :])
+        self.feature = np.concatenate(feature).astype(np.int32)
+        self.threshold = _float32_thresholds(np.concatenate(threshold))
+        self.left = np.concatenate(left).astype(np.int32)
+        self.right = np.concatenate(right).astype(np.int32)
+        self.missing_go_to_left = np.concatenate(missing_left)
+        value = np.concatenate(value)
+        if hasattr(forest, "classes_"):
+            self.classes_ = forest.classes_
+            # Per-leaf class distribution, as each tree's predict_proba reports it
+            totals = value.sum(axis=1, keepdims=True)
+            self.value = np.divide(value, totals, out=np.zeros_like(value), where=totals > 0)
+        else:
+            self.value = value[:, :1].copy()
+
+    @staticmethod
+    def _as_features(X) -> np.ndarray:
+        X = X.toarray() if hasattr(X, "toarray") else X
+        # sklearn casts features to float32 before traversal; do the same
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def apply(self, X) -> np.ndarray:
+        """Leaf node id of every (sample, tree) pair."""
+        X = self._as_features(X)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        has_missing = bool(np.isnan(X).any())
+        for _ in range(self.depth):
+            x = X[rows, self.feature[nodes]]
+            go_left = x <= self.threshold[nodes]
+            if has_missing:
+                go_left |= np.isnan(x) & self.missing_go_to_left[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def _mean_value(self, X) -> np.ndarray:
+        if njit is None:
+            return self.value[self.apply(X)].mean(axis=1)
+        X = self._as_features(X)
+        out = np.zeros((X.shape[0], self.value.shape[1]))
+        _forest_sum(X, self.roots, self.feature, self.threshold, self.left, self.right,
+                    self.missing_go_to_left, self.value, out)
+        return out / len(self.roots)
+
+
+class CompiledForestClassifier(ClassifierMixin, CompiledForest):
+    def predict_proba(self, X) -> np.ndarray:
+        return self._mean_value(X)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+class CompiledForestRegressor(RegressorMixin, CompiledForest):
+    def predict(self, X) -> np.ndarray:
+        return self._mean_value(X)[:, 0]
+
+
+class CompiledPreprocessor(TransformerMixin, BaseEstimator):
+    """
+    The `utils.build_preprocessor` pipeline reduced to lookup arrays for low-latency rows.
+
+    Numeric columns keep their imputation fill, scaler mean and scale; categorical
+    columns keep their fill value and a category -> one-hot offset map (unknown values
+    go to the infrequent column, or nowhere, as `handle_unknown="infrequent_if_exist"`
+    does). The output is the same dense float32 matrix, without sklearn's per-step
+    validation.
+    """
+
+    @classmethod
+    def from_preprocessor(cls, preprocessor: Pipeline):
+        compiled = cls()
+        compiled._compile(preprocessor)
+        return compiled
+
+    def _compile(self, preprocessor: Pipeline):
+        steps = dict(preprocessor.steps)
+        if set(steps) - {"columns", "select"}:
+            raise ValueError("Unsupported preprocessing steps.")
+        columns = steps["columns"]
+        self.feature_names_in_ = columns.feature_names_in_
+        self.numeric_cols, self.categorical_cols, self.categorical_fill, self.categories = [], [], [], []
+        self.n_outputs = 0
+        for name, transformer, cols in columns.transformers_:
+            if name == "remainder":
+                continue
+            parts = dict(transformer.steps)
+            imputer = parts["impute"]
+            # SimpleImputer drops columns that were entirely missing during fit
+            kept = [col for col, keep in zip(cols, ~pd.isna(imputer.statistics_)) if keep]
+            if name == "numeric" and set(parts) == {"impute", "scale", "float32"}:
+                scaler = parts["scale"]
+                self.numeric_cols = kept
+                self.numeric_fill = imputer.statistics_[~pd.isna(imputer.statistics_)].astype(np.float64)
+                self.numeric_mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(len(kept))
+                self.numeric_scale = scaler.scale_ if scaler.scale_ is not None else np.ones(len(kept))
+                self.numeric_offset = self.n_outputs
+                self.n_outputs += len(kept)
+            elif name == "categorical" and set(parts) == {"impute", "one_hot"} and len(kept) == len(cols):
+                encoder = parts["one_hot"]
+                self.categorical_cols = kept
+                self.categorical_fill = list(imputer.statistics_)
+                infrequent = encoder.infrequent_categories_
+                for categories, rare in zip(encoder.categories_, infrequent):
+                    rare = set() if rare is None else set(rare)
+                    frequent = [c for c in categories if c not in rare]
+                    # sklearn puts the shared infrequent column last in each block
+                    mapping = {c: self.n_outputs + i for i, c in enumerate(frequent)}
+                    unknown = self.n_outputs + len(frequent) if rare else -1
+                    mapping.update({c: unknown for c in rare})
+                    self.categories.append((mapping, unknown))
+                    self.n_outputs += len(frequent) + (1 if rare else 0)
+            else:
+                raise ValueError(f"Unsupported '{name}' transformer.")
+        select = steps.get("select")
+        self.support = select.get_support() if select is not None else None
+
+    def transform(self, X) -> np.ndarray:
+        """Transform a DataFrame, or a list of row dicts (skipping DataFrame construction for single rows)."""
+        records = isinstance(X, list)
+        out = np.zeros((len(X), self.n_outputs), dtype=np.float32)
+        if self.numeric_cols:
+            if records:
+                values = np.array([[np.nan if r.get(c) is None else float(r[c]) for c in self.numeric_cols]
+                                   for r in X], dtype=np.float64).reshape(len(X), len(self.numeric_cols))
+            else:
+                values = X[self.numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+            values = np.where(np.isnan(values), self.numeric_fill, values)
+            end = self.numeric_offset + len(self.numeric_cols)
+            out[:, self.numeric_offset:end] = (values - self.numeric_mean) / self.numeric_scale
+        rows = np.arange(len(X))
+        for col, fill, (mapping, unknown) in zip(self.categorical_cols, self.categorical_fill, self.categories):
+            values = [r.get(col) for r in X] if records else X[col].to_numpy(dtype=object)
+            index = np.fromiter((mapping.get(fill if pd.isna(v) else v, unknown) for v in values),
+                                dtype=np.int64, count=len(values))
+            hot = index >= 0
+            out[rows[hot], index[hot]] = 1.0
+        return out[:, self.support] if self.support is not None else out
+
+
+def _final_step_has(attr: str):
+    return lambda self: hasattr(self.steps[-1][1], attr)
+
+
+class CompiledPipeline:
+    """
+    Preprocessing steps chained to a compiled forest, for inference only.
+
+    A plain container rather than an sklearn Pipeline: sklearn's fitted-state checks only
+    accept estimators that can be trained, and the compiled steps can't. Like a Pipeline,
+    it only has `predict_proba` when its forest does (classifiers, not regressors).
+    """
+
+    def __init__(self, steps: list):
+        self.steps = steps
+
+    @property
+    def feature_names_in_(self):
+        return self.steps[0][1].feature_names_in_
+
+    @property
+    def classes_(self):
+        return self.steps[-1][1].classes_
+
+    def _transform(self, X):
+        for _, step in self.steps[:-1]:
+            X = step.transform(X)
+        return X
+
+    def predict(self, X) -> np.ndarray:
+        return self.steps[-1][1].predict(self._transform(X))
+
+    @available_if(_final_step_has("predict_proba"))
+    def predict_proba(self, X) -> np.ndarray:
+        return self.steps[-1][1].predict_proba(self._transform(X))
+
+
+def compile_model(model, X_check=None):
+    """
+    Return `model` with its final forest replaced by a compiled one, or None if it has no compilable forest.
+
+    Pipelines keep their preprocessing step, which is also compiled when it has the
+    `build_preprocessor` layout and reproduces the sklearn transform on `X_check`.
+    """
+    estimator = model.steps[-1][1] if isinstance(model, Pipeline) else model
+    if not isinstance(estimator, COMPILABLE_FORESTS) or estimator.n_outputs_ != 1:
+        return None
+    engine_cls = CompiledForestClassifier if hasattr(estimator, "classes_") else CompiledForestRegressor
+    compiled = engine_cls.from_forest(estimator)
+    if not isinstance(model, Pipeline):
+        return compiled
+    steps = model.steps[:-1]
+    if len(steps) == 1 and X_check is not None:
+        name, preprocessor = steps[0]
+        try:
+            fast = CompiledPreprocessor.from_preprocessor(preprocessor)
+            expected = preprocessor.transform(X_check)
+            expected = expected.toarray() if hasattr(expected, "toarray") else expected
+            if np.allclose(fast.transform(X_check), expected):
+                steps = [(name, fast)]
+        except (ValueError, KeyError, AttributeError, TypeError) as e:
+            print(f"ℹ️ Keeping sklearn preprocessing in the tree engine: {e}")
+    return CompiledPipeline(steps + [(model.steps[-1][0], compiled)])
+
+
+def validate_engine(model, engine, X) -> bool:
+    """Check that the compiled engine reproduces the model's predictions (and probabilities) on `X`."""
+    expected, actual = model.predict(X), engine.predict(X)
+    if hasattr(model, "predict_proba"):
+        return np.array_equal(expected, actual) and np.allclose(model.predict_proba(X), engine.predict_proba(X))
+    return np.allclose(expected, actual)
+
+
+def engine_path(model_path: str) -> str:
+    return model_path + ENGINE_SUFFIX
+
+
+def export_engine(model, model_path: str, X_check) -> dict:
+    """
+    Compile `model`, validate it on `X_check` and save it next to the model artifact.
+
+    A stale engine from an earlier model at the same path is removed when the new model
+    can't be compiled or fails validation, so predictions never come from the wrong model.
+
+    Returns:
+        dict: engine artifact info, or None when no engine was written.
+    """
+    path = engine_path(model_path)
+    engine = compile_model(model, X_check) if TREE_ENGINE_ENABLED and X_check is not None else None
+    if engine is not None and not validate_engine(model, engine, X_check):
+        print("⚠️ Compiled tree engine disagrees with the model; not exporting it.")
+        engine = None
+    if engine is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+    info = save_model_artifact(engine, path)
+    print(f"⚡ Exported compiled tree engine: {path}")
+    return info
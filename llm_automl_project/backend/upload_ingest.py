@@ -0,0 +1,206 @@
+import os
+import sys
+import json
+import uuid
+import asyncio
+import hashlib
+import threading
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+if CURRENT_DIR not in sys.path:
+    sys.path.insert(0, CURRENT_DIR)
+
+from utils import file_sha256
+from dataset_cache import dataset_sha256, link_cached_dataset
+
+load_dotenv()
+
+UPLOAD_MAX_MB = float(os.getenv("UPLOAD_MAX_MB", 4096))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", 1024 * 1024))
+
+_index_lock = threading.Lock()
+# Running hashes of resumable uploads: upload_id -> (bytes hashed, sha256 object)
+_hashers = {}
+# One lock per resumable upload, so concurrent requests for it check the offset and write one at a time
+_upload_locks = {}
+
+
+def _max_bytes() -> int:
+    return int(UPLOAD_MAX_MB * 1024 * 1024)
+
+
+def _safe_filename(filename: str) -> str:
+    name = os.path.basename(filename or "")
+    if not name or name.startswith("."):
+        raise HTTPException(status_code=400, detail=f"Invalid file name: {filename!r}")
+    return name
+
+
+def _partial_dir(data_dir: str) -> str:
+    path = os.path.join(data_dir, ".partial")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _upload_lock(upload_id: str) -> asyncio.Lock:
+    return _upload_locks.setdefault(upload_id, asyncio.Lock())
+
+
+def _finalize(tmp_path: str, data_dir: str, filename: str, sha256: str, size: int) -> dict:
+    """
+    Move a fully written upload into place, deduplicating identical content.
+
+    Content already stored under the same name is kept as-is; content stored under a
+    different name is hard-linked (with its columnar cache) instead of written twice. The
+    sha256 -> filename index lives under .partial/, out of sight of the dataset listings.
+    """
+    target = os.path.join(data_dir, filename)
+    index_path = os.path.join(_partial_dir(data_dir), "upload_index.json")
+    legacy_path = os.path.join(data_dir, ".upload_index.json")
+    with _index_lock:
+        index = {}
+        for path in (index_path, legacy_path):
+            try:
+                with open(path) as f:
+                    index = json.load(f)
+                break
+            except (OSError, ValueError):
+                continue
+
+        deduplicated = False
+        existing = index.get(sha256)
+        existing_path = os.path.join(data_dir, existing) if existing else None
+        if existing_path and os.path.exists(existing_path) and os.path.getsize(existing_path) == size \
+                and dataset_sha256(existing_path) == sha256:
+            deduplicated = True
+            if existing != filename:
+                link_tmp = f"{target}.{uuid.uuid4().hex}.tmp"
+                try:
+                    os.link(existing_path, link_tmp)
+                    os.replace(link_tmp, target)
+                    link_cached_dataset(existing_path, target)
+                except OSError:
+                    # No hard links on this filesystem: keep the freshly written copy
+                    os.replace(tmp_path, target)
+                    deduplicated = False
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, target)
+
+        if not deduplicated:
+            index[sha256] = filename
+            index_tmp = f"{index_path}.{uuid.uuid4().hex}.tmp"
+            with open(index_tmp, "w") as f:
+                json.dump(index, f)
+            os.replace(index_tmp, index_path)
+        if os.path.exists(legacy_path):
+            os.remove(legacy_path)
+
+    return {"filename": filename, "path": target, "sha256": sha256, "size": size, "deduplicated": deduplicated}
+
+
+async def ingest_upload(file, data_dir: str) -> dict:
+    """Stream a multipart upload to disk in chunks, hashing as it goes, then move it into place atomically."""
+    filename = _safe_filename(file.filename)
+    tmp_path = os.path.join(await run_in_threadpool(_partial_dir, data_dir), f"{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(tmp_path, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > _max_bytes():
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds {UPLOAD_MAX_MB:g} MB limit")
+                digest.update(chunk)
+                await out.write(chunk)
+        return await run_in_threadpool(_finalize, tmp_path, data_dir, filename, digest.hexdigest(), size)
+    finally:
+        if await aiofiles.os.path.exists(tmp_path):
+            await aiofiles.os.remove(tmp_path)
+
+
+# ------------------------------------------
+# ⏯️ Resumable chunked uploads
+# ------------------------------------------
+def _session_paths(data_dir: str, upload_id: str) -> tuple:
+    if not upload_id.isalnum():
+        raise HTTPException(status_code=400, detail="Invalid upload id")
+    base = os.path.join(_partial_dir(data_dir), upload_id)
+    return base + ".part", base + ".json"
+
+
+def _read_session(data_dir: str, upload_id: str) -> dict:
+    part_path, meta_path = _session_paths(data_dir, upload_id)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except OSError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    meta["offset"] = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    return meta
+
+
+def start_resumable_upload(data_dir: str, filename: str, total_size: int = None) -> dict:
+    filename = _safe_filename(filename)
+    if total_size is not None and total_size > _max_bytes():
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {UPLOAD_MAX_MB:g} MB limit")
+    upload_id = uuid.uuid4().hex
+    part_path, meta_path = _session_paths(data_dir, upload_id)
+    open(part_path, "wb").close()
+    with open(meta_path, "w") as f:
+        json.dump({"upload_id": upload_id, "filename": filename, "total_size": total_size}, f)
+    _hashers[upload_id] = (0, hashlib.sha256())
+    return {"upload_id": upload_id, "filename": filename, "offset": 0}
+
+
+def upload_status(data_dir: str, upload_id: str) -> dict:
+    return _read_session(data_dir, upload_id)
+
+
+async def append_upload_chunk(data_dir: str, upload_id: str, offset: int, stream) -> dict:
+    """Write a request body at `offset`; a mismatched offset returns 409 with the offset to resume from."""
+    part_path, _ = await run_in_threadpool(_session_paths, data_dir, upload_id)
+    async with _upload_lock(upload_id):
+        # Checked under the lock, so a retried PUT at the same offset sees the first one's bytes and gets a 409
+        meta = await run_in_threadpool(_read_session, data_dir, upload_id)
+        if offset != meta["offset"]:
+            raise HTTPException(status_code=409, detail={"message": "Offset mismatch", "offset": meta["offset"]})
+        hashed, digest = _hashers.get(upload_id, (None, None))
+        if hashed != offset:
+            digest = None  # hash state lost (e.g. restart); rebuilt from disk on completion
+        size = offset
+        async with aiofiles.open(part_path, "r+b") as out:
+            await out.seek(offset)
+            async for chunk in stream:
+                size += len(chunk)
+                if size > _max_bytes():
+                    await out.truncate(offset)
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds {UPLOAD_MAX_MB:g} MB limit")
+                if digest is not None:
+                    digest.update(chunk)
+                await out.write(chunk)
+        if digest is not None:
+            _hashers[upload_id] = (size, digest)
+        else:
+            _hashers.pop(upload_id, None)
+    return {"upload_id": upload_id, "offset": size}
+
+
+async def complete_upload(data_dir: str, upload_id: str) -> dict:
+    part_path, meta_path = await run_in_threadpool(_session_paths, data_dir, upload_id)
+    async with _upload_lock(upload_id):
+        meta = await run_in_threadpool(_read_session, data_dir, upload_id)
+        if meta["total_size"] is not None and meta["offset"] != meta["total_size"]:
+            raise HTTPException(status_code=409, detail={"message": "Upload incomplete", "offset": meta["offset"]})
+        hashed, digest = _hashers.pop(upload_id, (None, None))
+        sha256 = digest.hexdigest() if hashed == meta["offset"] else await run_in_threadpool(file_sha256, part_path)
+        result = await run_in_threadpool(_finalize, part_path, data_dir, meta["filename"], sha256, meta["offset"])
+        await aiofiles.os.remove(meta_path)
+    _upload_locks.pop(upload_id, None)
+    return result
@@ -1,17 +1,44 @@
 import os
+import hashlib
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.feature_selection import SelectKBest, f_classif
+from sklearn.preprocessing import StandardScaler, OneHotEncoder, FunctionTransformer
+from sklearn.feature_selection import SelectKBest, f_classif, f_regression
 from sklearn.impute import SimpleImputer
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
 import smtplib
 from email.message import EmailMessage
 from dotenv import load_dotenv
 
 load_dotenv()  # Ensure environment variables are loaded
 
-# ✅ Flexible Loader for 10+ formats
-def load_dataset(file_path: str) -> pd.DataFrame:
+DATASET_MEMORY_BUDGET_MB = float(os.getenv("DATASET_MEMORY_BUDGET_MB", 256))
+DATASET_OPTIMIZE_DTYPES = os.getenv("DATASET_OPTIMIZE_DTYPES", "0") == "1"
+DATASET_LOSSY_FLOAT32 = os.getenv("DATASET_LOSSY_FLOAT32", "0") == "1"  # also downcast floats float32 can't hold exactly
+STREAMABLE_FORMATS = (".csv", ".tsv", ".txt", ".jsonl", ".ndjson", ".parquet")
+TRAIN_MAX_CATEGORIES = int(os.getenv("TRAIN_MAX_CATEGORIES", 100))
+TRAIN_SELECT_K = int(os.getenv("TRAIN_SELECT_K", 0))  # 0 keeps every feature
+TRAIN_MAX_CLASSES = int(os.getenv("TRAIN_MAX_CLASSES", 50))
+
+# ✅ Flexible Loader for 10+ formats (reads a typed Parquet cache when one is available)
+def load_dataset(file_path: str, columns: list = None, optimize: bool = None) -> pd.DataFrame:
+    from dataset_cache import load_cached_dataset, DATASET_CACHE_ENABLED
+    df = None
+    if DATASET_CACHE_ENABLED:
+        try:
+            df = load_cached_dataset(file_path, columns=columns)
+        except Exception as e:
+            print(f"⚠️ Columnar cache unavailable for {os.path.basename(file_path)}: {e}")
+    if df is None:
+        df = read_dataset_file(file_path)
+        df = df[columns] if columns else df
+    if DATASET_OPTIMIZE_DTYPES if optimize is None else optimize:
+        df, _ = optimize_dtypes(df)
+    return df
+
+# ✅ Raw parse of the original file, bypassing the cache
+def read_dataset_file(file_path: str) -> pd.DataFrame:
     ext = os.path.splitext(file_path)[1].lower()
     try:
         if ext == ".csv":
@@ -21,7 +48,13 @@ def load_dataset(file_path: str) -> pd.DataFrame:
         elif ext in [".xlsx", ".xls"]:
             return pd.read_excel(file_path)
         elif ext == ".json":
-            return pd.read_json(file_path)
+            try:
+                return pd.read_json(file_path)
+            except ValueError:
+                # Many ".json" exports are really JSON lines
+                return pd.read_json(file_path, lines=True)
+        elif ext in [".jsonl", ".ndjson"]:
+            return pd.read_json(file_path, lines=True)
         elif ext == ".xml":
             return pd.read_xml(file_path)
         elif ext == ".parquet":
@@ -44,12 +77,176 @@ def load_dataset(file_path: str) -> pd.DataFrame:
     except Exception as e:
         raise ValueError(f"❌ Error loading dataset: {e}")
 
+# ✅ Memory-optimized dtypes
+_DATE_PATTERN = r"^\s*\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}"
+
+def _looks_like_dates(values: pd.Series) -> bool:
+    sample = values.dropna().astype(str).head(200)
+    if sample.empty or not sample.str.match(_DATE_PATTERN).mean() >= 0.95:
+        return False
+    return pd.to_datetime(sample, errors="coerce", format="mixed").notna().mean() >= 0.95
+
+def _round_trips(series: pd.Series, candidate: pd.Series) -> bool:
+    # Exact: every value (and every NaN) comes back unchanged after converting back to float64
+    original = series.to_numpy(dtype="float64", na_value=np.nan)
+    restored = candidate.to_numpy(dtype="float64", na_value=np.nan)
+    return bool(((original == restored) | (np.isnan(original) & np.isnan(restored))).all())
+
+def optimize_dtypes(df: pd.DataFrame, category_ratio: float = 0.5, max_categories: int = 10000,
+                    lossy_floats: bool = DATASET_LOSSY_FLOAT32) -> tuple:
+    """
+    Shrink a DataFrame's memory footprint.
+
+    Integers are downcast to the smallest (unsigned) type, floats to float32 only when
+    every value converts back to the same float64, date-like strings are parsed to
+    datetime64 and low-cardinality strings become `category`. With `lossy_floats`, floats
+    are downcast to float32 regardless, rounding them to about 7 significant digits.
+
+    Returns:
+        tuple: (optimized DataFrame, per-column report with dtypes and bytes before/after).
+    """
+    optimized = {}
+    report = []
+    for col in df.columns:
+        series = df[col]
+        before = int(series.memory_usage(deep=True, index=False))
+        new = series
+        if pd.api.types.is_bool_dtype(series):
+            pass
+        elif pd.api.types.is_integer_dtype(series):
+            new = pd.to_numeric(series, downcast="unsigned" if series.min() >= 0 else "integer")
+        elif pd.api.types.is_float_dtype(series):
+            values = series.dropna()
+            if len(values) and (values % 1 == 0).all() and series.notna().all() and values.abs().max() < 2 ** 63:
+                new = pd.to_numeric(series.astype("int64"), downcast="unsigned" if values.min() >= 0 else "integer")
+            elif series.dtype != np.float32 and (values.empty or values.abs().max() <= np.finfo(np.float32).max):
+                candidate = series.astype("float32")
+                if lossy_floats or _round_trips(series, candidate):
+                    new = candidate
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            n_unique = series.nunique(dropna=True)
+            if _looks_like_dates(series):
+                new = pd.to_datetime(series, errors="coerce", format="mixed")
+            elif n_unique <= max_categories and n_unique <= category_ratio * max(len(series), 1):
+                new = series.astype("category")
+        optimized[col] = new
+        after = int(new.memory_usage(deep=True, index=False))
+        report.append({
+            "column": str(col),
+            "dtype_before": str(series.dtype),
+            "dtype_after": str(new.dtype),
+            "bytes_before": before,
+            "bytes_after": after,
+        })
+    return pd.DataFrame(optimized, index=df.index), report
+
+# ✅ Chunk size from a memory budget
+def estimate_chunk_rows(file_path: str, memory_budget_mb: float = DATASET_MEMORY_BUDGET_MB, sample_rows: int = 1000) -> int:
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".parquet":
+        import pyarrow.parquet as pq
+        batch = next(pq.ParquetFile(file_path).iter_batches(batch_size=sample_rows), None)
+        sample = batch.to_pandas() if batch is not None else pd.DataFrame()
+    elif ext in [".jsonl", ".ndjson"]:
+        sample = pd.read_json(file_path, lines=True, nrows=sample_rows)
+    elif ext in STREAMABLE_FORMATS:
+        sample = pd.read_csv(file_path, nrows=sample_rows, **_csv_options(ext))
+    else:
+        return sample_rows
+    bytes_per_row = sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+    # Parsing and downstream copies need headroom, so a chunk only gets a quarter of the budget
+    return max(1000, int(memory_budget_mb * 1024 * 1024 / 4 / max(bytes_per_row, 1)))
+
+def _csv_options(ext: str) -> dict:
+    if ext == ".tsv":
+        return {"sep": "\t"}
+    if ext == ".txt":
+        return {"delimiter": None}
+    return {}
+
+# ✅ Streaming loader: yields DataFrame chunks instead of materializing the file
+def iter_dataset(file_path: str, chunksize: int = None, memory_budget_mb: float = DATASET_MEMORY_BUDGET_MB,
+                 columns: list = None, use_cache: bool = True):
+    """
+    Yield a dataset as DataFrame chunks whose size fits `memory_budget_mb`.
+
+    CSV/TSV/TXT stream through `read_csv(chunksize=...)`, JSON lines through
+    `read_json(lines=True, chunksize=...)` and Parquet batch by batch over its row
+    groups. Other formats cannot be streamed and are loaded once, then sliced. A
+    fresh Parquet cache of the file is streamed instead of the original when present.
+    """
+    if use_cache:
+        from dataset_cache import cached_parquet_path, DATASET_CACHE_ENABLED
+        cached = DATASET_CACHE_ENABLED and cached_parquet_path(file_path)
+        if cached:
+            file_path = cached
+    ext = os.path.splitext(file_path)[1].lower()
+    chunksize = chunksize or estimate_chunk_rows(file_path, memory_budget_mb)
+    try:
+        if ext in [".csv", ".tsv", ".txt"]:
+            with pd.read_csv(file_path, chunksize=chunksize, usecols=columns, **_csv_options(ext)) as reader:
+                yield from reader
+        elif ext in [".jsonl", ".ndjson"]:
+            with pd.read_json(file_path, lines=True, chunksize=chunksize) as reader:
+                for chunk in reader:
+                    yield chunk[columns] if columns else chunk
+        elif ext == ".parquet":
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunksize, columns=columns):
+                yield batch.to_pandas()
+        else:
+            df = load_dataset(file_path) if use_cache else read_dataset_file(file_path)
+            if columns:
+                df = df[columns]
+            for start in range(0, len(df), chunksize):
+                yield df.iloc[start:start + chunksize]
+    except (OSError, pd.errors.ParserError) as e:
+        raise ValueError(f"❌ Error streaming dataset: {e}")
+
+# ✅ Bounded-memory sample for EDA (total row count kept in df.attrs)
+def load_dataset_sample(file_path: str, row_budget: int = None) -> pd.DataFrame:
+    from approx_stats import reservoir_sample, EDA_ROW_BUDGET
+    sample, total_rows = reservoir_sample(iter_dataset(file_path), row_budget=row_budget or EDA_ROW_BUDGET)
+    sample.attrs["total_rows"] = total_rows
+    return sample
+
+# ✅ Content hash (streamed, constant memory)
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 # ✅ Get last column as default target
-def get_target_column(df: pd.DataFrame) -> str:
+def get_target_column(df: pd.DataFrame, target: str = None) -> str:
     if df.shape[1] < 2:
         raise ValueError("Dataset must have at least one feature and one target column.")
+    if target is not None:
+        if target not in df.columns:
+            raise ValueError(f"Target column '{target}' not found in dataset.")
+        return target
     return df.columns[-1]
 
+# ✅ Classification vs regression
+def detect_task_type(y: pd.Series, max_classes: int = TRAIN_MAX_CLASSES) -> str:
+    """
+    'classification' for non-numeric, boolean or few-valued integer targets, else 'regression'.
+
+    Integer-valued targets count as classes when there are at most `max_classes` of them
+    and each value repeats on average (fewer distinct values than half the rows; binary
+    targets always qualify), so a small 3-class dataset is still classification while IDs
+    and wide-ranging counts stay regression.
+    """
+    y = y.dropna()
+    if not pd.api.types.is_numeric_dtype(y) or pd.api.types.is_bool_dtype(y):
+        return "classification"
+    n_unique = y.nunique()
+    integer_valued = bool(np.all(np.mod(y.to_numpy(dtype=float), 1) == 0))
+    if integer_valued and n_unique <= max_classes and (n_unique <= 2 or n_unique < 0.5 * len(y)):
+        return "classification"
+    return "regression"
+
 # ✅ Dataset metadata
 def print_dataset_info(df: pd.DataFrame) -> dict:
     return {
@@ -101,6 +298,52 @@ def encode_categorical_features(X: pd.DataFrame) -> pd.DataFrame:
     X = pd.concat([X, encoded_df], axis=1)
     return X
 
+# ✅ Fitted preprocessing (the helpers above, as one reusable transformer)
+def to_float32(X):
+    """Cast a dense or sparse matrix to float32; module-level so pickled pipelines can find it."""
+    return X.astype(np.float32, copy=False)
+
+def to_dense(X):
+    return X.toarray() if hasattr(X, "toarray") else X
+
+def build_preprocessor(X: pd.DataFrame, select_k: int = TRAIN_SELECT_K, task_type: str = "classification") -> Pipeline:
+    """
+    Impute, scale and one-hot encode `X` inside a single sklearn Pipeline.
+
+    Numeric columns are mean-imputed and scaled; categorical columns are mode-imputed
+    and one-hot encoded as a sparse float32 matrix, rare levels beyond
+    TRAIN_MAX_CATEGORIES folded together. Identifier-like, date and other columns are dropped.
+    With `select_k` > 0 only the k best features (F-test for `task_type`) are kept.
+    """
+    numeric_cols = X.select_dtypes(include="number").columns.tolist()
+    categorical_cols = [
+        col for col in X.select_dtypes(include=["object", "category", "bool", "string"]).columns
+        # Free-text identifiers and date strings carry no reusable categories
+        if X[col].nunique() < max(len(X) * 0.9, 2) and not _looks_like_dates(X[col])
+    ]
+
+    transformers = []
+    if numeric_cols:
+        transformers.append(("numeric", Pipeline([
+            ("impute", SimpleImputer(strategy="mean")),
+            ("scale", StandardScaler()),
+            ("float32", FunctionTransformer(to_float32, accept_sparse=True)),
+        ]), numeric_cols))
+    if categorical_cols:
+        transformers.append(("categorical", Pipeline([
+            ("impute", SimpleImputer(strategy="most_frequent")),
+            ("one_hot", OneHotEncoder(handle_unknown="infrequent_if_exist", max_categories=TRAIN_MAX_CATEGORIES,
+                                      sparse_output=True, dtype=np.float32)),
+        ]), categorical_cols))
+    if not transformers:
+        raise ValueError("No numeric or categorical feature columns to train on.")
+
+    steps = [("columns", ColumnTransformer(transformers, remainder="drop"))]
+    if select_k:
+        score_func = f_regression if task_type == "regression" else f_classif
+        steps.append(("select", SelectKBest(score_func=score_func, k=select_k)))
+    return Pipeline(steps)
+
 # ✅ Email EDA Report
 def send_email_report(to_email: str, subject: str, body: str, attachment_path: str):
     try:
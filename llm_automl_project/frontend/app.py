@@ -1,5 +1,7 @@
 import os
 import sys
+import time
+import shutil
 import streamlit as st
 import pandas as pd
 import requests
@@ -31,6 +33,8 @@ if import_error:
     st.error(import_error)
 
 EDA_DIR = "data/eda_report"
+UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024
+TRAIN_JOB_TIMEOUT = int(os.getenv("TRAIN_JOB_TIMEOUT", 3600))  # seconds to wait for a training job
 
 st.title("🤖 LLM AutoML Platform")
 
@@ -45,47 +49,109 @@ with tabs[0]:
     df_preview = None
 
     if uploaded_file:
-        os.makedirs("data", exist_ok=True)
-        file_path = os.path.join("data", uploaded_file.name)
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.read())
+        upload_key = f"{uploaded_file.name}:{uploaded_file.size}"
+        if st.session_state.get("uploaded_key") != upload_key:
+            # Send the file once per selection, in chunks the backend can resume from
+            try:
+                res = requests.post(f"{BACKEND_URL}/uploads/",
+                                    params={"filename": uploaded_file.name, "total_size": uploaded_file.size},
+                                    timeout=10)
+                res.raise_for_status()
+                session = res.json()
+                uploaded_file.seek(0)
+                offset = 0
+                while chunk := uploaded_file.read(UPLOAD_CHUNK_BYTES):
+                    res = requests.put(f"{BACKEND_URL}/uploads/{session['upload_id']}",
+                                       params={"offset": offset}, data=chunk, timeout=60)
+                    if res.status_code == 409:
+                        # Backend already has more (or less) of the file: resume from its offset
+                        offset = res.json()["detail"]["offset"]
+                        uploaded_file.seek(offset)
+                        continue
+                    res.raise_for_status()
+                    offset = res.json()["offset"]
+                requests.post(f"{BACKEND_URL}/uploads/{session['upload_id']}/complete", timeout=600).raise_for_status()
+                st.session_state["uploaded_key"] = upload_key
+            except requests.exceptions.ConnectionError:
+                # No backend: keep a local copy for the fallback path
+                os.makedirs("data", exist_ok=True)
+                uploaded_file.seek(0)
+                with open(os.path.join("data", uploaded_file.name), "wb") as f:
+                    shutil.copyfileobj(uploaded_file, f, UPLOAD_CHUNK_BYTES)
+                st.session_state["uploaded_key"] = upload_key
+            except Exception as e:
+                # Not marked as uploaded, so the next rerun sends the file again
+                st.error(f"❌ Upload failed: {e}")
 
         try:
+            uploaded_file.seek(0)
             if uploaded_file.name.endswith(".csv"):
-                df_preview = pd.read_csv(file_path)
+                df_preview = pd.read_csv(uploaded_file, nrows=100)
             elif uploaded_file.name.endswith(".xlsx"):
-                df_preview = pd.read_excel(file_path)
+                df_preview = pd.read_excel(uploaded_file, nrows=100)
             elif uploaded_file.name.endswith(".json"):
-                df_preview = pd.read_json(file_path)
+                df_preview = pd.read_json(uploaded_file)
             elif uploaded_file.name.endswith(".parquet"):
-                df_preview = pd.read_parquet(file_path)
-            st.success(f"✅ File '{uploaded_file.name}' uploaded.")
+                df_preview = pd.read_parquet(uploaded_file)
+            if st.session_state.get("uploaded_key") == upload_key:
+                st.success(f"✅ File '{uploaded_file.name}' uploaded.")
             st.dataframe(df_preview.head(100))
         except Exception as e:
             st.error(f"❌ Error reading file: {e}")
 
+        target_options = list(df_preview.columns) if df_preview is not None else []
+        target = st.selectbox("🎯 Target column", target_options, index=len(target_options) - 1) if target_options else None
+        search = st.checkbox("🔍 Search across model families", value=False)
+        time_budget = st.number_input("Search time budget (seconds)", min_value=10, value=300, step=30, disabled=not search)
+
         if st.button("🚀 Train Model + Generate EDA"):
             with st.spinner("Analyzing & training..."):
                 try:
                     res = requests.post(
                         f"{BACKEND_URL}/train-model/",
-                        params={"file_name": uploaded_file.name},
+                        params={"file_name": uploaded_file.name, "search": search, "time_budget": time_budget,
+                                "target": target},
                         timeout=60
                     )
                     if res.status_code == 200:
+                        # Training runs as a backend job; poll until it finishes
+                        job_id = res.json()["job_id"]
+                        progress = st.progress(0.0)
+                        deadline = time.monotonic() + TRAIN_JOB_TIMEOUT
+                        while True:
+                            res = requests.get(f"{BACKEND_URL}/jobs/{job_id}", timeout=10)
+                            if res.status_code != 200:
+                                break  # e.g. 404 once the job is gone; reported below
+                            job = res.json()
+                            progress.progress(min(float(job.get("progress") or 0.0), 1.0))
+                            if job["status"] in ("completed", "failed", "cancelled"):
+                                res = requests.get(f"{BACKEND_URL}/jobs/{job_id}/result", timeout=10)
+                                break
+                            if time.monotonic() > deadline:
+                                res = None
+                                break
+                            time.sleep(2)
+                    if res is None:
+                        st.error(f"❌ Training job {job_id} still running after {TRAIN_JOB_TIMEOUT}s; "
+                                 f"check /jobs/{job_id} later.")
+                    elif res.status_code == 200:
+                        result = res.json()
                         st.success("✅ Model & EDA ready.")
-                        st.json(res.json())
-                        if os.path.exists(EDA_DIR):
-                            for img in os.listdir(EDA_DIR):
+                        st.json(result)
+                        # Each dataset's charts live in their own content-hash directory
+                        eda_dir = result.get("eda_dir", EDA_DIR)
+                        st.session_state["eda_pdf"] = result.get("eda_pdf")
+                        if os.path.exists(eda_dir):
+                            for img in sorted(os.listdir(eda_dir)):
                                 if img.endswith(".png"):
-                                    st.image(os.path.join(EDA_DIR, img), use_column_width=True)
+                                    st.image(os.path.join(eda_dir, img), use_column_width=True)
                     else:
                         st.error(f"❌ Backend error {res.status_code}: {res.text}")
                 except requests.exceptions.ConnectionError:
                     st.warning("⚠️ Backend not reachable. Using LLM fallback...")
                     if deepseek_fallback:
-                        with open(file_path, "r") as f:
-                            head = f.read(3000)
+                        uploaded_file.seek(0)
+                        head = uploaded_file.read(3000).decode("utf-8", errors="replace")
                         try:
                             reply = deepseek_fallback(f"Analyze this dataset:\n{head}")
                             st.markdown(reply)
@@ -112,7 +178,7 @@ with tabs[2]:
     email = st.text_input("Recipient email:")
     if st.button("📨 Send PDF"):
         try:
-            if send_eda_email(email):
+            if send_eda_email(email, st.session_state.get("eda_pdf")):
                 st.success(f"✅ Sent to {email}")
             else:
                 st.error("❌ Email failed.")
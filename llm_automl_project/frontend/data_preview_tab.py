@@ -8,12 +8,26 @@ from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 from scipy.stats import zscore
 
+try:
+    from approx_stats import approximate_profile, sample_rows, HyperLogLog, EDA_ROW_BUDGET
+except ImportError:
+    approximate_profile = None
+
+try:
+    from dataset_cache import load_cached_dataset
+    from utils import optimize_dtypes
+except ImportError:
+    load_cached_dataset = None
+    optimize_dtypes = None
+
 DATA_DIR = "data"
 
 def show_data_preview():
     st.subheader("🔍 Data Preview + Insights")
 
-    files = [f for f in os.listdir(DATA_DIR) if f.endswith((".csv", ".xlsx", ".json", ".parquet"))]
+    # Dotfiles are internal (e.g. the upload index), never datasets
+    files = [f for f in os.listdir(DATA_DIR)
+             if f.endswith((".csv", ".xlsx", ".json", ".parquet")) and not f.startswith(".")]
     if not files:
         st.info("📁 No uploaded datasets found.")
         return
@@ -21,7 +35,10 @@ def show_data_preview():
     selected_file = st.selectbox("📂 Choose file to explore", files)
 
     try:
-        if selected_file.endswith(".csv"):
+        if load_cached_dataset is not None:
+            # Typed, memory-mapped Parquet copy instead of re-parsing the raw upload
+            df = load_cached_dataset(os.path.join(DATA_DIR, selected_file))
+        elif selected_file.endswith(".csv"):
             df = pd.read_csv(os.path.join(DATA_DIR, selected_file))
         elif selected_file.endswith(".xlsx"):
             df = pd.read_excel(os.path.join(DATA_DIR, selected_file))
@@ -33,17 +50,53 @@ def show_data_preview():
             st.error("Unsupported file format.")
             return
 
+        if optimize_dtypes is not None and st.checkbox("🪶 Optimize dtypes (downcast numbers, categories, dates)"):
+            df, dtype_report = optimize_dtypes(df)
+            report_df = pd.DataFrame(dtype_report)
+            saved = report_df["bytes_before"].sum() - report_df["bytes_after"].sum()
+            st.markdown(f"**Memory saved:** {saved / 1e6:.2f} MB "
+                        f"({report_df['bytes_before'].sum() / 1e6:.2f} → {report_df['bytes_after'].sum() / 1e6:.2f} MB)")
+            st.dataframe(report_df)
+
         st.write(f"📊 Shape: {df.shape[0]} rows × {df.shape[1]} columns")
         st.dataframe(df.head(100))
 
+        approximate = False
+        if approximate_profile is not None:
+            approximate = st.checkbox("⚡ Approximate mode (sampled plots, sketched statistics)",
+                                      value=len(df) > EDA_ROW_BUDGET)
+            row_budget = int(st.number_input("Row budget", min_value=1000, value=EDA_ROW_BUDGET, step=10000))
+
         st.markdown("### 🧾 Dataset Summary Stats")
-        st.json({
-            "Missing values": int(df.isnull().sum().sum()),
-            "Duplicate rows": int(df.duplicated().sum()),
-            "Numeric columns": len(df.select_dtypes(include='number').columns),
-            "Categorical columns": len(df.select_dtypes(include='object').columns),
-            "Memory Usage (MB)": round(df.memory_usage().sum() / 1e6, 2)
-        })
+        if approximate:
+            # Distinct rows from HyperLogLog instead of a full duplicated() pass
+            row_sketch = HyperLogLog()
+            row_sketch.update(df)
+            st.json({
+                "Missing values": int(df.isnull().sum().sum()),
+                "Duplicate rows (≈)": max(0, len(df) - row_sketch.count()),
+                "Numeric columns": len(df.select_dtypes(include='number').columns),
+                "Categorical columns": len(df.select_dtypes(include=['object', 'category']).columns),
+                "Memory Usage (MB)": round(df.memory_usage(deep=True).sum() / 1e6, 2)
+            })
+            profile = approximate_profile(df, row_budget=row_budget)
+            bounds = profile["error_bounds"]
+            st.caption(
+                f"⚠️ Approximate: plots, PCA and clustering use a {profile['sample_rows']:,}-row sample of "
+                f"{profile['rows']:,} rows; quantiles ±{bounds['quantile_rank_error']:.1%} rank, "
+                f"distinct counts ±{bounds['distinct_relative_error']:.1%}."
+            )
+            st.dataframe(pd.DataFrame(profile["columns"]).T)
+            plot_df = sample_rows(df, row_budget)
+        else:
+            st.json({
+                "Missing values": int(df.isnull().sum().sum()),
+                "Duplicate rows": int(df.duplicated().sum()),
+                "Numeric columns": len(df.select_dtypes(include='number').columns),
+                "Categorical columns": len(df.select_dtypes(include=['object', 'category']).columns),
+                "Memory Usage (MB)": round(df.memory_usage(deep=True).sum() / 1e6, 2)
+            })
+            plot_df = df
 
         target_col = st.selectbox("🎯 Choose target column (optional)", df.columns)
         if target_col:
@@ -51,7 +104,7 @@ def show_data_preview():
             st.bar_chart(df[target_col].value_counts())
 
         st.markdown("### 📈 Auto Visualizations")
-        numeric_df = df.select_dtypes(include='number').dropna()
+        numeric_df = plot_df.select_dtypes(include='number').dropna()
         if numeric_df.empty:
             st.warning("⚠️ No numeric columns found for plotting.")
             return
@@ -104,7 +157,7 @@ def show_data_preview():
         st.json(outliers.to_dict())
 
         # 7. Categorical Summary
-        categoricals = df.select_dtypes(include='object').columns.tolist()
+        categoricals = df.select_dtypes(include=['object', 'category']).columns.tolist()
         if categoricals:
             st.markdown("### 🔤 Categorical Feature Summary")
             for col in categoricals:
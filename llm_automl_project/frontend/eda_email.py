@@ -17,13 +17,14 @@ SMTP_PORT = int(os.getenv("SMTP_PORT", 465))
 EDA_PDF_PATH = "data/eda_report/eda_report.pdf"
 
 
-def send_eda_email(recipient: str) -> bool:
-    """Send the EDA PDF report to the given recipient email."""
+def send_eda_email(recipient: str, pdf_path: str = None) -> bool:
+    """Send the EDA PDF report (the latest trained dataset's, if given) to the recipient email."""
+    pdf_path = pdf_path or EDA_PDF_PATH
     if not EMAIL_ADDRESS or not EMAIL_PASSWORD:
         st.error("❌ Email credentials not set. Please check your `.env` file.")
         return False
 
-    if not os.path.exists(EDA_PDF_PATH):
+    if not os.path.exists(pdf_path):
         st.error("❌ EDA report not found. Please train the model first.")
         return False
 
@@ -36,7 +37,7 @@ def send_eda_email(recipient: str) -> bool:
             "Hello,\n\nAttached is your EDA report generated using the LLM AutoML platform.\n\nBest regards,\nLLM AutoML Team"
         )
 
-        with open(EDA_PDF_PATH, "rb") as f:
+        with open(pdf_path, "rb") as f:
             msg.add_attachment(f.read(), maintype="application", subtype="pdf", filename="eda_report.pdf")
 
         with smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT) as smtp: